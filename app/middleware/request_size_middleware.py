@@ -0,0 +1,86 @@
+"""
+Request size middleware for the FastAPI application.
+Rejects oversized request bodies before they are read or parsed.
+"""
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+
+class RequestBodyTooLarge(HTTPException):
+    """
+    Raised while streaming a body that crosses the size limit.
+    
+    It is an HTTPException so FastAPI lets it through unchanged when it is
+    raised while parsing the body (any other error there becomes a 400).
+    """
+
+    def __init__(self, max_body_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Request body exceeds maximum allowed size of {max_body_size} bytes"
+        )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware that enforces a maximum request body size.
+    
+    Requests declaring a larger Content-Length are answered with 413 before
+    the body is read. Bodies without Content-Length (chunked) are counted
+    while they stream and aborted as soon as the limit is crossed.
+    """
+
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    def _too_large(self) -> JSONResponse:
+        error = RequestBodyTooLarge(self.max_body_size)
+        return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise RequestBodyTooLarge(self.max_body_size)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestBodyTooLarge:
+            # Routes that are not FastAPI endpoints (or read the body outside
+            # request parsing) let the exception reach this point
+            if not response_started:
+                await self._too_large()(scope, receive, send)
+
+
+def setup_request_size_middleware(app: FastAPI, max_body_size: int):
+    """
+    Configure the request body size limit for the FastAPI application.
+    
+    Args:
+        app: FastAPI application instance
+        max_body_size: Maximum request body size in bytes
+    """
+    app.add_middleware(RequestSizeLimitMiddleware, max_body_size=max_body_size)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Base directory of the project
@@ -9,11 +10,99 @@ UPLOAD_DIR = BASE_DIR.parent / "data"  # Changed to point to the project root/da
 # Ensure the upload directory exists
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Directory where search index snapshots are persisted (kept outside UPLOAD_DIR
+# so writing a snapshot does not make the data directory look newer)
+INDEX_DIR = BASE_DIR.parent / "index"
+
+# Directory where chunk embeddings are cached next to the documents
+EMBEDDINGS_DIR = UPLOAD_DIR / "embeddings"
+
+# Directory for on-disk caches (a subdirectory, so cache writes do not touch
+# the data directory's own mtime)
+CACHE_DIR = UPLOAD_DIR / "cache"
+
+# Directory where queued uploads and ingestion job records are kept until processed
+INGEST_DIR = UPLOAD_DIR / "ingest"
+
+# Background ingestion configuration
+INGEST_CONFIG = {
+    "workers": 2,            # Files extracted and indexed at the same time
+    "max_pending_files": 1000,  # Queued files accepted before new uploads are rejected (503)
+    "job_ttl_seconds": 7 * 24 * 3600,  # Age after which finished job records are removed
+}
+
+# Chunking of documents for the index
+CHUNK_CONFIG = {
+    "unit": "tokens",  # Chunk size measured in "tokens" (words) or "chars"
+    "size": 100,       # Target size of a chunk
+    "overlap": 20,     # Size repeated at the start of the next chunk
+    "min_chars": 20,   # Shorter chunks are not indexed
+}
+
 # Search service configuration
 SEARCH_CONFIG = {
     "min_confidence": 0.3,  # Minimum confidence score for search results
     "page_size": 10,        # Default number of results per page
     "max_results": 1000,    # Maximum number of results to return
+    "max_segments": 8,      # Segments allowed before the background merger combines them
+    "merge_factor": 4,      # Number of smallest segments merged together at once
+    "expunge_deletes_ratio": 0.5,  # Rewrite a segment once this fraction of its rows is deleted
+    "engine": "tfidf",      # Default ranking engine: "tfidf" (cosine) or "bm25"
+    "bm25_k1": 1.2,         # BM25 term frequency saturation
+    "bm25_b": 0.75,         # BM25 document length normalization
+    "bm25_block_size": 256, # Rows per block-max window used for early termination
+    "shared_index": os.getenv("INDEX_SHARED", "0") == "1",  # Share one mapped index between uvicorn workers
+    "shared_poll_seconds": 1.0,      # How often workers look for catalog changes / newer snapshots
+    "build_workers": int(os.getenv("INDEX_BUILD_WORKERS", "1")),  # Processes for a full rebuild (0: one per CPU)
+    "build_shard_documents": 64,     # Documents per task of a parallel rebuild
+    "hashing_features": int(os.getenv("INDEX_HASHING_FEATURES", "0")),  # >0: out-of-core hashed index with this many columns
+    "hashing_batch_documents": 32,   # Documents read, tokenized and written per batch of a hashed rebuild
+    "index_debounce_seconds": 0.5,   # Quiet period before pending uploads/deletes are applied as one batch
+    "index_max_delay_seconds": 5.0,  # Longest a pending change waits while changes keep arriving
+    "cache_max_bytes": 32 * 1024 * 1024,  # Size bound of the search result cache
+    "cache_max_entries": 10000,           # Maximum number of cached result pages
+    "cache_ttl_seconds": 300,             # Time to live of a cached result page
+    "dense_enabled": False,  # Embed chunks with sentence-transformers and enable the "hybrid" engine
+    "dense_model": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    "dense_batch_size": 64,  # Chunks embedded per forward pass (CPU)
+    "dense_compact_ratio": 0.25,  # Rewrite the embedding store once this fraction of its rows is unused
+    "hybrid_candidates": 100,  # Rows taken from each ranking before fusion
+    "rrf_k": 60,             # Reciprocal rank fusion constant
+    "ann_enabled": False,    # Use the IVF-PQ index instead of brute force for dense candidates
+    "ann_nlist": 256,        # Inverted lists of the IVF-PQ index
+    "ann_pq_m": 48,          # Product quantizer sub-spaces (must divide the embedding size)
+    "ann_nprobe": 16,        # Lists probed per query: the recall/latency knob
+    "ann_refine": 200,       # PQ candidates re-ranked with exact vectors
+}
+
+# LLM client configuration (any OpenAI-compatible endpoint, e.g. a local stub via LLM_BASE_URL)
+LLM_CONFIG = {
+    "base_url": os.getenv("LLM_BASE_URL", "https://router.huggingface.co/v1"),
+    "model": os.getenv("LLM_MODEL", "openai/gpt-oss-120b:fireworks-ai"),
+    "max_tokens": 1000,
+    "temperature": 0.1,
+    "top_p": 0.9,
+    "connect_timeout": 5.0,      # Seconds to open a connection
+    "read_timeout": 60.0,        # Seconds to wait for the response of one attempt
+    "total_timeout": 120.0,      # Seconds for a whole call, retries included
+    "max_connections": 20,       # Connection pool size
+    "max_keepalive_connections": 10,  # Idle connections kept open for reuse
+    "keepalive_expiry": 30.0,    # Seconds an idle connection stays in the pool
+    "max_retries": 3,            # Retries on timeouts, connection errors, 429 and 5xx
+    "retry_base_delay": 0.5,     # First backoff step in seconds (doubles each retry)
+    "retry_max_delay": 8.0,      # Backoff cap in seconds
+    "max_concurrency": 8,        # LLM calls in flight across the whole process
+}
+
+# Question answering configuration
+QA_CONFIG = {
+    "tokenizer": os.getenv("LLM_TOKENIZER", "openai/gpt-oss-120b"),  # tokenizers model used to count prompt tokens
+    "context_token_budget": 3000,  # Tokens of retrieved passages packed into the prompt
+    "retrieval_candidates": 50,    # Chunks retrieved before packing
+    "engine": None,                # Ranking engine for retrieval (None: SEARCH_CONFIG["engine"])
+    "answer_cache_enabled": True,  # Reuse LLM answers for the same question and context
+    "answer_cache_max_bytes": 64 * 1024 * 1024,     # Size bound of the SQLite answer cache
+    "answer_cache_ttl_seconds": 7 * 24 * 3600,      # Age after which a cached answer is dropped
 }
 
 # API configuration
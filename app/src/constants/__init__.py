@@ -1,13 +1,25 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.src.config.settings import SEARCH_CONFIG
+from app.src.services.index_services import SegmentedIndex
+
+_vectorizer = TfidfVectorizer(
+    token_pattern=r'(?u)\b\w[\w-]*\w\b',
+    ngram_range=(1, 2),
+    max_features=SEARCH_CONFIG["max_results"],
+    strip_accents='unicode',
+    lowercase=True
+)
 
 _state = {
-    'documents': [],
-    'doc_metadata': [],
-    'tfidf_matrix': None,
-    'vectorizer': TfidfVectorizer(
-        token_pattern=r'(?u)\b\w[\w-]*\w\b',
-        ngram_range=(1, 2),
-        max_features=SEARCH_CONFIG["max_results"],
-        strip_accents='unicode',
-        lowercase=True
+    'vectorizer': _vectorizer,
+    # Segmented index: tokenized with the vectorizer's analyzer and ranked
+    # exactly like a TfidfVectorizer fitted on the live chunks. Every change
+    # publishes a new immutable IndexView (segments, vocabulary, metadata,
+    # generation) with a single reference swap; readers grab ``.view`` once
+    # per request and use only that view
+    'index': SegmentedIndex(
+        analyzer=_vectorizer.build_analyzer(),
+        max_features=_vectorizer.max_features
     )
-}
\ No newline at end of file
+}
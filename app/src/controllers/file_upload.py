@@ -1,11 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, Query
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query, Response
 from fastapi.responses import JSONResponse
 from typing import List, Dict, Any, Optional
 import asyncio
 import logging
 
-from ..services.file_service import FileService
-from ..services.search_service import load_all_documents as reload_search_index
+from app.src.config.settings import UPLOAD_DIR
+from app.src.services.file_services import (
+    list_uploaded_files,
+    delete_file,
+    delete_all_files
+)
+from app.src.services.search_services import get_index_scheduler
+from app.src.services.ingest_services import get_ingest_queue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,24 +20,22 @@ logger = logging.getLogger(__name__)
 # Create router without prefix (will be added in routes.py)
 file_upload_controller = APIRouter()
 
-def get_file_service():
-    """Dependency for getting file service instance"""
-    return FileService(upload_folder="data")
-
-@file_upload_controller.post("/")
+@file_upload_controller.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def procesar_archivos(
-    files: List[UploadFile] = File(...),
-    file_service: FileService = Depends(get_file_service)
+    files: List[UploadFile] = File(...)
 ):
     """
-    Endpoint para procesar múltiples archivos.
+    Endpoint para encolar múltiples archivos para su procesamiento.
+    
+    Los archivos se guardan en disco y se responde de inmediato con el id del
+    trabajo; la extracción y la indexación ocurren en segundo plano. El
+    progreso se consulta en ``GET /ingest/jobs/{job_id}``.
     
     Args:
         files: Lista de archivos a procesar
-        file_service: Injected file service instance
         
     Returns:
-        JSON con los resultados del procesamiento
+        JSON con el id y el estado inicial del trabajo
     """
     if not files:
         raise HTTPException(
@@ -40,77 +44,24 @@ async def procesar_archivos(
         )
     
     try:
-        # Procesar archivos en paralelo
-        tasks = [file_service.process_uploaded_file(file) for file in files]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Procesar resultados
-        archivos_procesados = []
-        errores = []
-        
-        # Verificar si se procesó al menos un archivo correctamente
-        any_success = False
-        
-        for file, result in zip(files, results):
-            if isinstance(result, Exception):
-                errores.append({
-                    "archivo": file.filename,
-                    "error": str(result)
-                })
-            elif result.get("procesado_exitoso", False):
-                archivos_procesados.append({
-                    "archivo": result["archivo"],
-                    "ruta": result["ruta"],
-                    "tamano_bytes": result["tamano_bytes"],
-                    "tipo": result["tipo"],
-                    "num_caracteres": result["num_caracteres"]
-                })
-                any_success = True
-            else:
-                errores.append({
-                    "archivo": result.get("archivo", file.filename),
-                    "error": result.get("error", "Error desconocido")
-                })
-        
-        # Si se procesó al menos un archivo correctamente, recargar el índice de búsqueda
-        if any_success:
-            try:
-                reload_search_index()
-                logger.info("Índice de búsqueda actualizado correctamente")
-            except Exception as e:
-                logger.error(f"Error al actualizar el índice de búsqueda: {str(e)}")
-                errores.append({
-                    'archivo': 'Sistema',
-                    'error': f'Error al actualizar el índice de búsqueda: {str(e)}'
-                })
-        
-        # Construir respuesta
+        job = await get_ingest_queue().submit(files)
         response = {
-            'mensaje': 'Procesamiento completado',
-            'archivos_procesados': [{
-                'archivo': p['archivo'],
-                'ruta': p['ruta'],
-                'tamano_bytes': p['tamano_bytes'],
-                'tipo': p.get('tipo', 'application/octet-stream'),
-                'num_caracteres': p.get('num_caracteres', 0)
-            } for p in archivos_procesados],
-            'errores': [{
-                'archivo': e.get('archivo', 'archivo_desconocido'),
-                'error': str(e.get('error', 'Error desconocido'))
-            } for e in errores],
-            'total_procesados': len(archivos_procesados),
-            'total_errores': len(errores)
+            'mensaje': 'Archivos en cola de procesamiento',
+            **job
         }
         
         # Agregar encabezados CORS
         headers = {
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': 'POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+            'Location': f"jobs/{job['job_id']}"
         }
         
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK, headers=headers)
+        return JSONResponse(content=response, status_code=status.HTTP_202_ACCEPTED, headers=headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en el procesamiento: {str(e)}")
         raise HTTPException(
@@ -118,18 +69,46 @@ async def procesar_archivos(
             detail=f"Error en el procesamiento: {str(e)}"
         )
 
+@file_upload_controller.get("/jobs/{job_id}")
+async def estado_trabajo(job_id: str):
+    """
+    Endpoint para consultar el progreso de un trabajo de ingesta.
+    
+    Returns:
+        Estado de cada archivo, páginas procesadas y rendimiento
+    """
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo no encontrado: {job_id}"
+        )
+    return job
+
 @file_upload_controller.get("/files", response_model=List[Dict[str, Any]])
 async def listar_archivos(
-    file_service: FileService = Depends(get_file_service)
+    response: Response,
+    page: int = Query(1, ge=1, description="Número de página"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Archivos por página (todos si se omite)"),
+    extension: Optional[str] = Query(None, description="Filtrar por extensión (pdf, txt)"),
+    q: Optional[str] = Query(None, description="Filtrar por texto contenido en el nombre del archivo")
 ):
     """
-    Endpoint para listar todos los archivos subidos.
+    Endpoint para listar los archivos subidos, paginados y filtrados desde el catálogo.
+    
+    El total de coincidencias se devuelve en el encabezado ``X-Total-Count``.
     
     Returns:
         Lista de archivos con sus metadatos
     """
     try:
-        files = await file_service.list_uploaded_files()
+        files, total = await asyncio.to_thread(
+            list_uploaded_files, UPLOAD_DIR, page=page, page_size=limit, extension=extension, search=q
+        )
+        response.headers['X-Total-Count'] = str(total)
+        response.headers['X-Page'] = str(page)
+        if limit:
+            response.headers['X-Page-Size'] = str(limit)
         return files
     except Exception as e:
         logger.error(f"Error al listar archivos: {str(e)}")
@@ -141,28 +120,36 @@ async def listar_archivos(
 @file_upload_controller.delete("/files/{file_id}")
 async def eliminar_archivo(
     file_id: str,
-    file_service: FileService = Depends(get_file_service)
+    wait: bool = Query(False, description="Esperar a que la eliminación sea visible en las búsquedas")
 ):
     """
     Endpoint para eliminar un archivo específico.
     
     Args:
         file_id: ID del archivo a eliminar
+        wait: Si es True, responde cuando el índice ya no contiene el documento
         
     Returns:
         Resultado de la operación
     """
     try:
-        result = await file_service.delete_file(file_id)
-        # Recargar el índice de búsqueda después de eliminar
+        result = await asyncio.to_thread(delete_file, UPLOAD_DIR, file_id)
+        # Marcar los fragmentos del documento como eliminados en el índice (en el próximo lote)
         try:
-            reload_search_index()
+            indexed = get_index_scheduler().unindex(result['file_id'])
+            if wait:
+                await asyncio.wrap_future(indexed)
         except Exception as e:
             logger.warning(f"No se pudo actualizar el índice de búsqueda: {str(e)}")
         
         return result
     except HTTPException:
         raise
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Archivo no encontrado: {file_id}"
+        )
     except Exception as e:
         logger.error(f"Error al eliminar archivo {file_id}: {str(e)}")
         raise HTTPException(
@@ -173,13 +160,14 @@ async def eliminar_archivo(
 @file_upload_controller.delete("/files")
 async def eliminar_todos_los_archivos(
     confirm: bool = Query(..., description="Debe ser True para confirmar la eliminación"),
-    file_service: FileService = Depends(get_file_service)
+    wait: bool = Query(False, description="Esperar a que el índice quede vacío")
 ):
     """
     Endpoint para eliminar todos los archivos subidos.
     
     Args:
         confirm: Debe ser True para confirmar la eliminación
+        wait: Si es True, responde cuando el índice ya está vacío
         
     Returns:
         Resultado de la operación
@@ -191,10 +179,12 @@ async def eliminar_todos_los_archivos(
         )
         
     try:
-        result = await file_service.delete_all_files()
-        # Recargar el índice de búsqueda después de eliminar
+        result = await asyncio.to_thread(delete_all_files, UPLOAD_DIR, confirm)
+        # Vaciar el índice de búsqueda después de eliminar (en el próximo lote)
         try:
-            reload_search_index()
+            indexed = get_index_scheduler().clear()
+            if wait:
+                await asyncio.wrap_future(indexed)
         except Exception as e:
             logger.warning(f"No se pudo actualizar el índice de búsqueda: {str(e)}")
             
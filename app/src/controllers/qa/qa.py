@@ -1,9 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+import json
 import logging
+from typing import AsyncIterator
 
 from app.src.models.qa_models import QAResponse, QARequest
-from app.src.services.qa_services import answer_question
-from app.src.exceptions import NoDocumentsLoadedError
+from app.src.services.qa_services import answer_question, stream_answer
+from app.src.exceptions.qa_exceptions import NoDocumentsLoadedError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,3 +68,65 @@ async def answer_question_endpoint(question_data: QARequest) -> QAResponse:
             hasEnoughContext=False,
             question=getattr(question_data, 'question', '')
         )
+
+
+async def _sse_events(question: str) -> AsyncIterator[str]:
+    """Serializa los eventos del servicio en formato Server-Sent Events."""
+    async for event, data in stream_answer(question):
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(question: str) -> StreamingResponse:
+    if not question.strip():
+        async def empty_question():
+            data = QAResponse(
+                answer="La pregunta no puede estar vacía.",
+                citations=[],
+                hasEnoughContext=False,
+                question=question
+            ).model_dump(mode="json")
+            yield f"event: done\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        events = empty_question()
+    else:
+        events = _sse_events(question)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Evita que un proxy (nginx) acumule la respuesta
+        }
+    )
+
+
+@qa_controller.post(
+    "/stream",
+    summary="Answer a question (streaming)",
+    description="Stream the answer as Server-Sent Events: `token` events with text as the model generates it, "
+                "then a `done` event with the full QAResponse (answer and citations), or an `error` event"
+)
+async def stream_answer_endpoint(question_data: QARequest) -> StreamingResponse:
+    """
+    Endpoint para responder preguntas enviando la respuesta a medida que se genera.
+    
+    Args:
+        question_data: Datos de la pregunta a responder
+        
+    Returns:
+        StreamingResponse: Eventos SSE `token`, `done` y `error`
+    """
+    logger.info(f"Procesando pregunta (stream): {question_data.question}")
+    return _sse_response(question_data.question)
+
+
+@qa_controller.get(
+    "/stream",
+    summary="Answer a question (streaming, EventSource)",
+    description="Same as POST /stream with the question in the query string, for browser EventSource clients"
+)
+async def stream_answer_get_endpoint(
+    question: str = Query(..., description="La pregunta que se desea responder")
+) -> StreamingResponse:
+    """Variante GET del endpoint de streaming para clientes EventSource."""
+    logger.info(f"Procesando pregunta (stream): {question}")
+    return _sse_response(question)
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Query, HTTPException, status
-from typing import Optional
+from typing import Literal, Optional
 
-from ...services.search_service import search
-from ...models.search import PaginatedSearchResponse, SearchResult
+from app.src.services.search_services import search
+from app.src.models.search_models import PaginatedSearchResponse
 
 search_router = APIRouter(tags=["search"])
 
@@ -16,6 +16,7 @@ async def search_documents(
     q: str = Query(..., min_length=1, description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Number of results per page"),
+    engine: Optional[Literal["tfidf", "bm25", "hybrid"]] = Query(None, description="Ranking engine (defaults to SEARCH_CONFIG)"),
     pageSize: Optional[int] = None  # For backward compatibility
 ) -> PaginatedSearchResponse:
     # Use limit parameter if provided, otherwise use pageSize for backward compatibility
@@ -26,13 +27,15 @@ async def search_documents(
     - **q**: Search query (minimum 2 characters)
     - **page**: Page number (starts at 1)
     - **pageSize**: Number of results per page (1-100)
+    - **engine**: Ranking engine, "tfidf" (cosine similarity), "bm25" or "hybrid" (TF-IDF + embeddings)
     """
     try:
         # Call the search service with the correct parameter name
         results = await search(
             query=q,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            engine=engine
         )
         
         # Ensure the response matches the PaginatedSearchResponse model with camelCase field names
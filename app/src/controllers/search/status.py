@@ -3,8 +3,10 @@ from datetime import datetime
 import platform
 from typing import Dict, Any
 
-from ...models.search import SearchStatus
-from ...services.search_service import _state
+from app.src.models.search_models import SearchStatus
+from app.src.constants import _state
+from app.src.services.search_services import get_search_cache_stats
+from app.src.utils.qa_utils import get_answer_cache_stats
 
 # Create router for status endpoints
 status_router = APIRouter(tags=["search"])
@@ -22,20 +24,24 @@ async def get_search_status() -> Dict[str, Any]:
     - Number of documents loaded
     - Last update timestamp
     - Device information
+    - Search result cache hit/miss counters
+    - QA answer cache hit/miss counters
     """
     try:
         # Get basic system information
         device_info = f"{platform.node()} ({platform.system()} {platform.release()})"
         
-        # Get document count from the search module
-        doc_count = len(_state.get('documents', []))
+        # Get the number of indexed chunks from the current index view
+        doc_count = _state['index'].view.n_live
         
         # Create status response
         return SearchStatus(
             status="ready",  # Default status
             documents_loaded=doc_count,
             last_updated=datetime.now(),
-            device=device_info
+            device=device_info,
+            cache=get_search_cache_stats(),
+            answer_cache=get_answer_cache_stats()
         )
         
     except Exception as e:
@@ -35,12 +35,14 @@ class QAResponse(BaseModel):
         hasEnoughContext (bool): Indica si se encontró suficiente contexto.
         timestamp (datetime): Fecha y hora de la respuesta.
         question (str, optional): Pregunta original.
+        metadata (Dict[str, Any]): Metadatos de la generación (tokens del prompt, fragmentos usados).
     """
     answer: str = Field(..., description="La respuesta generada")
     citations: List[AnswerCitation] = Field(default_factory=list, description="Lista de citas")
     hasEnoughContext: bool = Field(True, description="Indica si hay suficiente contexto")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Fecha y hora de la respuesta")
     question: Optional[str] = Field(None, description="Pregunta original")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Metadatos de la generación (tokens del prompt, fragmentos usados)")
 
 
 class QADocument(BaseModel):
@@ -69,7 +71,11 @@ class QAResponse(BaseModel):
         answer (str): La respuesta generada a la pregunta.
         citations (List[AnswerCitation]): Lista de citas de los documentos.
         hasEnoughContext (bool): Indica si hay suficiente contexto para responder.
+        question (str, optional): Pregunta original.
+        metadata (Dict[str, Any]): Metadatos de la generación (tokens del prompt, fragmentos usados).
     """
     answer: str
     citations: List[AnswerCitation] = []
     hasEnoughContext: bool = True
+    question: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Literal, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Tuple
 from datetime import datetime
 
 class SearchResult(BaseModel):
@@ -25,6 +25,14 @@ class SearchResult(BaseModel):
         ...,
         description="Index of the chunk in the document"
     )
+    page: Optional[int] = Field(
+        None,
+        description="Source page of the chunk (PDF documents only)"
+    )
+    highlights: List[Tuple[int, int]] = Field(
+        default_factory=list,
+        description="[start, end) character offsets of the query terms in the text"
+    )
     
     class Config:
         allow_population_by_field_name = True
@@ -34,7 +42,9 @@ class SearchResult(BaseModel):
                 "documentName": "document.pdf",
                 "relevanceScore": 0.95,
                 "document_id": "doc123",
-                "chunk_index": 1
+                "chunk_index": 1,
+                "page": 3,
+                "highlights": [[5, 13]]
             }
         }
 
@@ -61,6 +71,14 @@ class SearchStatus(BaseModel):
         None,
         description="Error message if status is 'error'"
     )
+    cache: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Search result cache statistics (hits, misses, size)"
+    )
+    answer_cache: Optional[Dict[str, Any]] = Field(
+        None,
+        description="QA answer cache statistics (hits, misses, size), None when disabled"
+    )
     
     class Config:
         schema_extra = {
@@ -69,7 +87,9 @@ class SearchStatus(BaseModel):
                 "documents_loaded": 5,
                 "last_updated": "2023-01-01T00:00:00Z",
                 "device": "server-01 (Linux 5.4.0)",
-                "error": None
+                "error": None,
+                "cache": {"entries": 42, "hits": 1200, "misses": 300, "hit_rate": 0.8},
+                "answer_cache": {"entries": 10, "hits": 25, "misses": 40, "hit_rate": 0.38}
             }
         }
 
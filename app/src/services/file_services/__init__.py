@@ -1,13 +1,18 @@
-from .extract_text import extract_text_from_pdf
-from .save_document import save_document
+from .document_catalog import DocumentCatalog, get_document_catalog
+from .extract_text import extract_text_from_pdf, iter_pdf_pages
+from .save_document import save_document, save_document_pages
 from .process_file import process_uploaded_file
 from .list_files import list_uploaded_files
 from .delete_file import delete_file
 from .delete_all_files import delete_all_files
 
 __all__ = [
+    'DocumentCatalog',
+    'get_document_catalog',
     'extract_text_from_pdf',
+    'iter_pdf_pages',
     'save_document',
+    'save_document_pages',
     'process_uploaded_file',
     'list_uploaded_files',
     'delete_file',
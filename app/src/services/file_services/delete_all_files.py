@@ -1,24 +1,14 @@
-import os
-from pathlib import Path
 from typing import Dict, Any
 
+from .document_catalog import get_document_catalog
+
 def delete_all_files(upload_folder: str, confirm: bool = False) -> Dict[str, Any]:
     try:
         if not confirm:
             raise ValueError("Confirmation required. Set confirm=True to delete all files.")
             
-        upload_path = Path(upload_folder)
-        
-        # Check if directory exists
-        if not upload_path.exists():
-            return {
-                'success': True,
-                'message': 'No files to delete',
-                'deleted_count': 0
-            }
-            
-        # Count files before deletion
-        file_count = len(list(upload_path.glob('*.json')))
+        # All documents are removed in one transaction
+        file_count = get_document_catalog(upload_folder).delete_all()
         
         if file_count == 0:
             return {
@@ -27,14 +17,6 @@ def delete_all_files(upload_folder: str, confirm: bool = False) -> Dict[str, Any
                 'deleted_count': 0
             }
             
-        # Remove all JSON files
-        for file_path in upload_path.glob('*.json'):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"Error deleting file {file_path}: {str(e)}")
-                continue
-                
         return {
             'success': True,
             'message': f'Successfully deleted {file_count} files',
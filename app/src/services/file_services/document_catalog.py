@@ -0,0 +1,434 @@
+"""
+SQLite catalog of uploaded documents.
+
+Each document is one row: metadata columns for listing and filtering, plus
+the extracted text stored as a zlib-compressed blob that is only read when
+the document is indexed. Writes are single transactions, so a document is
+either fully visible or not at all. The catalog lives in its own
+subdirectory of the upload folder; legacy per-document JSON files found in
+the upload folder are imported once and moved to ``legacy_json/``.
+"""
+import codecs
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = "catalog"
+CATALOG_FILE = "documents.sqlite3"
+LEGACY_DIR = "legacy_json"
+COMPRESSION_LEVEL = 6
+# Compressed bytes decompressed at a time when streaming a document's text
+DECOMPRESS_BLOCK_SIZE = 64 * 1024
+
+# Columns returned by listings (content is never loaded for a listing)
+_META_COLUMNS = (
+    "id, filename, original_filename, content_type, file_extension, file_size, "
+    "sha256, num_characters, uploaded_at, metadata"
+)
+
+_catalogs: Dict[Path, "DocumentCatalog"] = {}
+_catalogs_lock = threading.Lock()
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_text(blob: Optional[bytes]) -> str:
+    return zlib.decompress(blob).decode('utf-8') if blob else ""
+
+
+def iter_decompressed_text(blob: Optional[bytes]) -> Iterator[str]:
+    """Text of a compressed blob in blocks, without ever holding the whole text."""
+    if not blob:
+        return
+    decompressor = zlib.decompressobj()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    view = memoryview(blob)
+    for start in range(0, len(view), DECOMPRESS_BLOCK_SIZE):
+        text = decoder.decode(decompressor.decompress(view[start:start + DECOMPRESS_BLOCK_SIZE]))
+        if text:
+            yield text
+    text = decoder.decode(decompressor.flush(), final=True)
+    if text:
+        yield text
+
+
+class DocumentCatalog:
+    """Transactional document store with indexed lookup by id."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # One autocommit connection per process, serialized by the lock; WAL
+        # lets readers in other worker processes proceed during writes
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    original_filename TEXT NOT NULL,
+                    content_type TEXT,
+                    file_extension TEXT,
+                    file_size INTEGER NOT NULL DEFAULT 0,
+                    sha256 TEXT,
+                    num_characters INTEGER NOT NULL DEFAULT 0,
+                    uploaded_at TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    content BLOB,
+                    page_offsets TEXT
+                );
+                CREATE INDEX IF NOT EXISTS documents_uploaded_at ON documents (uploaded_at);
+                CREATE INDEX IF NOT EXISTS documents_extension ON documents (file_extension);
+                CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256);
+                CREATE TABLE IF NOT EXISTS catalog_state (
+                    key TEXT PRIMARY KEY,
+                    value REAL NOT NULL
+                );
+                """
+            )
+            # A new catalog counts as changed now, so index snapshots older than it are stale
+            self._conn.execute(
+                "INSERT OR IGNORE INTO catalog_state (key, value) VALUES ('updated_at', ?)", (time.time(),)
+            )
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    def _touch(self, conn: sqlite3.Connection) -> None:
+        """Record the time of the last change (used to detect stale index snapshots)."""
+        conn.execute(
+            "INSERT OR REPLACE INTO catalog_state (key, value) VALUES ('updated_at', ?)",
+            (time.time(),)
+        )
+
+    def updated_at(self) -> float:
+        """Time of the last write to the catalog, 0 if it was never written."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_state WHERE key = 'updated_at'").fetchone()
+        return row[0] if row else 0.0
+
+    @staticmethod
+    def _free_id(conn: sqlite3.Connection, document_id: str) -> str:
+        """``document_id``, or ``document_id_<n>`` with the first free n if it is taken."""
+        candidate, suffix = document_id, 1
+        while conn.execute("SELECT 1 FROM documents WHERE id = ?", (candidate,)).fetchone():
+            suffix += 1
+            candidate = f"{document_id}_{suffix}"
+        return candidate
+
+    def new_id(self, original_filename: str) -> str:
+        """
+        Document id derived from the sanitized file name and upload time.
+
+        The id is only a proposal: another worker may take it before the
+        document is stored, so ``add`` checks it again in its transaction.
+        """
+        base = "".join(c if c.isalnum() or c in ' _-.' else '_' for c in original_filename)
+        if not base.strip('_.- '):
+            base = 'document'
+        stem = f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        with self._lock:
+            return self._free_id(self._conn, stem)
+
+    def add(self, document_id: str, metadata: Dict[str, Any], content_blob: bytes, num_characters: int,
+            page_offsets: Optional[List[List[int]]] = None, uploaded_at: Optional[str] = None,
+            filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Insert a document in a single transaction.
+
+        Args:
+            document_id: Id returned by ``new_id`` (or the legacy file stem)
+            metadata: Upload metadata (original_filename, content_type, file_size, ...)
+            content_blob: Extracted text compressed with ``compress_text``
+            num_characters: Length of the extracted text
+            page_offsets: ``[page number, character offset]`` pairs, if known
+            uploaded_at: ISO timestamp, now by default
+            filename: Display file name, the id by default
+
+        Returns:
+            The stored document metadata (without content). If a document with
+            the same ``sha256`` was stored meanwhile (e.g. by another worker
+            process), nothing is inserted and that document is returned instead.
+            If ``document_id`` was taken meanwhile, a numbered suffix is added
+            to it; the returned ``id`` is the one stored.
+        """
+        row = {
+            'id': document_id,
+            'filename': filename or document_id,
+            'original_filename': metadata.get('original_filename', document_id),
+            'content_type': metadata.get('content_type'),
+            'file_extension': metadata.get('file_extension'),
+            'file_size': int(metadata.get('file_size') or 0),
+            'sha256': metadata.get('sha256'),
+            'num_characters': num_characters,
+            'uploaded_at': uploaded_at or datetime.now().isoformat(),
+            'metadata': json.dumps(metadata, ensure_ascii=False),
+            'content': content_blob,
+            'page_offsets': json.dumps(page_offsets) if page_offsets else None,
+        }
+        with self._transaction() as conn:
+            if row['sha256']:
+                existing = conn.execute(
+                    f"SELECT {_META_COLUMNS} FROM documents WHERE sha256 = ? ORDER BY uploaded_at LIMIT 1",
+                    (row['sha256'],)
+                ).fetchone()
+                if existing:
+                    return self._row_to_info(existing)
+            # Checked inside the transaction: two workers may have been given the same id
+            row['id'] = self._free_id(conn, document_id)
+            if not filename:
+                row['filename'] = row['id']
+            conn.execute(
+                f"INSERT INTO documents ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                tuple(row.values())
+            )
+            self._touch(conn)
+        return self._row_to_info(row)
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata of one document (indexed lookup), None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_META_COLUMNS} FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return self._row_to_info(row) if row else None
+
+    def find_by_sha256(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the oldest document with this content hash, None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_META_COLUMNS} FROM documents WHERE sha256 = ? ORDER BY uploaded_at LIMIT 1", (sha256,)
+            ).fetchone()
+        return self._row_to_info(row) if row else None
+
+    def get_document(self, document_id: str, stream: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Full document with 'page_offsets' and its text.
+
+        The text is the decompressed 'content', or with ``stream`` an iterator
+        of decompressed blocks in 'content_blocks'.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_META_COLUMNS}, content, page_offsets FROM documents WHERE id = ?", (document_id,)
+            ).fetchone()
+        return self._row_to_document(row, stream) if row else None
+
+    def ordered_ids(self) -> List[str]:
+        """Every document id, oldest upload first (the order documents are indexed in)."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT id FROM documents ORDER BY uploaded_at, id")]
+
+    def iter_documents(self, batch_size: int = 32, ids: Optional[List[str]] = None,
+                       stream: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Every full document (or only ``ids``), oldest upload first, as returned by ``get_document``.
+
+        Documents are fetched in small batches so only a few are decompressed at a time.
+        """
+        ids = self.ordered_ids() if ids is None else ids
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {_META_COLUMNS}, content, page_offsets FROM documents "
+                    f"WHERE id IN ({', '.join('?' for _ in batch)}) ORDER BY uploaded_at, id",
+                    batch
+                ).fetchall()
+            for row in rows:
+                yield self._row_to_document(row, stream)
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, extension: Optional[str] = None,
+             name: Optional[str] = None, newest_first: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Page of document metadata and the total number of matches.
+
+        Args:
+            offset: Number of matching documents to skip
+            limit: Maximum number of documents to return (all if None)
+            extension: Only documents with this file extension
+            name: Only documents whose original file name contains this text
+            newest_first: Sort by upload time, newest first (oldest first if False)
+        """
+        where, params = [], []
+        if extension:
+            where.append("file_extension = ?")
+            params.append(extension.lower().lstrip('.'))
+        if name:
+            where.append("original_filename LIKE ? ESCAPE '\\'")
+            escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM documents {clause}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {_META_COLUMNS} FROM documents {clause} ORDER BY uploaded_at {order}, id {order} "
+                f"LIMIT ? OFFSET ?",
+                params + [limit if limit is not None else -1, offset]
+            ).fetchall()
+        return [self._row_to_info(row) for row in rows], total
+
+    def ids(self) -> Set[str]:
+        """Ids of every document (used to reconcile the search index with the catalog)."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM documents")}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def delete(self, document_id: str) -> bool:
+        """Delete one document. Returns False if it did not exist."""
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM documents WHERE id = ?", (document_id,)).rowcount
+            if deleted:
+                self._touch(conn)
+        return bool(deleted)
+
+    def delete_all(self) -> int:
+        """Delete every document. Returns the number of documents deleted."""
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM documents").rowcount
+            self._touch(conn)
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def migrate_json_files(self, upload_folder: Path) -> int:
+        """
+        Import legacy per-document JSON files into the catalog.
+
+        Files are imported in one transaction and then moved to
+        ``legacy_json/`` so the migration runs only once. Unreadable files are
+        left in place and logged.
+        """
+        upload_folder = Path(upload_folder)
+        json_files = sorted(upload_folder.glob('*.json'))
+        if not json_files:
+            return 0
+
+        imported = []
+        with self._transaction() as conn:
+            for file_path in json_files:
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"No se pudo migrar {file_path.name}: {str(e)}")
+                    continue
+                metadata = data.get('metadata', {})
+                if 'original_filename' not in metadata and 'nombre_original' in metadata:
+                    metadata['original_filename'] = metadata['nombre_original']
+                content = data.get('content', data.get('contenido', ''))
+                document_id = data.get('id') or file_path.stem
+                conn.execute(
+                    "INSERT OR IGNORE INTO documents (id, filename, original_filename, content_type, file_extension, "
+                    "file_size, sha256, num_characters, uploaded_at, metadata, content, page_offsets) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        document_id,
+                        data.get('filename', file_path.name),
+                        metadata.get('original_filename', file_path.name),
+                        metadata.get('content_type'),
+                        metadata.get('file_extension'),
+                        int(metadata.get('file_size') or 0),
+                        metadata.get('sha256'),
+                        len(content),
+                        data.get('uploaded_at') or datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
+                        json.dumps(metadata, ensure_ascii=False),
+                        compress_text(content),
+                        json.dumps(data['page_offsets']) if data.get('page_offsets') else None,
+                    )
+                )
+                imported.append(file_path)
+            if imported:
+                self._touch(conn)
+
+        legacy_dir = upload_folder / LEGACY_DIR
+        legacy_dir.mkdir(exist_ok=True)
+        for file_path in imported:
+            shutil.move(str(file_path), str(legacy_dir / file_path.name))
+        logger.info(f"Migrados {len(imported)} documentos JSON al catálogo {self.path}")
+        return len(imported)
+
+    @staticmethod
+    def _row_to_info(row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'original_filename': row['original_filename'],
+            'content_type': row['content_type'],
+            'file_extension': row['file_extension'],
+            'file_size': row['file_size'],
+            'sha256': row['sha256'],
+            'num_characters': row['num_characters'],
+            'uploaded_at': row['uploaded_at'],
+            'metadata': json.loads(row['metadata']) if isinstance(row['metadata'], str) else row['metadata'],
+        }
+
+    @classmethod
+    def _row_to_document(cls, row, stream: bool = False) -> Dict[str, Any]:
+        document = cls._row_to_info(row)
+        if stream:
+            document['content_blocks'] = iter_decompressed_text(row['content'])
+        else:
+            document['content'] = decompress_text(row['content'])
+        document['page_offsets'] = json.loads(row['page_offsets']) if row['page_offsets'] else None
+        return document
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` (``ROLLBACK`` on error) under the catalog lock."""
+
+    def __init__(self, catalog: DocumentCatalog):
+        self.catalog = catalog
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.catalog._lock.acquire()
+        try:
+            self.catalog._conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.catalog._lock.release()
+            raise
+        return self.catalog._conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.catalog._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.catalog._lock.release()
+
+
+def get_document_catalog(upload_folder) -> DocumentCatalog:
+    """
+    Catalog of an upload folder, opened once per process.
+
+    The first call also imports any legacy JSON documents left in the folder.
+    """
+    upload_folder = Path(upload_folder).resolve()
+    catalog = _catalogs.get(upload_folder)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(upload_folder)
+            if catalog is None:
+                catalog = DocumentCatalog(upload_folder / CATALOG_DIR / CATALOG_FILE)
+                catalog.migrate_json_files(upload_folder)
+                _catalogs[upload_folder] = catalog
+    return catalog
@@ -1,23 +1,32 @@
 import io
 import PyPDF2
+from typing import BinaryIO, Iterator, Tuple, Union
 
-def extract_text_from_pdf(content: bytes) -> str:
+def iter_pdf_pages(content: Union[bytes, memoryview, BinaryIO]) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) for every PDF page with extractable text.
+    
+    Pages are extracted one at a time, so only the current page's text is
+    held in memory. Page numbers start at 1.
+    """
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-        text_parts = []
-        
-        for page in pdf_reader.pages:
-            try:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-            except Exception as e:
-                print(f"Warning: Error extracting text from a page: {str(e)}")
-                continue
-        
-        return "\n\n".join(text_parts).strip()
-        
+        # Seekable streams (e.g. an mmap of the upload) are read in place
+        stream = content if hasattr(content, 'read') else io.BytesIO(content)
+        pdf_reader = PyPDF2.PdfReader(stream)
+        pages = pdf_reader.pages
     except Exception as e:
         error_msg = f"Error extracting text from PDF: {str(e)}"
         print(error_msg)
         raise Exception(error_msg)
+    
+    for page_number, page in enumerate(pages, start=1):
+        try:
+            page_text = page.extract_text()
+        except Exception as e:
+            print(f"Warning: Error extracting text from page {page_number}: {str(e)}")
+            continue
+        if page_text:
+            yield page_number, page_text
+
+def extract_text_from_pdf(content: Union[bytes, memoryview, BinaryIO]) -> str:
+    return "\n\n".join(text for _, text in iter_pdf_pages(content)).strip()
@@ -1,47 +1,44 @@
-import json
-import aiofiles
-import os
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-async def list_uploaded_files(upload_folder: str) -> List[Dict[str, Any]]:
-    try:
-        files = []
-        upload_path = Path(upload_folder)
+from .document_catalog import get_document_catalog
+
+def list_uploaded_files(upload_folder: str, page: int = 1, page_size: Optional[int] = None,
+                        extension: Optional[str] = None,
+                        search: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    List uploaded documents from the catalog, newest first.
+    
+    Only metadata columns are read; document contents are never decompressed.
+    
+    Args:
+        upload_folder: Path to the upload directory
+        page: 1-based page number
+        page_size: Documents per page (all documents if None)
+        extension: Only documents with this file extension (e.g. 'pdf')
+        search: Only documents whose original file name contains this text
         
-        # Ensure the directory exists
-        if not upload_path.exists():
-            return []
-            
-        # Scan for JSON files
-        for file_path in upload_path.glob('*.json'):
-            try:
-                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    file_data = json.loads(content)
-                    
-                # Map to frontend's expected structure
-                metadata = file_data.get('metadata', {})
-                file_info = {
-                    'id': file_data.get('id', file_path.stem),
-                    'name': file_data.get('filename', file_path.name),  # Frontend expects 'name'
-                    'path': str(file_path),
-                    'upload_date': file_data.get('uploaded_at'),  # Frontend expects 'upload_date'
-                    'content_type': metadata.get('content_type', 'application/octet-stream'),
-                    'size': metadata.get('file_size', 0),  # Frontend expects 'size'
-                    'num_characters': len(file_data.get('content', '')),  # Frontend expects 'num_characters'
-                    'metadata': metadata
-                }
-                files.append(file_info)
-                
-            except (json.JSONDecodeError, IOError, OSError) as e:
-                print(f"Error reading file {file_path}: {str(e)}")
-                continue
-                
-        # Sort by upload time (newest first)
-        files.sort(key=lambda x: x.get('uploaded_at', ''), reverse=True)
+    Returns:
+        Tuple of (documents in the page, total number of matching documents)
+    """
+    try:
+        catalog = get_document_catalog(upload_folder)
+        offset = (max(page, 1) - 1) * page_size if page_size else 0
+        documents, total = catalog.list(offset=offset, limit=page_size, extension=extension, name=search)
         
-        return files
+        # Map to frontend's expected structure
+        files = [
+            {
+                'id': document['id'],
+                'name': document['filename'],  # Frontend expects 'name'
+                'upload_date': document['uploaded_at'],  # Frontend expects 'upload_date'
+                'content_type': document['content_type'] or 'application/octet-stream',
+                'size': document['file_size'],  # Frontend expects 'size'
+                'num_characters': document['num_characters'],  # Frontend expects 'num_characters'
+                'metadata': document['metadata']
+            }
+            for document in documents
+        ]
+        return files, total
         
     except Exception as e:
         error_msg = f"Error listing files: {str(e)}"
@@ -1,58 +1,99 @@
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
 from fastapi import UploadFile, HTTPException, status
 
-from .extract_text import extract_text_from_pdf
-from .save_document import save_document
-from .is_extension_allowed import is_extension_allowed
+from .extract_text import iter_pdf_pages
+from .save_document import save_document, save_document_pages
+from .is_extension_allowed import is_extension_allowed, ALLOWED_EXTENSIONS
+from .stream_upload import discard_upload, stream_upload, map_upload
+from .document_catalog import get_document_catalog
 
 MAX_FILE_SIZE = 1024 * 1024 * 1024  # 1GB
 
+def validate_upload(file: UploadFile) -> None:
+    if not file.filename or not is_extension_allowed(file.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+def upload_metadata(filename: str, content_type: Optional[str], file_size: int, sha256: str) -> Dict[str, Any]:
+    return {
+        'original_filename': filename,
+        'content_type': content_type,
+        'file_size': file_size,
+        'file_extension': filename.rsplit('.', 1)[1].lower(),
+        'sha256': sha256
+    }
+
+def _count_pages(pages: Iterable[Tuple[int, str]], on_page: Callable[[int], None]) -> Iterator[Tuple[int, str]]:
+    for page in pages:
+        yield page
+        on_page(page[0])
+
+def extract_and_save(upload_folder: str, metadata: Dict[str, Any], content,
+                     on_page: Optional[Callable[[int], None]] = None) -> Tuple[str, int]:
+    """
+    Extract the text of an upload and store it in the document catalog.
+    
+    Args:
+        upload_folder: Path to the upload directory
+        metadata: Metadata built by ``upload_metadata``
+        content: Buffer with the uploaded bytes (bytes, memoryview or mmap)
+        on_page: Called with the page number after each PDF page is extracted
+        
+    Returns:
+        Tuple of (document id, number of characters extracted)
+    """
+    if metadata['file_extension'] == 'pdf':
+        pages = iter_pdf_pages(content)
+        if on_page is not None:
+            pages = _count_pages(pages, on_page)
+        # Pages are extracted and compressed one at a time, never joined in memory
+        return save_document_pages(upload_folder, metadata, pages)
+    
+    text = str(content, 'utf-8') if metadata['file_extension'] == 'txt' else ""
+    return save_document(upload_folder, metadata, text), len(text)
+
 async def process_uploaded_file(upload_folder: str, file: UploadFile) -> Dict[str, Any]:
     try:
-        # Validate file
-        if not file.filename or not is_extension_allowed(file.filename):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
+        validate_upload(file)
             
-        # Read file content
-        content = await file.read()
-        
-        # Validate file size
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE} bytes"
-            )
-        
-        # Process based on file type
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
+        # Stream to a temp file in blocks, hashing and enforcing the size limit
+        upload, file_size, sha256 = await stream_upload(file, MAX_FILE_SIZE)
         
-        if file_extension == 'pdf':
-            text = extract_text_from_pdf(content)
-        elif file_extension == 'txt':
-            text = content.decode('utf-8')
-        else:
-            text = ""
+        # Same content already stored: return that document without extracting, saving or reindexing
+        existing = get_document_catalog(upload_folder).find_by_sha256(sha256)
+        if existing is not None:
+            discard_upload(upload)
+            return {
+                'success': True,
+                'message': f"File already uploaded as {existing['original_filename']}",
+                'filename': file.filename,
+                'document_id': existing['id'],
+                'content_type': file.content_type,
+                'file_size': file_size,
+                'content_length': existing['num_characters'],
+                'deduplicated': True
+            }
         
-        # Prepare metadata
-        metadata = {
-            'original_filename': file.filename,
-            'content_type': file.content_type,
-            'file_size': len(content),
-            'file_extension': file_extension
-        }
+        metadata = upload_metadata(file.filename, file.content_type, file_size, sha256)
         
-        # Save the processed document
-        file_path = save_document(upload_folder, metadata, text)
+        # Read the upload through mmap instead of a bytes copy
+        try:
+            with map_upload(upload) as content:
+                document_id, content_length = extract_and_save(upload_folder, metadata, content)
+        finally:
+            discard_upload(upload)
         
         return {
             'success': True,
             'message': 'File processed successfully',
             'filename': file.filename,
-            'file_path': file_path,
-            'content_length': len(text)
+            'document_id': document_id,
+            'content_type': file.content_type,
+            'file_size': file_size,
+            'content_length': content_length,
+            'deduplicated': False
         }
         
     except HTTPException:
@@ -1,46 +1,70 @@
-import json
-import os
-from datetime import datetime
-from pathlib import Path
-from typing import Any, Dict
+import zlib
+from typing import Any, Dict, Iterable, Tuple
+
+from .document_catalog import COMPRESSION_LEVEL, compress_text, get_document_catalog
 
 def save_document(upload_folder: str, metadata: Dict[str, Any], content: str) -> str:
+    """
+    Store a document in the upload folder's catalog in a single transaction.
+    
+    Returns:
+        Id of the stored document
+    """
     try:
-        # Ensure the upload directory exists
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Get original filename and clean it
-        original_filename = metadata.get('original_filename', 'document')
-        
-        # Remove extension and clean the base name
-        base_name, ext = os.path.splitext(original_filename)
-        safe_base = "".join(c if c.isalnum() or c in ' _-.' else '_' for c in base_name)
-        safe_ext = "".join(c.lower() for c in ext if c.isalnum() or c in '_.')
+        catalog = get_document_catalog(upload_folder)
+        document_id = catalog.new_id(metadata.get('original_filename', 'document'))
+        return catalog.add(document_id, metadata, compress_text(content), len(content))['id']
         
-        # Reconstruct filename with cleaned components
-        safe_filename = f"{safe_base}{safe_ext}"
-        
-        # If the filename is empty after cleaning, use a default
-        if not safe_filename.strip('_.- '):
-            safe_filename = 'document'
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = Path(upload_folder) / f"{safe_filename}_{timestamp}.json"
+    except Exception as e:
+        error_msg = f"Error saving document: {str(e)}"
+        print(error_msg)
+        raise Exception(error_msg)
+
+def save_document_pages(upload_folder: str, metadata: Dict[str, Any],
+                        pages: Iterable[Tuple[int, str]]) -> Tuple[str, int]:
+    """
+    Store a document whose text arrives page by page, without joining the pages in memory.
+    
+    The text is compressed incrementally and is identical to
+    ``"\\n\\n".join(pages).strip()``. ``page_offsets`` pairs of
+    ``[page number, character offset in content]`` are stored next to it so
+    chunks can be traced back to their page.
+    
+    Returns:
+        Tuple of (document id, number of characters in content)
+    """
+    try:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        parts = []
+        page_offsets = []
+        length = 0
+        pending_ws = ''         # Trailing whitespace is only written if more text follows
+        separator = ''
         
-        # Prepare document data
-        document = {
-            'id': str(file_path.stem),
-            'filename': str(file_path.name),
-            'path': str(file_path),
-            'uploaded_at': datetime.now().isoformat(),
-            'metadata': metadata,
-            'content': content
-        }
+        for page_number, page_text in pages:
+            piece = separator + page_text
+            separator = '\n\n'
+            if length == 0:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                start = 0
+            else:
+                start = length + len(pending_ws) + (len(piece) - len(page_text))
+                piece = pending_ws + piece
+            stripped = piece.rstrip()
+            pending_ws = piece[len(stripped):]
+            if not stripped:
+                continue
+            page_offsets.append([page_number, start])
+            parts.append(compressor.compress(stripped.encode('utf-8')))
+            length += len(stripped)
+        parts.append(compressor.flush())
         
-        # Save to file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(document, f, ensure_ascii=False, indent=2)
-            
-        return str(file_path)
+        catalog = get_document_catalog(upload_folder)
+        document_id = catalog.new_id(metadata.get('original_filename', 'document'))
+        stored = catalog.add(document_id, metadata, b''.join(parts), length, page_offsets=page_offsets)
+        return stored['id'], stored['num_characters']
         
     except Exception as e:
         error_msg = f"Error saving document: {str(e)}"
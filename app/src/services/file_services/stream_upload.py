@@ -0,0 +1,118 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Tuple, Union
+
+from fastapi import UploadFile, HTTPException, status
+
+CHUNK_SIZE = 1024 * 1024              # 1MB per read
+
+
+def size_limit_error(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File size exceeds maximum allowed size of {max_size} bytes"
+    )
+
+
+async def stream_upload(file: UploadFile, max_size: int, directory: Optional[Path] = None) -> Tuple[IO[bytes], int, str]:
+    """
+    Copy an upload into a named temporary file in fixed-size blocks.
+    
+    The SHA-256 digest is computed on the fly and the copy is aborted as soon
+    as the size limit is crossed, so an oversized upload is never fully read.
+    The file is created in ``directory`` (the system temporary directory by
+    default), so ``stage_upload`` can move it into place without copying.
+    
+    Args:
+        file: Uploaded file
+        max_size: Maximum allowed size in bytes
+        directory: Directory for the temporary file, on the staging filesystem
+        
+    Returns:
+        Tuple with the temporary file (positioned at the start), its size and
+        its SHA-256 hex digest. The caller must release it with ``discard_upload``
+        unless it was staged.
+        
+    Raises:
+        HTTPException: If the file is larger than ``max_size``
+    """
+    # Reject early when the size is already known from the multipart headers
+    if file.size is not None and file.size > max_size:
+        raise size_limit_error(max_size)
+    
+    if directory is not None:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    upload = tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            block = await file.read(CHUNK_SIZE)
+            if not block:
+                break
+            size += len(block)
+            if size > max_size:
+                raise size_limit_error(max_size)
+            digest.update(block)
+            upload.write(block)
+        upload.flush()
+    except BaseException:
+        discard_upload(upload)
+        raise
+    
+    upload.seek(0)
+    return upload, size, digest.hexdigest()
+
+
+def discard_upload(upload: IO[bytes]) -> None:
+    """Close a streamed upload and delete its temporary file (if it was not staged)."""
+    upload.close()
+    Path(upload.name).unlink(missing_ok=True)
+
+
+@contextmanager
+def map_upload(upload: IO[bytes]) -> Iterator[Union[mmap.mmap, memoryview]]:
+    """Zero-copy, read-only memory map of a streamed upload."""
+    if os.fstat(upload.fileno()).st_size == 0:
+        # mmap cannot map an empty file
+        yield memoryview(b'')
+        return
+    mapped = mmap.mmap(upload.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def stage_upload(upload: IO[bytes], path: Path) -> None:
+    """
+    Move a streamed upload to ``path`` and close it.
+    
+    The upload was written next to ``path`` (see ``stream_upload``), so this is
+    a rename: the body is written to disk once.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    upload.close()
+    try:
+        os.replace(upload.name, path)
+    except BaseException:
+        Path(upload.name).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def map_file(path: Path) -> Iterator[Union[mmap.mmap, memoryview]]:
+    """Read-only memory map of a staged upload."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b'')
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
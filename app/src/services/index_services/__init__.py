@@ -0,0 +1,37 @@
+from .segment_index import (
+    HashedTerms,
+    IndexView,
+    Segment,
+    SegmentedIndex,
+    TermDictionary,
+    count_terms,
+    merge_segments,
+    merge_term_counts,
+    smoothed_idf,
+)
+from .bm25 import Bm25Postings, bm25_search
+from .embeddings import EmbeddingStore, content_hash, segment_embeddings, segment_rows
+from .snapshot import ChunkStore, MappedTermDictionary, load_snapshot, read_manifest, save_snapshot
+
+__all__ = [
+    'HashedTerms',
+    'IndexView',
+    'Segment',
+    'SegmentedIndex',
+    'TermDictionary',
+    'count_terms',
+    'merge_segments',
+    'merge_term_counts',
+    'smoothed_idf',
+    'Bm25Postings',
+    'bm25_search',
+    'EmbeddingStore',
+    'content_hash',
+    'segment_embeddings',
+    'segment_rows',
+    'ChunkStore',
+    'MappedTermDictionary',
+    'load_snapshot',
+    'read_manifest',
+    'save_snapshot',
+]
@@ -0,0 +1,242 @@
+"""
+BM25 ranking over the segmented index with block-max early termination.
+
+Postings come from the same raw term counts the TF-IDF path uses: the
+column-major (CSC) view of a segment is a term -> (rows, term frequencies)
+inverted index. Postings are cut into blocks aligned to fixed row windows,
+and each block stores the largest term frequency and the shortest document
+it contains. Those two values give an upper bound of the BM25 contribution
+of any row in the block that stays valid for every ``avgdl``, so it does
+not have to be recomputed when documents are added or deleted.
+
+At query time the per-window upper bounds of all query terms are summed and
+windows are scored in decreasing bound order. Once the bound of the next
+window cannot beat the current k-th best score, the remaining windows are
+skipped without scoring any of their rows. This is block-max WAND's pruning
+rule applied to whole row windows, which keeps the inner loop in NumPy.
+
+Snapshots store these arrays (see ``snapshot.py``), so processes that map a
+snapshot share its postings through the page cache instead of each building
+a CSC copy of the counts.
+"""
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .segment_index import IndexView, Segment
+
+
+def posting_blocks(indptr: np.ndarray, rows: np.ndarray, tfs: np.ndarray, doc_len: np.ndarray,
+                   block_size: int, n_windows: int) -> Dict[str, np.ndarray]:
+    """
+    Block-max arrays of the postings of consecutive terms.
+
+    Args:
+        indptr: Postings of every term, in the layout of a CSC ``indptr``
+        rows, tfs: Rows (sorted within each term) and term frequencies of the postings
+        doc_len: Length of every row of the segment
+        block_size: Rows per window
+        n_windows: Number of windows of the segment
+
+    Returns:
+        Dict with ``block_start``/``block_end`` (posting range of every block),
+        ``block_window``, ``block_max_tf``, ``block_min_dl`` and ``term_blocks``
+        (blocks of every term, in the same layout as ``indptr``)
+    """
+    # One block per (term, row window) present in the postings
+    cols = np.repeat(np.arange(indptr.size - 1), np.diff(indptr))
+    windows = np.asarray(rows, dtype=np.int64) // block_size
+    keys = cols * n_windows + windows
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if keys.size else np.zeros(0, dtype=np.int64)
+    return {
+        'block_start': starts,
+        'block_end': np.r_[starts[1:], keys.size].astype(np.int64) if starts.size else np.zeros(0, dtype=np.int64),
+        'block_window': windows[starts],
+        'block_max_tf': np.maximum.reduceat(tfs, starts).astype(np.float64) if starts.size else np.zeros(0),
+        'block_min_dl': np.minimum.reduceat(doc_len[rows], starts) if starts.size else np.zeros(0),
+        'term_blocks': np.searchsorted(cols[starts], np.arange(indptr.size)),
+    }
+
+
+class Bm25Postings:
+    """Block-max inverted index of one segment."""
+
+    def __init__(self, block_size: int, n_windows: int, rows: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, blocks: Dict[str, np.ndarray]):
+        self.block_size = block_size
+        self.n_windows = n_windows
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.block_start = blocks['block_start']
+        self.block_end = blocks['block_end']
+        self.block_window = blocks['block_window']
+        self.block_max_tf = blocks['block_max_tf']
+        self.block_min_dl = blocks['block_min_dl']
+        self.term_blocks = blocks['term_blocks']
+
+    @classmethod
+    def from_segment(cls, segment: Segment, block_size: int) -> 'Bm25Postings':
+        """Postings built from the counts of an in-memory segment."""
+        csc = segment.counts.tocsc()
+        csc.sort_indices()
+        rows = csc.indices.astype(np.int64)
+        tfs = csc.data.astype(np.float64)
+        doc_len = np.asarray(segment.counts.sum(axis=1), dtype=np.float64).ravel()
+        n_windows = max(1, -(-segment.n_rows // block_size))
+        blocks = posting_blocks(csc.indptr, rows, tfs, doc_len, block_size, n_windows)
+        return cls(block_size, n_windows, rows, tfs, doc_len, blocks)
+
+    def term_range(self, term_id: int) -> Tuple[int, int]:
+        if term_id + 1 >= self.term_blocks.size:
+            return 0, 0
+        return int(self.term_blocks[term_id]), int(self.term_blocks[term_id + 1])
+
+
+def get_postings(segment: Segment, block_size: int) -> Bm25Postings:
+    """
+    Postings are derived from immutable counts, so they are shared by every version of a segment.
+
+    Segments loaded from a snapshot come with their postings already mapped
+    from disk for the block size the snapshot was written with.
+    """
+    key = ('bm25', block_size)
+    postings = segment._shared.get(key)
+    if postings is None:
+        postings = Bm25Postings.from_segment(segment, block_size)
+        segment._shared[key] = postings
+    return postings
+
+
+def _saturation(tf: np.ndarray, doc_len: np.ndarray, avgdl: float, k1: float, b: float) -> np.ndarray:
+    return tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avgdl))
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of ``arange(start, end)`` for every pair, without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+    return np.arange(total) + offsets
+
+
+def bm25_search(
+    view: IndexView,
+    query: str,
+    k: int,
+    k1: float = 1.2,
+    b: float = 0.75,
+    block_size: int = 256,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Top-k BM25 search over every live segment of ``view``.
+
+    Args:
+        view: Pinned index view
+        query: Query text, tokenized with the index analyzer
+        k: Number of best rows to return
+        k1, b: BM25 parameters
+        block_size: Rows per block-max window
+
+    Returns:
+        Tuple of (global row ids best first, their scores normalized to 0-1,
+        total number of live rows matching at least one query term)
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0), 0)
+    if not view.segments or k <= 0:
+        return empty
+
+    query_terms: Dict[int, int] = {}
+    for term, count in Counter(view.analyzer(query)).items():
+        term_id = view.terms.get(term)
+        if term_id is not None and term_id < view.vocab_size and view.df[term_id] > 0:
+            query_terms[term_id] = count
+    if not query_terms:
+        return empty
+
+    n_live = view.n_live
+    live_len = sum(float(get_postings(s, block_size).doc_len[~s.deleted].sum()) for s in view.segments)
+    avgdl = live_len / n_live if n_live else 1.0
+    idf = {
+        t: qtf * float(np.log(1 + (n_live - view.df[t] + 0.5) / (view.df[t] + 0.5)))
+        for t, qtf in query_terms.items()
+    }
+    # Best possible score of a row, used to report scores between 0 and 1
+    max_score = sum(w * (k1 + 1) for w in idf.values())
+
+    # Upper bound of every (segment, window) and the total number of matches
+    windows: List[Tuple[float, int, int]] = []
+    total = 0
+    offsets = np.cumsum([0] + [s.n_rows for s in view.segments])
+    for seg_pos, segment in enumerate(view.segments):
+        postings = get_postings(segment, block_size)
+        bounds = np.zeros(postings.n_windows)
+        matched = np.zeros(segment.n_rows, dtype=bool)
+        for t, weight in idf.items():
+            lo, hi = postings.term_range(t)
+            if lo == hi:
+                continue
+            bound = weight * _saturation(
+                postings.block_max_tf[lo:hi], postings.block_min_dl[lo:hi], avgdl, k1, b
+            )
+            np.add.at(bounds, postings.block_window[lo:hi], bound)
+            matched[postings.rows[postings.block_start[lo]:postings.block_end[hi - 1]]] = True
+        total += int((matched & ~segment.deleted).sum())
+        for window in np.flatnonzero(bounds):
+            windows.append((float(bounds[window]), seg_pos, int(window)))
+
+    windows.sort(key=lambda w: -w[0])
+
+    top_rows = np.zeros(0, dtype=np.int64)
+    top_scores = np.zeros(0)
+    threshold = 0.0
+    position = 0
+    batch = 8
+    while position < len(windows):
+        # Block-max pruning: no remaining window can beat the current k-th score
+        if top_rows.size >= k and windows[position][0] < threshold:
+            break
+        current = windows[position:position + batch]
+        position += len(current)
+        batch *= 2
+
+        by_segment: Dict[int, List[int]] = {}
+        for _, seg_pos, window in current:
+            by_segment.setdefault(seg_pos, []).append(window)
+
+        for seg_pos, seg_windows in by_segment.items():
+            segment = view.segments[seg_pos]
+            postings = get_postings(segment, block_size)
+            seg_windows = np.asarray(seg_windows)
+            rows_parts, score_parts = [], []
+            for t, weight in idf.items():
+                lo, hi = postings.term_range(t)
+                if lo == hi:
+                    continue
+                blocks = lo + np.flatnonzero(np.isin(postings.block_window[lo:hi], seg_windows))
+                if blocks.size == 0:
+                    continue
+                idx = _ranges(postings.block_start[blocks], postings.block_end[blocks])
+                rows = postings.rows[idx]
+                rows_parts.append(rows)
+                score_parts.append(weight * _saturation(postings.tfs[idx], postings.doc_len[rows], avgdl, k1, b))
+            if not rows_parts:
+                continue
+
+            rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            live = ~segment.deleted[rows]
+            top_rows = np.concatenate([top_rows, rows[live] + offsets[seg_pos]])
+            top_scores = np.concatenate([top_scores, scores[live]])
+
+        if top_rows.size > k:
+            keep = np.lexsort((top_rows, -top_scores))[:k]
+            top_rows, top_scores = top_rows[keep], top_scores[keep]
+        if top_rows.size >= k:
+            threshold = float(top_scores.min())
+
+    order = np.lexsort((top_rows, -top_scores))
+    return top_rows[order], top_scores[order] / max_score, total
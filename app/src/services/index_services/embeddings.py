@@ -0,0 +1,289 @@
+"""
+Persistent chunk embedding store keyed by content hash.
+
+Vectors are appended to flat binary files (``hashes.bin`` with 16-byte
+BLAKE2b digests of the chunk text, ``vectors.bin`` with float32 rows) and
+memory-mapped on load. Because the key is the chunk content, rebuilding the
+index, merging segments or re-uploading an unchanged document never
+re-embeds a chunk that was already embedded.
+
+Deleted chunks leave their vectors behind until ``compact`` rewrites the
+store with the live ones. The rewrite goes to a new epoch of files
+(``hashes.<epoch>.bin``...) recorded in ``meta.json``, so other processes
+keep reading their mapping of the previous files until they re-map.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .segment_index import Segment
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+# Rows copied per write when a compaction rewrites the vectors file
+COMPACT_BATCH = 65536
+
+EmbedFn = Callable[[List[str]], np.ndarray]
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+class EmbeddingStore:
+    """Memory-mapped map from chunk content hash to embedding, appended to and compacted."""
+
+    def __init__(self, directory: Path, model_name: str):
+        safe_model = re.sub(r'[^\w.-]+', '_', model_name)
+        self.directory = Path(directory) / safe_model
+        self.model_name = model_name
+        self.dim: Optional[int] = None
+        self.epoch = 0
+        self._rows: Dict[bytes, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._load()
+
+    def path(self, name: str) -> Path:
+        """File ``name`` of the current epoch (epoch 0 keeps the plain names)."""
+        if not self.epoch:
+            return self.directory / name
+        stem, _, suffix = name.partition('.')
+        return self.directory / f"{stem}.{self.epoch}.{suffix}"
+
+    @property
+    def _hashes_path(self) -> Path:
+        return self.path('hashes.bin')
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path('vectors.bin')
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / 'meta.json'
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta if 'dim' in meta else None
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path.with_name(self._meta_path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'model': self.model_name, 'epoch': self.epoch}, f)
+        os.replace(tmp, self._meta_path)
+
+    def _load(self) -> None:
+        meta = self._read_meta()
+        if meta is None:
+            return
+        self.dim = meta['dim']
+        self.epoch = meta.get('epoch', 0)
+
+        try:
+            hashes = np.fromfile(self._hashes_path, dtype=np.uint8) if self._hashes_path.exists() else np.zeros(0, dtype=np.uint8)
+            # A crash between the two appends can leave one file longer than the other
+            count = min(hashes.size // DIGEST_SIZE, self._vectors_path.stat().st_size // (4 * self.dim) if self._vectors_path.exists() else 0)
+        except OSError:
+            # Files of an epoch another process just replaced: empty until the next refresh
+            hashes, count = np.zeros(0, dtype=np.uint8), 0
+        hashes = hashes[:count * DIGEST_SIZE].reshape(count, DIGEST_SIZE)
+        self._rows = {hashes[i].tobytes(): i for i in range(count)}
+        self._map_vectors(count)
+        logger.info(f"Loaded {count} cached embeddings from {self.directory}")
+
+    def refresh(self) -> int:
+        """
+        Pick up embeddings appended by another process since the store was loaded.
+
+        Vectors are appended before their digests, so every digest read here
+        already has its vector on disk. After a compaction in another process
+        (a new epoch in ``meta.json``) the store is mapped again from scratch.
+        Returns the number of new rows.
+        """
+        with self._lock:
+            meta = self._read_meta()
+            if self.dim is None or (meta is not None and meta.get('epoch', 0) != self.epoch):
+                self._rows = {}
+                self._load()
+                return len(self._rows)
+            if not self._hashes_path.exists() or not self._vectors_path.exists():
+                return 0
+            start = len(self._rows)
+            count = min(self._hashes_path.stat().st_size // DIGEST_SIZE,
+                        self._vectors_path.stat().st_size // (4 * self.dim))
+            if count <= start:
+                return 0
+            with open(self._hashes_path, 'rb') as f:
+                f.seek(start * DIGEST_SIZE)
+                raw = f.read((count - start) * DIGEST_SIZE)
+            for i in range(count - start):
+                self._rows.setdefault(raw[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE], start + i)
+            self._map_vectors(count)
+            return count - start
+
+    def _map_vectors(self, count: int) -> None:
+        if count == 0:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        else:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(count, self.dim))
+
+    def lookup(self, digests: Sequence[bytes]) -> np.ndarray:
+        """Row of every digest in the store, -1 when missing."""
+        return np.fromiter((self._rows.get(d, -1) for d in digests), dtype=np.int64, count=len(digests))
+
+    def locate(self, digests: Sequence[bytes]) -> Tuple[np.ndarray, int]:
+        """Rows of the digests (see ``lookup``) and the epoch they belong to."""
+        with self._lock:
+            return self.lookup(digests), self.epoch
+
+    def fetch(self, digests: Sequence[bytes]) -> Optional[Tuple[np.ndarray, np.ndarray, int]]:
+        """
+        Rows, vectors and epoch of the digests, None if one is missing.
+
+        Read under the lock, so a compaction cannot renumber the rows between
+        the lookup and the read of the vectors.
+        """
+        with self._lock:
+            rows = self.lookup(digests)
+            if (rows < 0).any():
+                return None
+            matrix = self.vectors(rows) if len(rows) else np.zeros((0, self.dim or 0), dtype=np.float32)
+            return rows, matrix, self.epoch
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def add(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        """Append new embeddings and make them visible to lookups."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._write_meta()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+            new = [(d, v) for d, v in zip(digests, vectors) if d not in self._rows]
+            if not new:
+                return
+            with open(self._vectors_path, 'ab') as f:
+                np.stack([v for _, v in new]).tofile(f)
+            with open(self._hashes_path, 'ab') as f:
+                f.write(b''.join(d for d, _ in new))
+            start = len(self._rows)
+            for i, (digest, _) in enumerate(new):
+                self._rows[digest] = start + i
+            self._map_vectors(len(self._rows))
+
+    def compact(self, live_rows: np.ndarray, keep_from: int) -> np.ndarray:
+        """
+        Rewrite the store with the live rows only, as a new epoch of files.
+
+        Args:
+            live_rows: Rows still used by the index
+            keep_from: Rows from this one on were added after ``live_rows`` was
+                computed and are kept as well
+
+        Returns:
+            New row of every old row, -1 for the dropped ones
+        """
+        with self._lock:
+            count = len(self._rows)
+            keep = np.zeros(count, dtype=bool)
+            live_rows = np.asarray(live_rows, dtype=np.int64)
+            keep[live_rows[(live_rows >= 0) & (live_rows < count)]] = True
+            keep[keep_from:] = True
+            kept = np.flatnonzero(keep)
+            mapping = np.full(count, -1, dtype=np.int64)
+            mapping[kept] = np.arange(kept.size)
+
+            digests: List[bytes] = [b''] * count
+            for digest, row in self._rows.items():
+                digests[row] = digest
+            old_paths = (self._hashes_path, self._vectors_path)
+            self.epoch += 1
+            with open(self._vectors_path, 'wb') as f:
+                for start in range(0, kept.size, COMPACT_BATCH):
+                    np.asarray(self._vectors[kept[start:start + COMPACT_BATCH]], dtype=np.float32).tofile(f)
+            with open(self._hashes_path, 'wb') as f:
+                f.write(b''.join(digests[row] for row in kept))
+            # The new epoch becomes visible to other processes only once its files are complete
+            self._write_meta()
+
+            self._rows = {digests[row]: i for i, row in enumerate(kept)}
+            self._map_vectors(kept.size)
+            for path in old_paths:
+                # Mappings of other processes keep the data of a removed file alive
+                path.unlink(missing_ok=True)
+            logger.info(f"Compacted embeddings: dropped {count - kept.size} of {count} rows")
+            return mapping
+
+
+def segment_embeddings(segment: Segment, store: EmbeddingStore, embed: EmbedFn, batch_size: int = 64) -> np.ndarray:
+    """
+    Embedding matrix of every row of a segment (L2-normalized, float32).
+
+    Rows already in the store are reused; only new chunk contents are embedded,
+    in batches. The matrix is cached on the segment, so every version of the
+    segment (after tombstoning) shares it.
+    """
+    cached = segment._shared.get('dense')
+    if cached is not None:
+        return cached
+
+    digests = [content_hash(meta['text']) for meta in segment.metadata]
+    fetched = None
+    while fetched is None:
+        missing = np.flatnonzero(store.lookup(digests) < 0)
+        if missing.size:
+            # Several rows may share a content; embed each distinct text once
+            pending: Dict[bytes, str] = {}
+            for i in missing:
+                pending.setdefault(digests[i], segment.metadata[i]['text'])
+            keys = list(pending)
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                store.add(batch, embed([pending[k] for k in batch]))
+        # None when a compaction dropped rows of a stale view in between: embed them again
+        fetched = store.fetch(digests)
+
+    rows, matrix, epoch = fetched
+    # Store rows double as vector ids for the ANN index
+    segment._shared['dense_digests'] = digests
+    segment._shared['dense_rows'] = (epoch, rows)
+    segment._shared['dense'] = matrix
+    return matrix
+
+
+def segment_rows(segment: Segment, store: EmbeddingStore) -> Optional[np.ndarray]:
+    """
+    Store row of every row of a segment, None if it is not embedded yet.
+
+    Rows are looked up again once a compaction renumbered the store; the
+    chunks it dropped (deleted in the current view) get -1.
+    """
+    cached = segment._shared.get('dense_rows')
+    if cached is None:
+        return None
+    epoch, rows = cached
+    if epoch != store.epoch:
+        rows, epoch = store.locate(segment._shared['dense_digests'])
+        segment._shared['dense_rows'] = (epoch, rows)
+    return rows
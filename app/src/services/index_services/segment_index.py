@@ -0,0 +1,606 @@
+"""
+Segment-based incremental search index.
+
+The index is made of immutable segments. Each segment keeps the raw term
+counts of its chunks (not TF-IDF weights), so global statistics (document
+frequency, term frequency, IDF and the ``max_features`` selection) can be
+derived at any time for the live rows only. This gives the same ranking a
+full ``TfidfVectorizer.fit_transform`` over the live chunks would, without
+re-reading or re-tokenizing the corpus on every upload or delete.
+
+- New documents are added as a small new segment.
+- Deletes only mark rows as tombstones (copy-on-write of the segment).
+- A background merger combines small segments and expunges tombstones.
+
+Readers always work on an immutable ``IndexView`` published with a single
+reference swap, so a search never sees a half-applied mutation.
+"""
+import itertools
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.utils import murmurhash3_32
+
+from app.src.config.settings import SEARCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_segment_ids = itertools.count()
+
+
+class TermDictionary:
+    """Append-only mapping between terms and column ids shared by all segments."""
+
+    hashed = False
+
+    def __init__(self, terms: Optional[List[str]] = None):
+        self._terms: List[str] = list(terms) if terms else []
+        self._ids: Dict[str, int] = {term: i for i, term in enumerate(self._terms)}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def get(self, term: str) -> Optional[int]:
+        return self._ids.get(term)
+
+    def add(self, term: str) -> int:
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._terms.append(term)
+            self._ids[term] = term_id
+        return term_id
+
+    def term(self, term_id: int) -> str:
+        return self._terms[term_id]
+
+    def terms(self, size: Optional[int] = None) -> List[str]:
+        return self._terms[:size] if size is not None else list(self._terms)
+
+
+class HashedTerms:
+    """
+    Stateless term to column mapping by feature hashing.
+
+    Columns are ``murmurhash3_32(term) % n_features`` (as ``HashingVectorizer``
+    without alternate signs, so counts stay non-negative for BM25), so no
+    vocabulary is kept in memory whatever the corpus size. Colliding terms
+    share a column; term names cannot be recovered.
+    """
+
+    hashed = True
+
+    def __init__(self, n_features: int):
+        self.n_features = n_features
+
+    def __len__(self) -> int:
+        return self.n_features
+
+    def get(self, term: str) -> int:
+        return murmurhash3_32(term, positive=True) % self.n_features
+
+    add = get
+
+    def term(self, term_id: int) -> str:
+        return f"#{term_id}"
+
+    def terms(self, size: Optional[int] = None) -> List[str]:
+        return [self.term(i) for i in range(self.n_features if size is None else size)]
+
+
+def smoothed_idf(df: np.ndarray, n_live: int) -> np.ndarray:
+    """Smoothed IDF, as in TfidfTransformer(smooth_idf=True)."""
+    return np.log((n_live + 1) / (df + 1)) + 1.0
+
+
+class Segment:
+    """Immutable block of indexed chunks with a tombstone bitmap."""
+
+    def __init__(
+        self,
+        counts: sp.csr_matrix,
+        metadata: List[Dict[str, Any]],
+        deleted: Optional[np.ndarray] = None,
+        seg_id: Optional[int] = None,
+        df: Optional[np.ndarray] = None,
+        tf: Optional[np.ndarray] = None,
+        _shared: Optional[Dict[str, Any]] = None,
+    ):
+        self.seg_id = next(_segment_ids) if seg_id is None else seg_id
+        self.counts = counts
+        self.metadata = metadata
+        self.deleted = np.zeros(counts.shape[0], dtype=bool) if deleted is None else deleted
+        # Values shared by every version of the segment (counts never change)
+        self._shared = _shared if _shared is not None else {}
+
+        if df is None or tf is None:
+            live = self.counts[~self.deleted] if self.deleted.any() else self.counts
+            df = np.bincount(live.indices, minlength=self.n_cols).astype(np.int64)
+            tf = np.asarray(live.sum(axis=0), dtype=np.int64).ravel()
+        self.df = df
+        self.tf = tf
+
+    @property
+    def n_rows(self) -> int:
+        return self.counts.shape[0]
+
+    @property
+    def n_cols(self) -> int:
+        return self.counts.shape[1]
+
+    @property
+    def n_live(self) -> int:
+        return int(self.n_rows - self.deleted.sum())
+
+    @property
+    def deleted_ratio(self) -> float:
+        return 1.0 - self.n_live / self.n_rows if self.n_rows else 0.0
+
+    @property
+    def doc_rows(self) -> Dict[str, np.ndarray]:
+        """Rows of every document stored in this segment."""
+        doc_rows = self._shared.get('doc_rows')
+        if doc_rows is None and hasattr(self.metadata, 'doc_rows'):
+            # Snapshot chunk stores group rows from their arrays without decoding any text
+            doc_rows = self.metadata.doc_rows()
+            self._shared['doc_rows'] = doc_rows
+        if doc_rows is None:
+            grouped: Dict[str, List[int]] = {}
+            for row, meta in enumerate(self.metadata):
+                grouped.setdefault(meta['document_id'], []).append(row)
+            doc_rows = {doc_id: np.asarray(rows, dtype=np.int64) for doc_id, rows in grouped.items()}
+            self._shared['doc_rows'] = doc_rows
+        return doc_rows
+
+    @property
+    def squared_counts(self) -> sp.csr_matrix:
+        """Element-wise squared counts, used to compute row norms for any IDF."""
+        squared = self._shared.get('squared')
+        if squared is None:
+            squared = self.counts.astype(np.float64)
+            squared.data **= 2
+            self._shared['squared'] = squared
+        return squared
+
+    def with_deleted(self, rows: np.ndarray) -> 'Segment':
+        """Return a new version of the segment with ``rows`` tombstoned."""
+        rows = rows[~self.deleted[rows]]
+        if rows.size == 0:
+            return self
+        removed = self.counts[rows]
+        df = self.df - np.bincount(removed.indices, minlength=self.n_cols)
+        tf = self.tf - np.asarray(removed.sum(axis=0), dtype=np.int64).ravel()
+        deleted = self.deleted.copy()
+        deleted[rows] = True
+        return Segment(self.counts, self.metadata, deleted, self.seg_id, df, tf, self._shared)
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(~self.deleted)
+
+
+class IndexView:
+    """Immutable, consistent view over a set of segments."""
+
+    def __init__(
+        self,
+        segments: Tuple[Segment, ...],
+        terms: TermDictionary,
+        analyzer: Callable[[str], List[str]],
+        generation: int,
+        max_features: Optional[int] = None,
+    ):
+        self.segments = segments
+        self.terms = terms
+        self.analyzer = analyzer
+        self.generation = generation
+        self.max_features = max_features
+        self.vocab_size = max((s.n_cols for s in segments), default=0)
+
+        self.df = np.zeros(self.vocab_size, dtype=np.int64)
+        self.tf = np.zeros(self.vocab_size, dtype=np.int64)
+        for segment in segments:
+            self.df[:segment.n_cols] += segment.df
+            self.tf[:segment.n_cols] += segment.tf
+        self.n_live = sum(s.n_live for s in segments)
+
+        self._lock = threading.Lock()
+        self._weights: Optional[np.ndarray] = None
+        self._norms: Dict[int, np.ndarray] = {}
+        self._metadata: Optional[List[Dict[str, Any]]] = None
+        self._deleted: Optional[np.ndarray] = None
+
+    @property
+    def n_rows(self) -> int:
+        return sum(s.n_rows for s in self.segments)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Per-term weight (IDF, zeroed for terms outside the selected features)."""
+        if self._weights is None:
+            self._weights = self._compute_weights()
+        return self._weights
+
+    def _compute_weights(self) -> np.ndarray:
+        weights = np.zeros(self.vocab_size, dtype=np.float64)
+        live_terms = np.flatnonzero(self.df > 0)
+        if live_terms.size == 0:
+            return weights
+
+        selected = live_terms
+        if not self.terms.hashed:
+            # Same feature selection as CountVectorizer._limit_features: columns
+            # sorted alphabetically, then the top ``max_features`` by corpus
+            # frequency (with hashing the number of columns is already bounded)
+            order = sorted(live_terms.tolist(), key=self.terms.term)
+            selected = np.asarray(order, dtype=np.int64)
+            if self.max_features is not None and selected.size > self.max_features:
+                keep = (-self.tf[selected]).argsort()[:self.max_features]
+                selected = selected[keep]
+
+        weights[selected] = smoothed_idf(self.df[selected], self.n_live)
+        return weights
+
+    def _row_norms(self, segment: Segment) -> np.ndarray:
+        norms = self._norms.get(segment.seg_id)
+        if norms is None:
+            w = self.weights[:segment.n_cols]
+            norms = np.sqrt(segment.squared_counts @ (w * w))
+            with self._lock:
+                self._norms[segment.seg_id] = norms
+        return norms
+
+    @property
+    def metadata(self) -> List[Dict[str, Any]]:
+        """Metadata of every row (including tombstones), aligned with ``score``."""
+        if self._metadata is None:
+            if len(self.segments) == 1:
+                self._metadata = self.segments[0].metadata
+            else:
+                self._metadata = [meta for s in self.segments for meta in s.metadata]
+        return self._metadata
+
+    @property
+    def deleted(self) -> np.ndarray:
+        if self._deleted is None:
+            self._deleted = (
+                np.concatenate([s.deleted for s in self.segments])
+                if self.segments else np.zeros(0, dtype=bool)
+            )
+        return self._deleted
+
+    def document_ids(self) -> Set[str]:
+        """Ids of the documents with at least one live row."""
+        return {
+            document_id
+            for segment in self.segments
+            for document_id, rows in segment.doc_rows.items()
+            if not segment.deleted[rows].all()
+        }
+
+    def live_metadata(self) -> List[Dict[str, Any]]:
+        return [s.metadata[row] for s in self.segments for row in s.live_rows()]
+
+    def query_vector(self, query: str) -> np.ndarray:
+        """L2-normalized TF-IDF vector of the query over the current features."""
+        vector = np.zeros(self.vocab_size, dtype=np.float64)
+        for term, count in Counter(self.analyzer(query)).items():
+            term_id = self.terms.get(term)
+            if term_id is not None and term_id < self.vocab_size:
+                vector[term_id] = count
+        vector *= self.weights
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def score(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query against every row of the view."""
+        if not self.segments:
+            return np.zeros(0, dtype=np.float64)
+
+        query_vec = self.query_vector(query) * self.weights
+        parts = []
+        for segment in self.segments:
+            dots = segment.counts @ query_vec[:segment.n_cols]
+            norms = self._row_norms(segment)
+            scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+            scores[segment.deleted] = 0.0
+            parts.append(scores)
+        return np.concatenate(parts)
+
+
+class SegmentedIndex:
+    """Mutable handle over the published ``IndexView``."""
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        max_features: Optional[int] = SEARCH_CONFIG["max_results"],
+        max_segments: int = SEARCH_CONFIG["max_segments"],
+        merge_factor: int = SEARCH_CONFIG["merge_factor"],
+        expunge_deletes_ratio: float = SEARCH_CONFIG["expunge_deletes_ratio"],
+        hashing_features: int = SEARCH_CONFIG["hashing_features"],
+    ):
+        self.analyzer = analyzer
+        self.max_features = max_features
+        # 0: vocabulary of every term seen; otherwise columns are feature hashes
+        self.hashing_features = hashing_features
+        self.max_segments = max_segments
+        self.merge_factor = max(2, merge_factor)
+        self.expunge_deletes_ratio = expunge_deletes_ratio
+
+        self._write_lock = threading.RLock()
+        self._merge_requested = threading.Event()
+        self._merger: Optional[threading.Thread] = None
+        self._generation = 0
+        self._view = IndexView((), self.new_terms(), analyzer, 0, max_features)
+
+    def new_terms(self):
+        """Empty term mapping for a rebuilt index."""
+        return HashedTerms(self.hashing_features) if self.hashing_features else TermDictionary()
+
+    @property
+    def view(self) -> IndexView:
+        """Current published view. Readers should grab it once per request."""
+        return self._view
+
+    @property
+    def generation(self) -> int:
+        return self._view.generation
+
+    def _publish(self, segments: Sequence[Segment], terms: Optional[TermDictionary] = None) -> IndexView:
+        self._generation += 1
+        self._view = IndexView(
+            tuple(segments),
+            terms if terms is not None else self._view.terms,
+            self.analyzer,
+            self._generation,
+            self.max_features,
+        )
+        return self._view
+
+    def build_segment(self, chunks: Iterable[Dict[str, Any]], terms: Optional[TermDictionary] = None) -> Optional[Segment]:
+        """Tokenize chunks into a new segment of raw term counts."""
+        terms = terms if terms is not None else self._view.terms
+        counted = count_terms(chunks, self.analyzer, terms)
+        return Segment(*counted) if counted is not None else None
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]) -> IndexView:
+        """Index new chunks as a fresh segment."""
+        with self._write_lock:
+            segment = self.build_segment(chunks)
+            if segment is None:
+                return self._view
+            view = self._publish(self._view.segments + (segment,))
+        self._request_merge()
+        return view
+
+    def delete_document(self, document_id: str) -> int:
+        """Tombstone every chunk of a document. Returns the number of rows deleted."""
+        return self.delete_documents([document_id])
+
+    def delete_documents(self, document_ids: Iterable[str]) -> int:
+        """Tombstone every chunk of several documents, publishing a single view."""
+        document_ids = set(document_ids)
+        with self._write_lock:
+            deleted = 0
+            segments = []
+            for segment in self._view.segments:
+                rows = [segment.doc_rows[d] for d in document_ids if d in segment.doc_rows]
+                if rows:
+                    updated = segment.with_deleted(np.concatenate(rows))
+                    deleted += segment.n_live - updated.n_live
+                    segment = updated
+                if segment.n_live > 0:
+                    segments.append(segment)
+            if deleted:
+                self._publish(segments)
+        if deleted:
+            self._request_merge()
+        return deleted
+
+    def replace_all(self, chunks: Iterable[Dict[str, Any]]) -> IndexView:
+        """Full rebuild: replace every segment with a single one."""
+        with self._write_lock:
+            terms = self.new_terms()
+            segment = self.build_segment(chunks, terms)
+            return self._publish((segment,) if segment is not None else (), terms)
+
+    def replace_all_counts(self, shards: Iterable[Tuple[List[str], sp.csr_matrix, List[Dict[str, Any]]]]) -> IndexView:
+        """
+        Full rebuild from term counts computed elsewhere (e.g. by worker processes).
+
+        Each shard is ``(terms, counts, metadata)`` as returned by ``count_terms``
+        with its own local ``TermDictionary``. Shards must come in corpus order;
+        the result is then identical to ``replace_all`` over the same chunks.
+        """
+        with self._write_lock:
+            terms = TermDictionary()
+            segment = merge_term_counts(shards, terms)
+            return self._publish((segment,) if segment is not None else (), terms)
+
+    def restore(
+        self,
+        segment: Segment,
+        terms: TermDictionary,
+        weights: Optional[np.ndarray] = None,
+        norms: Optional[np.ndarray] = None,
+    ) -> IndexView:
+        """Publish a prebuilt segment, e.g. one loaded from a snapshot."""
+        with self._write_lock:
+            view = self._publish((segment,) if segment.n_rows else (), terms)
+            # Reuse the persisted statistics instead of recomputing them
+            if weights is not None and weights.shape[0] == view.vocab_size:
+                view._weights = weights
+                if norms is not None and norms.shape[0] == segment.n_rows:
+                    view._norms[segment.seg_id] = norms
+            return view
+
+    def clear(self) -> IndexView:
+        with self._write_lock:
+            return self._publish((), self.new_terms())
+
+    # Background merging
+
+    def _request_merge(self) -> None:
+        if not self._needs_merge(self._view.segments):
+            return
+        if self._merger is None or not self._merger.is_alive():
+            self._merger = threading.Thread(target=self._merge_loop, name="segment-merger", daemon=True)
+            self._merger.start()
+        self._merge_requested.set()
+
+    def _needs_merge(self, segments: Sequence[Segment]) -> bool:
+        return bool(self._pick_merge(segments))
+
+    def _pick_merge(self, segments: Sequence[Segment]) -> List[Segment]:
+        # Rewrite segments that are mostly tombstones on their own
+        for segment in segments:
+            if segment.deleted_ratio >= self.expunge_deletes_ratio:
+                return [segment]
+        if len(segments) <= self.max_segments:
+            return []
+        by_size = sorted(segments, key=lambda s: s.n_live)
+        return by_size[:self.merge_factor]
+
+    def _merge_loop(self) -> None:
+        while True:
+            self._merge_requested.wait()
+            self._merge_requested.clear()
+            try:
+                while self.merge_once():
+                    pass
+            except Exception as e:
+                logger.error(f"Error merging index segments: {str(e)}", exc_info=True)
+
+    def merge_once(self) -> bool:
+        """Merge one batch of segments. Returns False when there is nothing to do."""
+        view = self._view
+        sources = self._pick_merge(view.segments)
+        if not sources:
+            return False
+
+        merged, row_map = merge_segments(sources, view.vocab_size)
+        with self._write_lock:
+            current = {s.seg_id: s for s in self._view.segments}
+            if self._view.terms is not view.terms or any(s.seg_id not in current for s in sources):
+                # A rebuild or delete removed a source meanwhile, retry on the new view
+                return True
+
+            # Carry over tombstones applied while the merge was running
+            late_deletes = []
+            for source, rows_map in zip(sources, row_map):
+                newly_deleted = current[source.seg_id].deleted & ~source.deleted
+                if newly_deleted.any():
+                    late_deletes.append(rows_map[newly_deleted])
+            if late_deletes:
+                merged = merged.with_deleted(np.concatenate(late_deletes))
+
+            source_ids = {s.seg_id for s in sources}
+            segments = [s for s in self._view.segments if s.seg_id not in source_ids]
+            if merged.n_live > 0:
+                segments.append(merged)
+            self._publish(segments)
+
+        logger.info(f"Merged {len(sources)} segments into one with {merged.n_live} rows")
+        return True
+
+
+def count_terms(
+    chunks: Iterable[Dict[str, Any]],
+    analyzer: Callable[[str], List[str]],
+    terms: TermDictionary,
+) -> Optional[Tuple[sp.csr_matrix, List[Dict[str, Any]]]]:
+    """
+    Raw term counts of chunks, one row per chunk.
+
+    New terms are added to ``terms`` in order of first appearance. Returns the
+    counts and the chunks (row metadata), or None if there are no chunks.
+    Terms that hash to the same column are summed.
+    """
+    metadata: List[Dict[str, Any]] = []
+    indices: List[int] = []
+    data: List[int] = []
+    indptr = [0]
+
+    for chunk in chunks:
+        counts = Counter(analyzer(chunk['text']))
+        for term, count in counts.items():
+            indices.append(terms.add(term))
+            data.append(count)
+        indptr.append(len(indices))
+        metadata.append(chunk)
+
+    if not metadata:
+        return None
+
+    counts = sp.csr_matrix(
+        (np.asarray(data, dtype=np.int64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(metadata), len(terms)),
+    )
+    counts.sum_duplicates()
+    return counts, metadata
+
+
+def merge_term_counts(
+    shards: Iterable[Tuple[List[str], sp.csr_matrix, List[Dict[str, Any]]]],
+    terms: TermDictionary,
+) -> Optional[Segment]:
+    """
+    Stack term counts computed with separate dictionaries into one segment.
+
+    Local term ids of every shard are remapped to ``terms``. Adding each
+    shard's terms in their local order, shard after shard, assigns the same
+    ids a single ``count_terms`` pass over all the chunks would.
+    """
+    blocks = []
+    metadata: List[Dict[str, Any]] = []
+    for shard_terms, counts, shard_metadata in shards:
+        mapping = np.fromiter((terms.add(term) for term in shard_terms), dtype=np.int64, count=len(shard_terms))
+        blocks.append((mapping[counts.indices], counts))
+        metadata.extend(shard_metadata)
+
+    if not metadata:
+        return None
+
+    # Every column exists once all shards are in, so blocks are built with the final width
+    stacked = sp.vstack([
+        sp.csr_matrix((counts.data, indices, counts.indptr), shape=(counts.shape[0], len(terms)))
+        for indices, counts in blocks
+    ], format='csr', dtype=np.int64)
+    stacked.sort_indices()
+    return Segment(stacked, metadata)
+
+
+def merge_segments(segments: Sequence[Segment], vocab_size: int) -> Tuple[Segment, List[np.ndarray]]:
+    """
+    Combine the live rows of several segments into a new segment.
+
+    Returns the merged segment and, for every source, an array mapping its
+    rows to rows of the merged segment (-1 for rows that were dropped).
+    """
+    blocks = []
+    metadata: List[Dict[str, Any]] = []
+    row_map: List[np.ndarray] = []
+    offset = 0
+
+    for segment in segments:
+        live = segment.live_rows()
+        counts = segment.counts[live]
+        blocks.append(sp.csr_matrix(
+            (counts.data, counts.indices, counts.indptr),
+            shape=(counts.shape[0], vocab_size),
+        ))
+        metadata.extend(segment.metadata[row] for row in live)
+
+        mapping = np.full(segment.n_rows, -1, dtype=np.int64)
+        mapping[live] = np.arange(offset, offset + live.size)
+        row_map.append(mapping)
+        offset += live.size
+
+    counts = sp.vstack(blocks, format='csr', dtype=np.int64) if blocks else sp.csr_matrix((0, vocab_size), dtype=np.int64)
+    return Segment(counts, metadata), row_map
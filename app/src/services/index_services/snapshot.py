@@ -0,0 +1,604 @@
+"""
+Persisted index snapshots.
+
+A snapshot is a directory of flat binary files plus a small JSON manifest:
+
+- ``data``/``indices``/``indptr``: CSR arrays of the raw term counts
+- ``df``/``tf``: document and corpus frequency of every term
+- ``idf``: per-term weights (IDF, zero outside the selected features)
+- ``norms``: L2 norm of every row for those weights
+- ``vocab``/``vocab_offsets``: UTF-8 terms and their byte offsets (empty
+  for hashed indexes, whose columns are the feature hashes themselves);
+  ``vocab_sorted``: column ids in term order, for binary search
+- ``text``/``text_offsets``: UTF-8 chunk texts and their byte offsets
+- ``chunk_doc``/``chunk_index``/``chunk_page``: document, position and
+  source page (0 when unknown) of every chunk
+- ``chunk_start``/``chunk_end``: character offsets of every chunk in the
+  cleaned text of its document
+- ``token_hash``/``token_offset``: hash and character offset of every word
+  of the chunks, for search snippets; ``token_ptr``: first word of each chunk
+- ``doc_len``: number of terms of every row
+- ``bm25_rows``/``bm25_tfs``: column-major postings of the counts, and
+  ``bm25_block_*``/``bm25_term_blocks``: their block-max arrays (see
+  ``bm25.py``) for ``bm25_block_size`` rows per window
+
+Arrays are opened with ``numpy.memmap`` so loading a snapshot costs a few
+``mmap`` calls instead of re-parsing and re-tokenizing every document, and
+every process mapping the same snapshot shares its pages: terms are looked
+up in the mapped vocabulary and BM25 reads the mapped postings, so no
+per-process dictionary or CSC copy of the counts is built.
+Snapshots are written to a new directory, row batch by row batch, and
+published by atomically replacing the ``CURRENT`` pointer file.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.src.config.settings import SEARCH_CONFIG
+from .bm25 import Bm25Postings, posting_blocks
+from .segment_index import HashedTerms, IndexView, Segment, TermDictionary
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 5
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# Rows copied from the index to the snapshot files at a time
+WRITE_BATCH_ROWS = 4096
+# Rows per block when computing norms and postings over the written counts
+NORM_BLOCK_ROWS = 8192
+# Postings per batch when computing the block-max arrays
+POSTINGS_BATCH = 1 << 20
+# Block-max arrays of the BM25 postings, as returned by ``posting_blocks``
+BLOCK_DTYPES = {
+    'block_start': np.int64,
+    'block_end': np.int64,
+    'block_window': np.int64,
+    'block_max_tf': np.float64,
+    'block_min_dl': np.float64,
+    'term_blocks': np.int64,
+}
+
+
+class ChunkStore(Sequence):
+    """Read-only chunk metadata decoded lazily from memory-mapped arrays."""
+
+    def __init__(self, documents: List[Tuple[str, str]], text: np.ndarray, text_offsets: np.ndarray,
+                 chunk_doc: np.ndarray, chunk_index: np.ndarray, chunk_page: np.ndarray,
+                 chunk_start: np.ndarray, chunk_end: np.ndarray,
+                 token_hash: np.ndarray, token_offset: np.ndarray, token_ptr: np.ndarray):
+        self.documents = documents
+        self.text = text
+        self.text_offsets = text_offsets
+        self.chunk_doc = chunk_doc
+        self.chunk_index = chunk_index
+        self.chunk_page = chunk_page
+        self.chunk_start = chunk_start
+        self.chunk_end = chunk_end
+        self.token_hash = token_hash
+        self.token_offset = token_offset
+        self.token_ptr = token_ptr
+
+    def __len__(self) -> int:
+        return len(self.chunk_doc)
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def doc_rows(self) -> Dict[str, np.ndarray]:
+        """Rows of every document, grouped from ``chunk_doc`` without decoding chunk texts."""
+        chunk_doc = np.asarray(self.chunk_doc)
+        order = np.argsort(chunk_doc, kind='stable')
+        bounds = np.searchsorted(chunk_doc[order], np.arange(len(self.documents) + 1))
+        return {
+            self.documents[doc][0]: order[bounds[doc]:bounds[doc + 1]].astype(np.int64)
+            for doc in range(len(self.documents))
+            if bounds[doc + 1] > bounds[doc]
+        }
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        first, last = self.token_ptr[row], self.token_ptr[row + 1]
+        document_id, document_name = self.documents[self.chunk_doc[row]]
+        return {
+            'document_id': document_id,
+            'document_name': document_name,
+            'chunk_index': int(self.chunk_index[row]),
+            'page': int(self.chunk_page[row]) or None,
+            'start': int(self.chunk_start[row]),
+            'end': int(self.chunk_end[row]),
+            'text': self.text[start:end].tobytes().decode('utf-8'),
+            'token_hashes': self.token_hash[first:last],
+            'token_offsets': self.token_offset[first:last]
+        }
+
+
+class MappedTermDictionary(TermDictionary):
+    """
+    Term dictionary over the memory-mapped vocabulary of a snapshot.
+
+    Snapshot terms are found by binary search over ``vocab_sorted``, comparing
+    UTF-8 bytes straight from the mapped arrays. Terms added afterwards (by
+    indexing new chunks in this process) are kept in memory with the ids that
+    follow the snapshot columns.
+    """
+
+    def __init__(self, vocab: np.ndarray, vocab_offsets: np.ndarray, vocab_sorted: np.ndarray):
+        super().__init__()
+        self.vocab = vocab
+        self.vocab_offsets = vocab_offsets
+        self.vocab_sorted = vocab_sorted
+        self.n_mapped = len(vocab_sorted)
+
+    def __len__(self) -> int:
+        return self.n_mapped + len(self._terms)
+
+    def _encoded(self, term_id: int) -> bytes:
+        return self.vocab[self.vocab_offsets[term_id]:self.vocab_offsets[term_id + 1]].tobytes()
+
+    def get(self, term: str) -> Optional[int]:
+        key = term.encode('utf-8')
+        lo, hi = 0, self.n_mapped
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded(int(self.vocab_sorted[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_mapped:
+            term_id = int(self.vocab_sorted[lo])
+            if self._encoded(term_id) == key:
+                return term_id
+        return self._ids.get(term)
+
+    def add(self, term: str) -> int:
+        term_id = self.get(term)
+        if term_id is None:
+            term_id = len(self)
+            self._terms.append(term)
+            self._ids[term] = term_id
+        return term_id
+
+    def term(self, term_id: int) -> str:
+        if term_id < self.n_mapped:
+            return self._encoded(term_id).decode('utf-8')
+        return self._terms[term_id - self.n_mapped]
+
+    def terms(self, size: Optional[int] = None) -> List[str]:
+        size = len(self) if size is None else min(size, len(self))
+        mapped = min(size, self.n_mapped)
+        return _decode_strings(self.vocab, self.vocab_offsets[:mapped + 1]) + self._terms[:size - mapped]
+
+
+def _encode_strings(values) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def _open_array(path: Path, dtype: str, length: int) -> np.ndarray:
+    if length == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+def _create_array(path: Path, dtype, length: int) -> np.ndarray:
+    if length == 0:
+        path.touch()
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='w+', shape=(length,))
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot incrementally.
+
+    Rows are appended batch by batch straight to the array files, so neither
+    the counts nor the chunk texts of the whole index are held in memory.
+    ``finish`` adds the per-term arrays, computes the row norms and the BM25
+    postings by streaming over the written counts and publishes the snapshot.
+    """
+
+    def __init__(self, index_dir: Path, generation: int, index_dtype=np.int64,
+                 block_size: int = SEARCH_CONFIG["bm25_block_size"]):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.generation = generation
+        self.block_size = block_size
+        self.name = f"snapshot-{generation}-{time.time_ns()}"
+        self.tmp_dir = self.index_dir / f".{self.name}.tmp"
+        self.tmp_dir.mkdir()
+        # indices and indptr share a dtype so scipy maps them without a copy
+        self._dtypes = {
+            'data': np.dtype(np.int64),
+            'indices': np.dtype(index_dtype),
+            'indptr': np.dtype(index_dtype),
+            'text': np.dtype(np.uint8),
+            'text_offsets': np.dtype(np.int64),
+            'chunk_doc': np.dtype(np.int32),
+            'chunk_index': np.dtype(np.int32),
+            'chunk_page': np.dtype(np.int32),
+            'chunk_start': np.dtype(np.int64),
+            'chunk_end': np.dtype(np.int64),
+            'token_hash': np.dtype(np.uint32),
+            'token_offset': np.dtype(np.uint32),
+            'token_ptr': np.dtype(np.int64),
+            'doc_len': np.dtype(np.float64),
+        }
+        self._files = {key: open(self.tmp_dir / f"{key}.bin", 'wb') for key in self._dtypes}
+        self._lengths = dict.fromkeys(self._dtypes, 0)
+        self.documents: Dict[Tuple[str, str], int] = {}
+        self.n_rows = 0
+        self.nnz = 0
+        self._text_bytes = 0
+        self._tokens = 0
+        self._write('indptr', [0])
+        self._write('text_offsets', [0])
+        self._write('token_ptr', [0])
+
+    def _write(self, key: str, values) -> None:
+        array = np.ascontiguousarray(values, dtype=self._dtypes[key])
+        array.tofile(self._files[key])
+        self._lengths[key] += array.size
+
+    def add_rows(self, counts: sp.csr_matrix, metadata: List[Dict[str, Any]]) -> None:
+        """Append rows: raw counts over the final columns (sorted within each row) and their chunks."""
+        self._write('data', counts.data)
+        self._write('indices', counts.indices)
+        self._write('indptr', counts.indptr[1:].astype(np.int64) + self.nnz)
+        self.nnz += int(counts.indptr[-1])
+        self._write('doc_len', np.asarray(counts.sum(axis=1)).ravel())
+
+        text, text_offsets = _encode_strings(meta['text'] for meta in metadata)
+        self._write('text', text)
+        self._write('text_offsets', text_offsets[1:] + self._text_bytes)
+        self._text_bytes += int(text_offsets[-1])
+
+        self._write('chunk_doc', [
+            self.documents.setdefault((meta['document_id'], meta['document_name']), len(self.documents))
+            for meta in metadata
+        ])
+        self._write('chunk_index', [meta['chunk_index'] for meta in metadata])
+        self._write('chunk_page', [meta.get('page') or 0 for meta in metadata])
+        self._write('chunk_start', [meta.get('start', 0) for meta in metadata])
+        self._write('chunk_end', [meta.get('end', 0) for meta in metadata])
+
+        # Chunks without recorded word positions get none (snippets compute them)
+        token_hashes = [meta.get('token_hashes', ()) for meta in metadata]
+        token_offsets = [meta.get('token_offsets', ()) for meta in metadata]
+        self._write('token_ptr', np.cumsum([len(h) for h in token_hashes], dtype=np.int64) + self._tokens)
+        if metadata:
+            self._write('token_hash', np.concatenate(token_hashes))
+            self._write('token_offset', np.concatenate(token_offsets))
+        self._tokens = self._lengths['token_hash']
+        self.n_rows += len(metadata)
+
+    def _open_written(self, key: str) -> np.ndarray:
+        return _open_array(self.tmp_dir / f"{key}.bin", self._dtypes[key].str, self._lengths[key])
+
+    def _row_norms(self, idf: np.ndarray) -> np.ndarray:
+        """L2 norm of every written row for the given weights, a block of rows at a time."""
+        arrays = {key: self._open_written(key) for key in ('data', 'indices', 'indptr')}
+        squared_idf = idf * idf
+        norms = np.zeros(self.n_rows, dtype=np.float64)
+        for start in range(0, self.n_rows, NORM_BLOCK_ROWS):
+            end = min(start + NORM_BLOCK_ROWS, self.n_rows)
+            indptr = np.asarray(arrays['indptr'][start:end + 1], dtype=np.int64)
+            lo, hi = indptr[0], indptr[-1]
+            values = np.asarray(arrays['data'][lo:hi], dtype=np.float64) ** 2 * squared_idf[arrays['indices'][lo:hi]]
+            rows = np.repeat(np.arange(end - start), np.diff(indptr))
+            norms[start:end] = np.sqrt(np.bincount(rows, weights=values, minlength=end - start))
+        return norms
+
+    def _write_postings(self, n_cols: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Write the BM25 postings of the written counts and their block-max arrays.
+
+        The column-major copy is filled a block of rows at a time; rows come in
+        order, so the postings of every term end up sorted by row. Block-max
+        arrays are then computed for a batch of terms at a time.
+
+        Returns:
+            Dtype and length of every array written
+        """
+        indices, data, indptr = (self._open_written(key) for key in ('indices', 'data', 'indptr'))
+        row_blocks = [
+            (start, min(start + NORM_BLOCK_ROWS, self.n_rows))
+            for start in range(0, self.n_rows, NORM_BLOCK_ROWS)
+        ]
+
+        col_ptr = np.zeros(n_cols + 1, dtype=np.int64)
+        for start, end in row_blocks:
+            col_ptr[1:] += np.bincount(indices[indptr[start]:indptr[end]], minlength=n_cols)
+        np.cumsum(col_ptr, out=col_ptr)
+
+        row_dtype = np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64
+        dtypes = {'bm25_rows': np.dtype(row_dtype), 'bm25_tfs': self._dtypes['data']}
+        rows_out = _create_array(self.tmp_dir / "bm25_rows.bin", dtypes['bm25_rows'], self.nnz)
+        tfs_out = _create_array(self.tmp_dir / "bm25_tfs.bin", dtypes['bm25_tfs'], self.nnz)
+        fill = col_ptr[:-1].copy()
+        for start, end in row_blocks:
+            lo, hi = indptr[start], indptr[end]
+            cols = np.asarray(indices[lo:hi], dtype=np.int64)
+            order = np.argsort(cols, kind='stable')
+            block_counts = np.bincount(cols, minlength=n_cols)
+            sorted_cols = cols[order]
+            # Position of each entry: next free slot of its term plus its rank within the block
+            positions = fill[sorted_cols] + np.arange(order.size) - (np.cumsum(block_counts) - block_counts)[sorted_cols]
+            rows = np.repeat(np.arange(start, end), np.diff(indptr[start:end + 1]))
+            rows_out[positions] = rows[order]
+            tfs_out[positions] = data[lo:hi][order]
+            fill += block_counts
+        for array in (rows_out, tfs_out):
+            if isinstance(array, np.memmap):
+                array.flush()
+        del rows_out, tfs_out
+
+        rows_in = _open_array(self.tmp_dir / "bm25_rows.bin", dtypes['bm25_rows'].str, self.nnz)
+        tfs_in = _open_array(self.tmp_dir / "bm25_tfs.bin", dtypes['bm25_tfs'].str, self.nnz)
+        doc_len = np.asarray(self._open_written('doc_len'))
+        n_windows = max(1, -(-self.n_rows // self.block_size))
+        files = {key: open(self.tmp_dir / f"bm25_{key}.bin", 'wb') for key in BLOCK_DTYPES}
+        n_blocks = 0
+        try:
+            first = 0
+            while first < n_cols:
+                last = int(np.searchsorted(col_ptr, col_ptr[first] + POSTINGS_BATCH, side='right')) - 1
+                last = min(max(last, first + 1), n_cols)
+                lo, hi = col_ptr[first], col_ptr[last]
+                blocks = posting_blocks(
+                    col_ptr[first:last + 1] - lo, rows_in[lo:hi], tfs_in[lo:hi], doc_len, self.block_size, n_windows
+                )
+                blocks['block_start'] += lo
+                blocks['block_end'] += lo
+                blocks['term_blocks'] = blocks['term_blocks'][:-1] + n_blocks
+                n_blocks += blocks['block_start'].size
+                for key, array in blocks.items():
+                    np.ascontiguousarray(array, dtype=BLOCK_DTYPES[key]).tofile(files[key])
+                first = last
+            np.asarray([n_blocks], dtype=BLOCK_DTYPES['term_blocks']).tofile(files['term_blocks'])
+        finally:
+            for f in files.values():
+                f.close()
+
+        lengths = {'bm25_rows': self.nnz, 'bm25_tfs': self.nnz}
+        lengths.update({f"bm25_{key}": n_blocks for key in BLOCK_DTYPES})
+        lengths['bm25_term_blocks'] = n_cols + 1
+        dtypes.update({f"bm25_{key}": np.dtype(dtype) for key, dtype in BLOCK_DTYPES.items()})
+        return {key: {'dtype': dtype.str, 'length': lengths[key]} for key, dtype in dtypes.items()}
+
+    def finish(self, n_cols: int, df: np.ndarray, tf: np.ndarray, idf: np.ndarray, vocab: Iterable[str],
+               source_mtime: float, max_features: Optional[int] = None, hashing_features: int = 0,
+               keep: int = 1) -> Path:
+        """
+        Write the per-term arrays and the manifest, then publish the snapshot as the current one.
+
+        Args:
+            n_cols: Number of columns of the counts
+            df, tf, idf: Document frequency, corpus frequency and weight of every column
+            vocab: Term of every column (empty for a hashed index)
+            source_mtime: Modification time of the data the snapshot reflects
+            max_features: Feature limit the weights were computed with
+            hashing_features: Number of hash columns, 0 for a vocabulary index
+            keep: Number of most recent snapshots kept on disk (more than one lets
+                other processes finish mapping the previous snapshot)
+
+        Returns:
+            Path of the new snapshot directory
+        """
+        for f in self._files.values():
+            f.close()
+        vocab = list(vocab)
+        # Python orders strings by code point, which is also the order of their UTF-8 bytes
+        vocab_sorted = np.asarray(sorted(range(len(vocab)), key=vocab.__getitem__), dtype=np.int64)
+        vocab, vocab_offsets = _encode_strings(vocab)
+        arrays = {
+            'df': np.asarray(df, dtype=np.int64),
+            'tf': np.asarray(tf, dtype=np.int64),
+            'idf': np.asarray(idf, dtype=np.float64),
+            'norms': self._row_norms(np.asarray(idf, dtype=np.float64)),
+            'vocab': vocab,
+            'vocab_offsets': vocab_offsets,
+            'vocab_sorted': vocab_sorted,
+        }
+        for key, array in arrays.items():
+            np.ascontiguousarray(array).tofile(self.tmp_dir / f"{key}.bin")
+        specs = {key: {'dtype': dtype.str, 'length': self._lengths[key]} for key, dtype in self._dtypes.items()}
+        specs.update({key: {'dtype': array.dtype.str, 'length': int(array.size)} for key, array in arrays.items()})
+        specs.update(self._write_postings(n_cols))
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'generation': self.generation,
+            'source_mtime': source_mtime,
+            'created_at': time.time(),
+            'n_rows': self.n_rows,
+            'n_cols': int(n_cols),
+            'max_features': max_features,
+            'hashing_features': hashing_features,
+            'bm25_block_size': self.block_size,
+            'documents': [list(key) for key in self.documents],
+            'arrays': specs,
+        }
+        with open(self.tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        snapshot_dir = self.index_dir / self.name
+        os.replace(self.tmp_dir, snapshot_dir)
+
+        # Publish atomically, then remove older snapshots
+        pointer = self.index_dir / f".{CURRENT_FILE}.tmp"
+        pointer.write_text(self.name, encoding='utf-8')
+        os.replace(pointer, self.index_dir / CURRENT_FILE)
+        older = sorted(
+            (old for old in self.index_dir.glob('snapshot-*') if old.name != self.name),
+            key=lambda old: int(old.name.rsplit('-', 1)[1]),
+            reverse=True
+        )
+        for old in older[max(keep - 1, 0):]:
+            shutil.rmtree(old, ignore_errors=True)
+
+        logger.info(f"Index snapshot written to {snapshot_dir} ({self.n_rows} rows, {n_cols} terms)")
+        return snapshot_dir
+
+    def abort(self) -> None:
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def save_snapshot(view: IndexView, index_dir: Path, source_mtime: float, keep: int = 1) -> Path:
+    """
+    Write a compacted snapshot of ``view`` and publish it as the current one.
+
+    Args:
+        view: Index view to persist (tombstoned rows and dead terms are dropped)
+        index_dir: Directory holding the snapshots
+        source_mtime: Modification time of the data directory the view reflects
+        keep: Number of most recent snapshots kept on disk (more than one lets
+            other processes finish mapping the previous snapshot)
+
+    Returns:
+        Path of the new snapshot directory
+    """
+    hashed = view.terms.hashed
+    if hashed:
+        # Columns are hashes: they cannot be renumbered
+        live_terms = np.arange(view.vocab_size)
+    else:
+        # Drop terms that no live row uses and renumber the remaining ones
+        live_terms = np.flatnonzero(view.df > 0)
+    remap = np.full(view.vocab_size, -1, dtype=np.int64)
+    remap[live_terms] = np.arange(live_terms.size)
+
+    live_nnz = sum(int(np.diff(s.counts.indptr)[s.live_rows()].sum()) for s in view.segments)
+    index_dtype = np.int32 if max(live_nnz, live_terms.size) < np.iinfo(np.int32).max else np.int64
+
+    writer = SnapshotWriter(index_dir, view.generation, index_dtype)
+    try:
+        for segment in view.segments:
+            live = segment.live_rows()
+            for start in range(0, live.size, WRITE_BATCH_ROWS):
+                rows = live[start:start + WRITE_BATCH_ROWS]
+                counts = segment.counts[rows]
+                # The remapping keeps column order, so rows stay sorted
+                counts = sp.csr_matrix(
+                    (counts.data, remap[counts.indices], counts.indptr),
+                    shape=(rows.size, live_terms.size)
+                )
+                writer.add_rows(counts, [segment.metadata[row] for row in rows])
+        return writer.finish(
+            live_terms.size,
+            view.df[live_terms],
+            view.tf[live_terms],
+            view.weights[live_terms],
+            () if hashed else (view.terms.term(int(t)) for t in live_terms),
+            source_mtime,
+            max_features=view.max_features,
+            hashing_features=len(view.terms) if hashed else 0,
+            keep=keep
+        )
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def read_manifest(index_dir: Path) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Return the current snapshot directory and its manifest, if any."""
+    index_dir = Path(index_dir)
+    try:
+        name = (index_dir / CURRENT_FILE).read_text(encoding='utf-8').strip()
+        snapshot_dir = index_dir / name
+        with open(snapshot_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return None
+    return snapshot_dir, manifest
+
+
+def load_snapshot(index_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    Memory-map the current snapshot.
+
+    Returns:
+        Dict with the ``segment``, ``terms``, ``weights`` and ``norms`` needed to
+        restore the index plus the snapshot ``manifest``, or None if there is
+        no usable snapshot.
+    """
+    current = read_manifest(index_dir)
+    if current is None:
+        return None
+    snapshot_dir, manifest = current
+
+    arrays = {
+        key: _open_array(snapshot_dir / f"{key}.bin", spec['dtype'], spec['length'])
+        for key, spec in manifest['arrays'].items()
+    }
+    n_rows, n_cols = manifest['n_rows'], manifest['n_cols']
+
+    counts = sp.csr_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=(n_rows, n_cols),
+        copy=False
+    )
+    # The arrays were written sorted and canonical; skip the O(nnz) checks
+    counts.has_sorted_indices = True
+
+    metadata = ChunkStore(
+        [tuple(doc) for doc in manifest['documents']],
+        arrays['text'],
+        arrays['text_offsets'],
+        arrays['chunk_doc'],
+        arrays['chunk_index'],
+        arrays['chunk_page'],
+        arrays['chunk_start'],
+        arrays['chunk_end'],
+        arrays['token_hash'],
+        arrays['token_offset'],
+        arrays['token_ptr'],
+    )
+    segment = Segment(counts, metadata, df=arrays['df'], tf=arrays['tf'])
+    block_size = manifest['bm25_block_size']
+    segment._shared[('bm25', block_size)] = Bm25Postings(
+        block_size,
+        max(1, -(-n_rows // block_size)),
+        arrays['bm25_rows'],
+        arrays['bm25_tfs'],
+        arrays['doc_len'],
+        {key: arrays[f"bm25_{key}"] for key in BLOCK_DTYPES}
+    )
+    if manifest.get('hashing_features'):
+        terms = HashedTerms(manifest['hashing_features'])
+    else:
+        terms = MappedTermDictionary(arrays['vocab'], arrays['vocab_offsets'], arrays['vocab_sorted'])
+
+    return {
+        'segment': segment,
+        'terms': terms,
+        'weights': np.asarray(arrays['idf']),
+        'norms': np.asarray(arrays['norms']),
+        'manifest': manifest,
+    }
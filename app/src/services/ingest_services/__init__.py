@@ -0,0 +1,7 @@
+from .ingest_jobs import IngestJobQueue, get_ingest_queue, job_status
+
+__all__ = [
+    'IngestJobQueue',
+    'get_ingest_queue',
+    'job_status'
+]
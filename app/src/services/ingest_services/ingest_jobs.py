@@ -0,0 +1,400 @@
+"""
+Background ingestion jobs.
+
+An upload request only streams its files to ``INGEST_DIR/<job id>/`` (hashing
+them and skipping content that is already in the catalog) and returns a job
+id. A bounded pool of workers then extracts, stores and indexes the files off
+the event loop. Every job is recorded as ``job.json`` next to its staged
+files, so files that were still queued or being processed when the server
+stopped are queued again on the next start.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process is assumed
+    fcntl = None
+
+from app.src.config.settings import INGEST_CONFIG, INGEST_DIR, UPLOAD_DIR
+from app.src.services.file_services.document_catalog import get_document_catalog
+from app.src.services.file_services.process_file import (
+    MAX_FILE_SIZE,
+    extract_and_save,
+    upload_metadata,
+    validate_upload
+)
+from app.src.services.file_services.stream_upload import discard_upload, map_file, stage_upload, stream_upload
+from app.src.services.search_services import get_index_scheduler
+
+logger = logging.getLogger(__name__)
+
+JOB_FILE = "job.json"
+RESUME_LOCK = "resume.lock"
+HASH_LOCK_STRIPES = 64
+
+# File states; the last three are final
+QUEUED = "queued"
+PROCESSING = "processing"
+INDEXING = "indexing"       # Stored in the catalog, waiting for the next index batch
+DONE = "done"
+DEDUPLICATED = "deduplicated"
+FAILED = "failed"
+FINAL_STATES = (DONE, DEDUPLICATED, FAILED)
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+def _rate(amount: float, started: Optional[float], finished: Optional[float]) -> Optional[float]:
+    if not started:
+        return None
+    elapsed = (finished or time.time()) - started
+    return round(amount / elapsed, 2) if elapsed > 0 else None
+
+
+def _job_state(files: List[Dict[str, Any]]) -> str:
+    states = {f['state'] for f in files}
+    if states <= {QUEUED}:
+        return QUEUED
+    if not states <= set(FINAL_STATES):
+        return "running"
+    if states == {FAILED}:
+        return FAILED
+    return "completed_with_errors" if FAILED in states else "completed"
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job: per-file state and progress plus aggregated throughput."""
+    files = []
+    for f in job['files']:
+        files.append({
+            'filename': f['filename'],
+            'state': f['state'],
+            'document_id': f.get('document_id'),
+            'file_size': f['file_size'],
+            'pages_processed': f.get('pages_processed', 0),
+            'num_characters': f.get('num_characters'),
+            'chunks_indexed': f.get('chunks_indexed'),
+            'error': f.get('error'),
+            'started_at': _iso(f.get('started_at')),
+            'finished_at': _iso(f.get('finished_at')),
+            # Extraction throughput (the wait for the index batch is not included)
+            'pages_per_second': _rate(f.get('pages_processed', 0), f.get('started_at'), f.get('extracted_at')),
+            'bytes_per_second': _rate(f['file_size'], f['started_at'], f['extracted_at'])
+                                if f.get('extracted_at') else None,
+        })
+
+    started = min((f['started_at'] for f in job['files'] if f.get('started_at')), default=None)
+    final = all(f['state'] in FINAL_STATES for f in job['files'])
+    finished = max((f.get('finished_at') or 0 for f in job['files']), default=None) if final else None
+    processed = [f for f in job['files'] if f.get('extracted_at')]
+    pages = sum(f.get('pages_processed', 0) for f in job['files'])
+    return {
+        'job_id': job['id'],
+        'state': _job_state(job['files']),
+        'created_at': _iso(job['created_at']),
+        'started_at': _iso(started),
+        'finished_at': _iso(finished),
+        'files_total': len(files),
+        'files_pending': sum(f['state'] in (QUEUED, PROCESSING, INDEXING) for f in files),
+        'pages_processed': pages,
+        'pages_per_second': _rate(pages, started, finished),
+        'bytes_per_second': _rate(sum(f['file_size'] for f in processed), started, finished),
+        'files': files,
+    }
+
+
+class IngestJobQueue:
+    """Persistent job records plus a bounded pool of extraction/indexing workers."""
+
+    def __init__(self, upload_folder: Path, jobs_dir: Path, workers: int, max_pending_files: int,
+                 job_ttl_seconds: float):
+        self.upload_folder = Path(upload_folder)
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = workers
+        self.max_pending_files = max_pending_files
+        self.job_ttl_seconds = job_ttl_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: Optional["asyncio.Queue[Tuple[str, int]]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        # Job records are updated from worker threads
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Files with the same content are never extracted at the same time (lock striping by hash)
+        self._hash_locks = [threading.Lock() for _ in range(HASH_LOCK_STRIPES)]
+        self._resume_fd: Optional[int] = None
+
+    def _job_dir(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id
+
+    def _persist(self, job: Dict[str, Any]) -> None:
+        """Write the job record atomically (temporary file, then rename)."""
+        path = self._job_dir(job['id']) / JOB_FILE
+        tmp_path = path.with_name(JOB_FILE + '.tmp')
+        with self._write_lock:
+            with self._lock:
+                data = json.dumps(job, ensure_ascii=False)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def _update(self, job: Dict[str, Any], position: int, persist: bool = True, **changes: Any) -> None:
+        with self._lock:
+            job['files'][position].update(changes)
+        if persist:
+            self._persist(job)
+
+    def _expired(self, job: Dict[str, Any], now: float) -> bool:
+        """Whether every file of the job is final and the job is older than the TTL."""
+        with self._lock:
+            if any(f['state'] not in FINAL_STATES for f in job['files']):
+                return False
+            # Measured from the last change, so a record is never removed while being written
+            last = max([job['created_at']] + [f.get('finished_at') or 0 for f in job['files']])
+        return now - last > self.job_ttl_seconds
+
+    def _prune(self) -> List[str]:
+        """Forget expired finished jobs (event loop only) and return their ids."""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items() if self._expired(job, now)]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return expired
+
+    def _remove_job_dirs(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def _claim_resume(self) -> bool:
+        """With several worker processes, only the first one to start resumes pending jobs."""
+        if fcntl is None:
+            return True
+        fd = os.open(self.jobs_dir / RESUME_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._resume_fd = fd
+        return True
+
+    async def start(self) -> None:
+        """Load job records, queue again unfinished files and start the workers."""
+        self._queue = asyncio.Queue()
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        job_files = sorted(self.jobs_dir.glob(f'*/{JOB_FILE}')) if self._claim_resume() else []
+        for path in job_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Registro de trabajo ilegible {path}: {str(e)}")
+                continue
+
+            pending = [i for i, f in enumerate(job['files']) if f['state'] not in FINAL_STATES]
+            if self._expired(job, now):
+                shutil.rmtree(path.parent, ignore_errors=True)
+                continue
+
+            self._jobs[job['id']] = job
+            for position in list(pending):
+                if job['files'][position]['state'] == INDEXING:
+                    # Already in the catalog: the index loaded at startup includes it
+                    self._update(job, position, persist=False, state=DONE, finished_at=now)
+                    continue
+                staged = self._job_dir(job['id']) / job['files'][position]['staged_name']
+                if staged.exists():
+                    self._update(job, position, persist=False, state=QUEUED, started_at=None, pages_processed=0)
+                    self._queue.put_nowait((job['id'], position))
+                else:
+                    self._update(job, position, persist=False, state=FAILED, finished_at=now,
+                                 error="El archivo en cola se perdió antes de procesarse")
+            if pending:
+                self._persist(job)
+                logger.info(f"Trabajo {job['id']}: {len(pending)} archivos pendientes vueltos a encolar")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers. Files being processed stay recorded as pending and resume on restart."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job, or None if it does not exist."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            # The job may have been submitted to another worker process
+            path = self._job_dir(os.path.basename(job_id)) / JOB_FILE
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                return None
+        with self._lock:
+            return job_status(job)
+
+    async def submit(self, files: List[UploadFile]) -> Dict[str, Any]:
+        """
+        Stage the uploaded files and queue them for processing.
+
+        Files are streamed to the job directory (hashed and size-checked on
+        the way); content already in the catalog is reported as deduplicated
+        and not queued. Invalid files are recorded as failed.
+
+        Returns:
+            Initial status of the job
+
+        Raises:
+            HTTPException: 503 if the queue already holds too many pending files
+        """
+        if self._queue is None:
+            raise RuntimeError("Ingest queue not started")
+        # Finished jobs are dropped while the server runs, not only at startup
+        expired = self._prune()
+        if expired:
+            await asyncio.to_thread(self._remove_job_dirs, expired)
+            logger.info(f"{len(expired)} trabajos terminados caducados eliminados")
+        if self._queue.qsize() + len(files) > self.max_pending_files:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiados archivos pendientes de procesar, inténtelo más tarde"
+            )
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        catalog = get_document_catalog(self.upload_folder)
+        job = {'id': job_id, 'created_at': time.time(), 'files': []}
+        queued = []
+
+        for position, file in enumerate(files):
+            entry = {
+                'filename': file.filename,
+                'content_type': file.content_type,
+                'file_size': 0,
+                'sha256': None,
+                'staged_name': f"{position}.upload",
+                'state': QUEUED,
+                'pages_processed': 0,
+                'started_at': None,
+                'extracted_at': None,
+                'finished_at': None,
+            }
+            job['files'].append(entry)
+            try:
+                validate_upload(file)
+                # Streamed into the job directory, so staging it is a rename
+                upload, entry['file_size'], entry['sha256'] = await stream_upload(file, MAX_FILE_SIZE, job_dir)
+                try:
+                    existing = catalog.find_by_sha256(entry['sha256'])
+                    if existing is not None:
+                        entry.update(state=DEDUPLICATED, document_id=existing['id'],
+                                     num_characters=existing['num_characters'], finished_at=time.time())
+                        continue
+                    await asyncio.to_thread(stage_upload, upload, job_dir / entry['staged_name'])
+                finally:
+                    # Nothing left to delete once staged
+                    discard_upload(upload)
+                queued.append(position)
+            except HTTPException as e:
+                entry.update(state=FAILED, error=e.detail, finished_at=time.time())
+            except Exception as e:
+                logger.error(f"Error al guardar {file.filename} en la cola: {str(e)}")
+                entry.update(state=FAILED, error=str(e), finished_at=time.time())
+
+        await asyncio.to_thread(self._persist, job)
+        self._jobs[job_id] = job
+        for position in queued:
+            self._queue.put_nowait((job_id, position))
+        logger.info(f"Trabajo {job_id}: {len(queued)} de {len(files)} archivos en cola")
+        return self.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, position = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._process, self._jobs[job_id], position)
+            except Exception as e:
+                logger.error(f"Error inesperado en el trabajo {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _hash_lock(self, sha256: str) -> threading.Lock:
+        return self._hash_locks[int(sha256[:8], 16) % HASH_LOCK_STRIPES]
+
+    def _process(self, job: Dict[str, Any], position: int) -> None:
+        """Extract, store and index one staged file (runs in a worker thread)."""
+        entry = job['files'][position]
+        staged = self._job_dir(job['id']) / entry['staged_name']
+        self._update(job, position, state=PROCESSING, started_at=time.time())
+
+        def on_page(page_number: int) -> None:
+            # Progress is kept in memory; the record is written when the file finishes
+            with self._lock:
+                entry['pages_processed'] += 1
+
+        try:
+            with self._hash_lock(entry['sha256']):
+                catalog = get_document_catalog(self.upload_folder)
+                existing = catalog.find_by_sha256(entry['sha256'])
+                if existing is not None:
+                    # An identical file was stored while this one was waiting
+                    self._update(job, position, state=DEDUPLICATED, document_id=existing['id'],
+                                 num_characters=existing['num_characters'], finished_at=time.time())
+                    return
+
+                metadata = upload_metadata(entry['filename'], entry['content_type'], entry['file_size'], entry['sha256'])
+                with map_file(staged) as content:
+                    document_id, num_characters = extract_and_save(self.upload_folder, metadata, content, on_page)
+            self._update(job, position, state=INDEXING, document_id=document_id, num_characters=num_characters,
+                         extracted_at=time.time())
+            # Indexing is batched with other uploads; the file is done once it is visible in search
+            get_index_scheduler().index(document_id).add_done_callback(
+                lambda future: self._indexed(job, position, future)
+            )
+        except Exception as e:
+            logger.error(f"Error al procesar {entry['filename']} (trabajo {job['id']}): {str(e)}")
+            self._update(job, position, state=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            staged.unlink(missing_ok=True)
+
+    def _indexed(self, job: Dict[str, Any], position: int, future) -> None:
+        error = future.exception()
+        if error is not None:
+            self._update(job, position, state=FAILED, error=f"Error al indexar: {str(error)}", finished_at=time.time())
+        else:
+            self._update(job, position, state=DONE, chunks_indexed=future.result(), finished_at=time.time())
+
+
+_queue: Optional[IngestJobQueue] = None
+
+
+def get_ingest_queue() -> IngestJobQueue:
+    """Process-wide ingestion queue."""
+    global _queue
+    if _queue is None:
+        _queue = IngestJobQueue(
+            UPLOAD_DIR,
+            INGEST_DIR,
+            workers=INGEST_CONFIG["workers"],
+            max_pending_files=INGEST_CONFIG["max_pending_files"],
+            job_ttl_seconds=INGEST_CONFIG["job_ttl_seconds"]
+        )
+    return _queue
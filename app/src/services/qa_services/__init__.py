@@ -1,6 +1,8 @@
 from .answer_question import answer_question
+from .stream_answer import stream_answer
 
 __all__ = [
-    'answer_question'
+    'answer_question',
+    'stream_answer'
 ]
     
\ No newline at end of file
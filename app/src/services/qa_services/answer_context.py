@@ -0,0 +1,137 @@
+import logging
+from typing import Any, Dict, Optional
+
+from app.src.config.settings import QA_CONFIG
+from app.src.constants import _state
+from app.src.services.search_services import retrieve_chunks
+from app.src.models.qa_models import QAResponse
+from app.src.utils.qa_utils import (
+    build_messages,
+    count_tokens,
+    pack_context,
+    get_answer_cache,
+    answer_cache_key,
+    create_citations,
+    extract_keywords,
+    clean_response
+)
+
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _passage_source(passage: dict) -> str:
+    """Encabezado de un pasaje en el prompt: documento y página si se conoce."""
+    if passage.get('page'):
+        return f"{passage['document_name']}, página {passage['page']}"
+    return passage['document_name']
+
+
+def prepare_answer_context(question: str) -> Optional[Dict[str, Any]]:
+    """
+    Recupera y empaqueta el contexto de una pregunta.
+    
+    Returns:
+        Dict con los pasajes, el contexto y los mensajes para el LLM, el conteo
+        de tokens y la clave de la caché de respuestas; None si ningún
+        fragmento es relevante.
+    """
+    # Fijar una sola vista del índice: la generación de la clave de caché y
+    # los fragmentos recuperados provienen siempre de la misma
+    view = _state['index'].view
+    chunks = retrieve_chunks(question, QA_CONFIG["retrieval_candidates"], QA_CONFIG["engine"], view=view)
+    if not chunks:
+        return None
+    
+    # Empaquetar los mejores fragmentos dentro del presupuesto de tokens,
+    # uniendo fragmentos contiguos del mismo documento
+    passages = pack_context(chunks, QA_CONFIG["context_token_budget"])
+    context = [
+        {
+            'content': f"[{_passage_source(p)}]\n{p['text']}",
+            'source': p['document_name']
+        }
+        for p in passages
+    ]
+    messages = build_messages(question, context)
+    prompt_tokens = sum(count_tokens(m['content']) for m in messages)
+    logger.info(f"Contexto: {len(passages)} pasajes de {len(chunks)} fragmentos, {prompt_tokens} tokens de prompt")
+    
+    answer_cache = get_answer_cache()
+    return {
+        'chunks': chunks,
+        'passages': passages,
+        'context': context,
+        'messages': messages,
+        'prompt_tokens': prompt_tokens,
+        'cache_key': answer_cache_key(question, view.generation, context) if answer_cache is not None else None
+    }
+
+
+def get_cached_answer(prepared: Dict[str, Any]) -> Optional[str]:
+    """Respuesta cruda guardada para la misma pregunta y contexto, si existe."""
+    answer_cache = get_answer_cache()
+    if answer_cache is None or prepared['cache_key'] is None:
+        return None
+    return answer_cache.get(prepared['cache_key'])
+
+
+def no_context_response(question: str) -> QAResponse:
+    """Respuesta cuando la búsqueda no encuentra fragmentos relevantes."""
+    return QAResponse(
+        answer="No encontré información relevante para esta pregunta en los documentos cargados.",
+        citations=[],
+        hasEnoughContext=False,
+        question=question,
+        metadata={'prompt_tokens': 0, 'context_tokens': 0, 'token_budget': QA_CONFIG["context_token_budget"],
+                  'chunks_retrieved': 0, 'chunks_packed': 0}
+    )
+
+
+def build_answer_response(question: str, llm_response: str, prepared: Dict[str, Any], cached: bool) -> QAResponse:
+    """Construye la respuesta final (texto limpio, citas y metadatos) a partir de la respuesta cruda del LLM."""
+    passages = prepared['passages']
+    
+    # Extraer las palabras clave y limpiar la respuesta
+    keywords = extract_keywords(llm_response)
+    answer_text = clean_response(llm_response)
+    
+    logger.info(f"Respuesta generada para: {question}")
+    logger.info(f"Respuesta: {answer_text}")
+    logger.info(f"Palabras clave extraídas: {keywords}")
+    
+    # Crear un formato de resultados de búsqueda con metadatos completos para citas
+    search_results = {
+        'results': [
+            {
+                'text': p['text'],
+                'documentName': p['document_name'],
+                'document_id': p['document_id'],
+                'chunk_index': p['chunk_index'],
+                'page': p.get('page'),
+                'relevanceScore': p['score']
+            }
+            for p in passages
+        ]
+    }
+    
+    # Generar citas mejoradas usando las palabras clave
+    citations = create_citations(search_results, keywords)
+    logger.info(f"Generadas {len(citations)} citas usando {len(keywords)} palabras clave")
+    
+    return QAResponse(
+        answer=answer_text,
+        citations=citations,
+        hasEnoughContext=len(passages) > 0,
+        question=question,
+        metadata={
+            'prompt_tokens': prepared['prompt_tokens'],
+            'context_tokens': sum(p['tokens'] for p in passages),
+            'token_budget': QA_CONFIG["context_token_budget"],
+            'chunks_retrieved': len(prepared['chunks']),
+            'chunks_packed': sum(p['chunk_end'] - p['chunk_index'] + 1 for p in passages),
+            'passages': len(passages),
+            'cached': cached
+        }
+    )
@@ -1,21 +1,29 @@
 import logging
-from ..services.search_service import _state as search_state
-from ..models.qa_models import QAResponse
-from ..exceptions.qa_exceptions import NoDocumentsLoadedError, AnswerGenerationError
-from ..utils.qa_utils import (
-    check_documents_exist, 
-    generate_answer_with_llm, 
-    create_citations, 
-    extract_keywords,
-    clean_response
-)
+from app.src.constants import _state
+from app.src.models.qa_models import QAResponse
+from app.src.exceptions.qa_exceptions import NoDocumentsLoadedError, AnswerGenerationError
+from app.src.utils.qa_utils import check_documents_exist, generate_answer_with_llm
+from app.src.utils.qa_utils.answer_cache_utils import normalize_question
+from app.src.utils.single_flight_utils import SingleFlight
+from .answer_context import prepare_answer_context, get_cached_answer, no_context_response, build_answer_response
 
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Preguntas en curso: las peticiones idénticas simultáneas comparten una sola llamada al LLM
+answer_flight = SingleFlight()
+
 
 async def answer_question(question: str) -> QAResponse:
+    """Responde una pregunta; las peticiones concurrentes con la misma pregunta normalizada e índice comparten el trabajo."""
+    key = (_state['index'].generation, normalize_question(question))
+    response = await answer_flight.do(key, lambda: _answer_question(question))
+    # Cada petición recibe su propia copia con la pregunta tal como la envió
+    return response.model_copy(update={'question': question}, deep=True)
+
+
+async def _answer_question(question: str) -> QAResponse:
     try:
         # Verificar que hay documentos en el directorio
         if not check_documents_exist():
@@ -23,77 +31,18 @@ async def answer_question(question: str) -> QAResponse:
             
         logger.info(f"Procesando pregunta: {question}")
         
-        # Obtener todos los documentos del servicio de búsqueda
-        doc_metadata = search_state.get('doc_metadata', [])
-        if not doc_metadata:
-            return QAResponse(
-                answer="No hay documentos cargados en el sistema.",
-                citations=[],
-                hasEnoughContext=False,
-                question=question
-            )
-        
-        # Obtener el contenido completo de todos los documentos únicos
-        unique_docs = {}
-        for doc in doc_metadata:
-            doc_id = doc.get('document_id')
-            if doc_id not in unique_docs:
-                unique_docs[doc_id] = {
-                    'content': doc.get('text', ''),
-                    'source': doc.get('document_name', 'Documento desconocido')
-                }
-        
-        if not unique_docs:
-            return QAResponse(
-                answer="No hay contenido disponible en los documentos cargados.",
-                citations=[],
-                hasEnoughContext=False,
-                question=question
-            )
-        
-        # Crear lista de contextos con contenido completo de cada documento
-        context = list(unique_docs.values())
-        
-        # Generar respuesta usando el LLM con todo el contenido
-        llm_response = await generate_answer_with_llm(question, context)
+        prepared = prepare_answer_context(question)
+        if prepared is None:
+            return no_context_response(question)
         
-        # Extraer las palabras clave y limpiar la respuesta
-        keywords = extract_keywords(llm_response)
-        answer_text = clean_response(llm_response)
+        # Reutilizar la respuesta cruda si ya se respondió la misma pregunta con el mismo contexto
+        llm_response = get_cached_answer(prepared)
+        cached = llm_response is not None
+        if not cached:
+            # Generar respuesta usando el LLM solo con el contexto relevante
+            llm_response = await generate_answer_with_llm(question, prepared['context'], cache_key=prepared['cache_key'])
         
-        logger.info(f"Respuesta generada para: {question}")
-        logger.info(f"Respuesta: {answer_text}")
-        logger.info(f"Palabras clave extraídas: {keywords}")
-        
-        # Crear un formato de resultados de búsqueda con metadatos completos para citas
-        search_results = {
-            'results': [
-                {
-                    'text': doc.get('content', ''),
-                    'documentName': doc.get('source', 'Documento'),
-                    'document_id': doc_id,  # Incluir el ID del documento
-                    'chunk_index': doc.get('chunk_index', 0),  # Incluir índice del chunk
-                    'relevanceScore': 1.0,  # Puntuación máxima ya que son los documentos completos
-                    'metadata': {
-                        'source': doc.get('source', ''),
-                        'document_id': doc_id,
-                        'chunk_index': doc.get('chunk_index', 0)
-                    }
-                }
-                for doc_id, doc in unique_docs.items()
-            ]
-        }
-        
-        # Generar citas mejoradas usando las palabras clave
-        citations = create_citations(search_results, keywords)
-        logger.info(f"Generadas {len(citations)} citas usando {len(keywords)} palabras clave")
-        
-        return QAResponse(
-            answer=answer_text,
-            citations=citations,
-            hasEnoughContext=len(context) > 0,
-            question=question
-        )
+        return build_answer_response(question, llm_response, prepared, cached)
             
     except NoDocumentsLoadedError as ndle:
         return QAResponse(
@@ -0,0 +1,89 @@
+import logging
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from app.src.models.qa_models import QAResponse
+from app.src.exceptions.qa_exceptions import NoDocumentsLoadedError, AnswerGenerationError
+from app.src.utils.qa_utils import (
+    check_documents_exist,
+    build_messages,
+    stream_chat_completion,
+    get_answer_cache,
+    KeywordMarkerFilter
+)
+from .answer_context import prepare_answer_context, get_cached_answer, no_context_response, build_answer_response
+
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+
+def _done(response: QAResponse) -> StreamEvent:
+    return "done", response.model_dump(mode="json")
+
+
+async def stream_answer(question: str) -> AsyncIterator[StreamEvent]:
+    """
+    Responde una pregunta emitiendo eventos a medida que el modelo genera texto.
+    
+    Eventos:
+        token: {"text": ...} fragmento de la respuesta, sin el bloque [[palabras clave]]
+        done: QAResponse completa (respuesta limpia, citas y metadatos)
+        error: {"detail": ...} si la generación falla a mitad del stream
+    """
+    try:
+        # Verificar que hay documentos en el directorio
+        if not check_documents_exist():
+            raise NoDocumentsLoadedError()
+        
+        logger.info(f"Procesando pregunta (stream): {question}")
+        
+        prepared = prepare_answer_context(question)
+        if prepared is None:
+            yield _done(no_context_response(question))
+            return
+        
+        # Una respuesta en caché se envía de una vez
+        cached_response = get_cached_answer(prepared)
+        if cached_response is not None:
+            response = build_answer_response(question, cached_response, prepared, cached=True)
+            yield "token", {"text": response.answer}
+            yield _done(response)
+            return
+        
+        messages = build_messages(question, prepared['context'])
+        marker_filter = KeywordMarkerFilter()
+        raw_parts = []
+        async for delta in stream_chat_completion(messages):
+            raw_parts.append(delta)
+            text = marker_filter.feed(delta)
+            if text:
+                yield "token", {"text": text}
+        text = marker_filter.finish()
+        if text:
+            yield "token", {"text": text}
+        
+        llm_response = "".join(raw_parts).strip()
+        answer_cache = get_answer_cache() if llm_response and prepared['cache_key'] else None
+        if answer_cache is not None:
+            answer_cache.put(prepared['cache_key'], question, llm_response)
+        
+        yield _done(build_answer_response(
+            question,
+            llm_response or "No encontré información específica sobre eso en los datos.",
+            prepared,
+            cached=False
+        ))
+    
+    except NoDocumentsLoadedError as ndle:
+        yield _done(QAResponse(
+            answer=str(ndle),
+            citations=[],
+            hasEnoughContext=False,
+            question=question
+        ))
+    except Exception as e:
+        # Registrar y envolver el error en una excepción más específica
+        error = AnswerGenerationError(question, e)
+        yield "error", {"detail": f"Error al procesar la pregunta: {error.message}"}
@@ -1,16 +1,44 @@
 from .search import search
 from .empy_result import empty_result
-from .format_search_result import format_search_result
+from .format_search_result import format_search_result, format_search_results
 from .load_all_documents import load_all_documents
-from .process_content import process_content
-from .format_result import format_result
+from .process_content import process_content, process_pages
+from .format_result import format_result, format_snippet, format_snippets
+from .term_positions import term_positions, query_tokens
+from .rank_results import rank_results
+from .result_cache import get_search_cache_stats
+from .index_document import index_document, unindex_document, clear_index
+from .index_scheduler import IndexScheduler, get_index_scheduler
+from .shared_index import SharedIndex, get_shared_index, start_search_index, stop_search_index
+from .load_search_index import load_search_index, save_search_index
+from .retrieve_chunks import retrieve_chunks
 
 __all__ = [
     'search',
     'empty_result',
     'format_search_result',
+    'format_search_results',
     'load_all_documents',
     'process_content',
+    'process_pages',
     'format_result',
+    'format_snippet',
+    'format_snippets',
+    'term_positions',
+    'query_tokens',
+    'rank_results',
+    'get_search_cache_stats',
+    'index_document',
+    'unindex_document',
+    'clear_index',
+    'IndexScheduler',
+    'get_index_scheduler',
+    'SharedIndex',
+    'get_shared_index',
+    'start_search_index',
+    'stop_search_index',
+    'load_search_index',
+    'save_search_index',
+    'retrieve_chunks',
 ]
 
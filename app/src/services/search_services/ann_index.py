@@ -0,0 +1,331 @@
+"""
+Approximate nearest neighbour index for chunk embeddings (IVF-PQ, NumPy only).
+
+- A coarse k-means quantizer splits vectors into ``nlist`` inverted lists.
+- The residual of every vector to its list centroid is compressed with a
+  product quantizer (``m`` sub-spaces, 256 centroids each, one byte per
+  sub-space).
+- Queries probe the ``nprobe`` closest lists and score their codes with
+  per-query lookup tables. Optionally, the best candidates are re-ranked
+  with exact vectors.
+
+``nprobe`` is the recall/latency knob: more probed lists mean more
+candidates scored and a higher recall. Similarity is the inner product,
+which is the cosine for the L2-normalized embeddings used by the search.
+
+Vectors added before the index has enough data to train are kept in a flat
+buffer and searched exactly. Once ``train_size`` vectors are buffered the
+quantizers are trained and the buffer is encoded.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VectorLookup = Callable[[np.ndarray], np.ndarray]
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means with squared L2 distance. Returns the centroids."""
+    n = x.shape[0]
+    centroids = x[rng.choice(n, size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=k)
+        present = np.flatnonzero(counts)
+        starts = np.r_[0, np.cumsum(counts)[:-1]][present]
+        centroids[present] = np.add.reduceat(x[order], starts, axis=0) / counts[present, None]
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = x[rng.choice(n, size=empty.size, replace=False)]
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+    """Index of the closest centroid (squared L2) for every row of ``x``."""
+    c_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(x.shape[0], dtype=np.int64)
+    for start in range(0, x.shape[0], batch):
+        block = x[start:start + batch]
+        out[start:start + batch] = np.argmin(c_norms[None, :] - 2 * block @ centroids.T, axis=1)
+    return out
+
+
+class IVFPQIndex:
+    """Inverted file index with product-quantized residuals."""
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: int = 256,
+        m: int = 16,
+        train_size: Optional[int] = None,
+        kmeans_iterations: int = 20,
+        seed: int = 0,
+    ):
+        if dim % m != 0:
+            raise ValueError(f"Dimension {dim} must be divisible by the number of sub-quantizers {m}")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.dsub = dim // m
+        self.train_size = train_size or max(nlist * 39, 256 * 4)
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None   # (nlist, dim)
+        self.codebooks: Optional[np.ndarray] = None   # (m, ksub, dsub)
+        self._list_ids: List[List[np.ndarray]] = [[] for _ in range(nlist)]
+        self._list_codes: List[List[np.ndarray]] = [[] for _ in range(nlist)]
+        self._buffer_ids: List[np.ndarray] = []
+        self._buffer_vectors: List[np.ndarray] = []
+        self._deleted: set = set()
+        self._size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return self._size - len(self._deleted)
+
+    # Building
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Train the coarse quantizer and the residual product quantizer."""
+        rng = np.random.default_rng(self.seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] > self.train_size:
+            vectors = vectors[rng.choice(vectors.shape[0], size=self.train_size, replace=False)]
+        if vectors.shape[0] < self.nlist:
+            raise ValueError(f"At least {self.nlist} vectors are needed to train {self.nlist} lists")
+        centroids = _kmeans(vectors, self.nlist, self.kmeans_iterations, rng)
+
+        residuals = vectors - centroids[_nearest(vectors, centroids)]
+        ksub = min(256, residuals.shape[0])
+        self.codebooks = np.stack([
+            _kmeans(residuals[:, i * self.dsub:(i + 1) * self.dsub], ksub, self.kmeans_iterations, rng)
+            for i in range(self.m)
+        ]).astype(np.float32)
+        self.centroids = centroids.astype(np.float32)
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        codes = np.empty((residuals.shape[0], self.m), dtype=np.uint8)
+        for i in range(self.m):
+            codes[:, i] = _nearest(residuals[:, i * self.dsub:(i + 1) * self.dsub], self.codebooks[i])
+        return codes
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """
+        Insert vectors with the given integer ids (incremental).
+
+        Ids must be unique; to re-insert a deleted id call ``compact`` first.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if ids.size == 0:
+            return
+        self._deleted.difference_update(ids.tolist())
+        self._size += ids.size
+
+        if not self.is_trained:
+            self._buffer_ids.append(ids)
+            self._buffer_vectors.append(vectors)
+            if sum(b.size for b in self._buffer_ids) >= self.train_size:
+                buffered_ids = np.concatenate(self._buffer_ids)
+                buffered = np.concatenate(self._buffer_vectors)
+                self._buffer_ids, self._buffer_vectors = [], []
+                self.train(buffered)
+                self._size -= buffered_ids.size
+                self.add(buffered_ids, buffered)
+            return
+
+        lists = _nearest(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[lists])
+        order = np.argsort(lists, kind='stable')
+        boundaries = np.flatnonzero(np.diff(lists[order])) + 1
+        for group in np.split(order, boundaries):
+            list_no = int(lists[group[0]])
+            self._list_ids[list_no].append(ids[group])
+            self._list_codes[list_no].append(codes[group])
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """Delete vectors by id. Space is reclaimed by ``compact``."""
+        self._deleted.update(int(i) for i in ids)
+
+    def compact(self) -> None:
+        """Physically drop deleted vectors from the lists."""
+        if not self._deleted:
+            return
+        deleted = np.fromiter(self._deleted, dtype=np.int64)
+        for list_no in range(self.nlist):
+            ids, codes = self._list(list_no)
+            keep = ~np.isin(ids, deleted)
+            self._list_ids[list_no] = [ids[keep]] if keep.any() else []
+            self._list_codes[list_no] = [codes[keep]] if keep.any() else []
+        if self._buffer_ids:
+            ids, vectors = np.concatenate(self._buffer_ids), np.concatenate(self._buffer_vectors)
+            keep = ~np.isin(ids, deleted)
+            self._buffer_ids, self._buffer_vectors = [ids[keep]], [vectors[keep]]
+        self._size -= len(self._deleted)
+        self._deleted.clear()
+
+    def remap(self, mapping: np.ndarray) -> None:
+        """
+        Renumber every id to ``mapping[id]``, dropping the ids mapped to -1.
+
+        Follows a compaction of the vector store without retraining.
+        """
+        self.compact()
+        mapping = np.asarray(mapping, dtype=np.int64)
+
+        def renumber(ids: np.ndarray) -> np.ndarray:
+            new = np.full(ids.size, -1, dtype=np.int64)
+            known = ids < mapping.size
+            new[known] = mapping[ids[known]]
+            return new
+
+        size = 0
+        for list_no in range(self.nlist):
+            ids, codes = self._list(list_no)
+            ids = renumber(ids)
+            keep = ids >= 0
+            self._list_ids[list_no] = [ids[keep]] if keep.any() else []
+            self._list_codes[list_no] = [codes[keep]] if keep.any() else []
+            size += int(keep.sum())
+        if self._buffer_ids:
+            ids, vectors = renumber(np.concatenate(self._buffer_ids)), np.concatenate(self._buffer_vectors)
+            keep = ids >= 0
+            self._buffer_ids, self._buffer_vectors = [ids[keep]], [vectors[keep]]
+            size += int(keep.sum())
+        self._size = size
+
+    def _list(self, list_no: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids, codes = self._list_ids[list_no], self._list_codes[list_no]
+        if len(ids) > 1:
+            # Merge the chunks appended by incremental inserts
+            ids, codes = [np.concatenate(ids)], [np.concatenate(codes)]
+            self._list_ids[list_no], self._list_codes[list_no] = ids, codes
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.m), dtype=np.uint8)
+        return ids[0], codes[0]
+
+    # Searching
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: int = 8,
+        refine: int = 0,
+        vectors: Optional[VectorLookup] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by inner product.
+
+        Args:
+            query: Query vector
+            k: Number of neighbours
+            nprobe: Inverted lists scanned (higher = better recall, slower)
+            refine: Re-rank this many PQ candidates with exact vectors
+            vectors: Callable returning the exact vectors of an id array (needed for ``refine``)
+
+        Returns:
+            Tuple of (ids, scores), best first
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        id_parts, score_parts = [], []
+
+        if self._buffer_ids:
+            ids = np.concatenate(self._buffer_ids)
+            id_parts.append(ids)
+            score_parts.append(np.concatenate(self._buffer_vectors) @ query)
+
+        if self.is_trained:
+            coarse = self.centroids @ query
+            probe = np.argsort(-coarse)[:max(1, min(nprobe, self.nlist))]
+            # Inner product with every sub-quantizer centroid, per sub-space
+            lut = np.einsum('mkd,md->mk', self.codebooks, query.reshape(self.m, self.dsub))
+            sub = np.arange(self.m)
+            for list_no in probe:
+                ids, codes = self._list(int(list_no))
+                if ids.size == 0:
+                    continue
+                id_parts.append(ids)
+                score_parts.append(coarse[list_no] + lut[sub, codes].sum(axis=1))
+
+        if not id_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+        if self._deleted:
+            keep = ~np.isin(ids, np.fromiter(self._deleted, dtype=np.int64))
+            ids, scores = ids[keep], scores[keep]
+
+        n = max(k, refine) if vectors is not None else k
+        if ids.size > n:
+            top = np.argpartition(-scores, n - 1)[:n]
+            ids, scores = ids[top], scores[top]
+        if refine and vectors is not None and ids.size:
+            scores = vectors(ids) @ query
+
+        order = np.lexsort((ids, -scores))[:k]
+        return ids[order], scores[order]
+
+    # Persistence
+
+    def save(self, path: Path) -> None:
+        """Write the index to a single ``.npz`` file (atomically replaced)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lists = [self._list(i) for i in range(self.nlist)]
+        buffer_ids = np.concatenate(self._buffer_ids) if self._buffer_ids else np.zeros(0, dtype=np.int64)
+        buffer_vectors = np.concatenate(self._buffer_vectors) if self._buffer_vectors else np.zeros((0, self.dim), dtype=np.float32)
+        params = {
+            'dim': self.dim, 'nlist': self.nlist, 'm': self.m, 'train_size': self.train_size,
+            'kmeans_iterations': self.kmeans_iterations, 'seed': self.seed, 'size': self._size,
+        }
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f,
+                params=np.frombuffer(json.dumps(params).encode('utf-8'), dtype=np.uint8),
+                centroids=self.centroids if self.is_trained else np.zeros((0, self.dim), dtype=np.float32),
+                codebooks=self.codebooks if self.is_trained else np.zeros((0, 0, self.dsub), dtype=np.float32),
+                list_sizes=np.array([ids.size for ids, _ in lists], dtype=np.int64),
+                list_ids=np.concatenate([ids for ids, _ in lists]),
+                list_codes=np.concatenate([codes for _, codes in lists]),
+                buffer_ids=buffer_ids,
+                buffer_vectors=buffer_vectors,
+                deleted=np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted)),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'IVFPQIndex':
+        with np.load(Path(path)) as data:
+            params: Dict = json.loads(data['params'].tobytes().decode('utf-8'))
+            index = cls(
+                params['dim'], params['nlist'], params['m'], params['train_size'],
+                params['kmeans_iterations'], params['seed'],
+            )
+            if data['centroids'].size:
+                index.centroids = data['centroids']
+                index.codebooks = data['codebooks']
+            offsets = np.r_[0, np.cumsum(data['list_sizes'])]
+            list_ids, list_codes = data['list_ids'], data['list_codes']
+            for i in range(index.nlist):
+                if offsets[i + 1] > offsets[i]:
+                    index._list_ids[i] = [list_ids[offsets[i]:offsets[i + 1]]]
+                    index._list_codes[i] = [list_codes[offsets[i]:offsets[i + 1]]]
+            if data['buffer_ids'].size:
+                index._buffer_ids = [data['buffer_ids']]
+                index._buffer_vectors = [data['buffer_vectors']]
+            index._deleted = set(data['deleted'].tolist())
+            index._size = params['size']
+        return index
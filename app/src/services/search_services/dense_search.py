@@ -0,0 +1,276 @@
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.src.config.settings import EMBEDDINGS_DIR, SEARCH_CONFIG
+from app.src.constants import _state
+from app.src.services.index_services import EmbeddingStore, IndexView, segment_embeddings, segment_rows
+from .rank_results import rank_results
+from .ann_index import IVFPQIndex
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_store: Optional[EmbeddingStore] = None
+_ann: Optional[IVFPQIndex] = None
+_row_maps: dict = {}
+# Searches run in worker threads; lazy loading and ANN catch-up must not race
+_lock = threading.RLock()
+
+
+def get_embedding_model():
+    """Load the sentence-transformers model once, on CPU."""
+    global _model
+    with _lock:
+        if _model is None:
+            # Imported lazily: torch is only needed when dense retrieval is enabled
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(SEARCH_CONFIG["dense_model"], device="cpu")
+            logger.info(f"Modelo de embeddings cargado: {SEARCH_CONFIG['dense_model']}")
+        return _model
+
+
+def get_embedding_store() -> EmbeddingStore:
+    global _store
+    with _lock:
+        if _store is None:
+            _store = EmbeddingStore(EMBEDDINGS_DIR, SEARCH_CONFIG["dense_model"])
+        return _store
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """L2-normalized float32 embeddings of a batch of texts."""
+    return get_embedding_model().encode(
+        texts,
+        batch_size=SEARCH_CONFIG["dense_batch_size"],
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    ).astype(np.float32)
+
+
+def get_ann_index() -> Optional[IVFPQIndex]:
+    """
+    IVF-PQ index over every vector of the embedding store.
+    
+    Vector ids are embedding store rows, which only change when the store is
+    compacted (the index is renumbered with it), so the index is caught up
+    incrementally with the vectors appended since the last call.
+    """
+    global _ann
+    store = get_embedding_store()
+    if store.dim is None:
+        return None
+    with _lock:
+        if _ann is None:
+            path = store.path('ann.npz')
+            if path.exists():
+                _ann = IVFPQIndex.load(path)
+            else:
+                _ann = IVFPQIndex(store.dim, nlist=SEARCH_CONFIG["ann_nlist"], m=SEARCH_CONFIG["ann_pq_m"])
+        synced = len(_ann)
+        if synced < len(store):
+            rows = np.arange(synced, len(store))
+            _ann.add(rows, store.vectors(rows))
+        return _ann
+
+
+def refresh_embeddings() -> None:
+    """Map embeddings another process appended to the shared store (multi-worker readers)."""
+    global _ann
+    if SEARCH_CONFIG["dense_enabled"]:
+        store = get_embedding_store()
+        with _lock:
+            epoch = store.epoch
+            added = store.refresh()
+            if store.epoch != epoch:
+                # The builder compacted the store: its ANN index for the new rows is loaded lazily
+                _ann = None
+                _row_maps.clear()
+        if added:
+            logger.info(f"{added} embeddings nuevos del almacén compartido")
+
+
+def save_ann_index() -> None:
+    """Persist the ANN index next to the embedding store."""
+    with _lock:
+        if _ann is not None and _store is not None:
+            _ann.save(_store.path('ann.npz'))
+
+
+def compact_embeddings() -> bool:
+    """
+    Drop the embeddings of chunks that are no longer in the index.
+
+    The store only grows with uploads, so the vectors of deleted documents
+    stay behind until ``dense_compact_ratio`` of its rows are unused by the
+    live rows of the current view. The store is then rewritten with the live
+    rows and the ANN index is renumbered to match. Returns True if it was.
+
+    Called by the process that changes the index (after update batches and
+    rebuilds), never by the readers of a shared index.
+    """
+    if not SEARCH_CONFIG["dense_enabled"]:
+        return False
+    try:
+        store = get_embedding_store()
+        # Merged segments are new objects: their rows are found by content, outside the lock
+        for segment in _state['index'].view.segments:
+            segment_embeddings(segment, store, embed_texts, SEARCH_CONFIG["dense_batch_size"])
+        with _lock:
+            # Rows added from here on belong to views newer than the one read below
+            keep_from = len(store)
+            live = []
+            for segment in _state['index'].view.segments:
+                rows = segment_rows(segment, store)
+                if rows is None:
+                    # Published meanwhile and not embedded yet: try again after the next batch
+                    return False
+                live.append(rows[segment.live_rows()])
+            live = np.unique(np.concatenate(live)) if live else np.zeros(0, dtype=np.int64)
+            if not keep_from or keep_from - live.size < SEARCH_CONFIG["dense_compact_ratio"] * keep_from:
+                return False
+            old_ann = store.path('ann.npz')
+            mapping = store.compact(live, keep_from)
+            if _ann is not None:
+                _ann.remap(mapping)
+            _row_maps.clear()
+            old_ann.unlink(missing_ok=True)
+            return True
+    except Exception as e:
+        logger.error(f"Error al compactar los embeddings: {str(e)}", exc_info=True)
+        return False
+
+
+def embed_view(view: IndexView) -> None:
+    """Embed every segment of a view that is not embedded yet (index time)."""
+    if not SEARCH_CONFIG["dense_enabled"]:
+        return
+    try:
+        store = get_embedding_store()
+        for segment in view.segments:
+            segment_embeddings(segment, store, embed_texts, SEARCH_CONFIG["dense_batch_size"])
+        if SEARCH_CONFIG["ann_enabled"]:
+            get_ann_index()
+    except Exception as e:
+        logger.error(f"Error al generar embeddings: {str(e)}", exc_info=True)
+
+
+def dense_scores(view: IndexView, query: str) -> np.ndarray:
+    """Cosine similarity between the query embedding and every row (tombstones get -inf)."""
+    store = get_embedding_store()
+    query_vec = embed_texts([query])[0]
+    parts = []
+    for segment in view.segments:
+        matrix = segment_embeddings(segment, store, embed_texts, SEARCH_CONFIG["dense_batch_size"])
+        scores = (matrix @ query_vec).astype(np.float64)
+        scores[segment.deleted] = -np.inf
+        parts.append(scores)
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def _store_row_map(view: IndexView) -> Tuple[np.ndarray, np.ndarray]:
+    """Embedding store rows of every live view row, sorted, with the matching view rows."""
+    store = get_embedding_store()
+    key = (view.generation, store.epoch)
+    cached = _row_maps.get(key)
+    if cached is None:
+        store_rows, view_rows, offset = [], [], 0
+        for segment in view.segments:
+            segment_embeddings(segment, store, embed_texts, SEARCH_CONFIG["dense_batch_size"])
+            live = segment.live_rows()
+            store_rows.append(segment_rows(segment, store)[live])
+            view_rows.append(live + offset)
+            offset += segment.n_rows
+        store_rows = np.concatenate(store_rows) if store_rows else np.zeros(0, dtype=np.int64)
+        view_rows = np.concatenate(view_rows) if view_rows else np.zeros(0, dtype=np.int64)
+        # Rows of a stale view can be gone from a compacted store
+        present = store_rows >= 0
+        store_rows, view_rows = store_rows[present], view_rows[present]
+        order = np.argsort(store_rows, kind='stable')
+        cached = (store_rows[order], view_rows[order])
+        _row_maps.clear()
+        _row_maps[key] = cached
+    return cached
+
+
+def ann_dense_ranking(view: IndexView, query: str, n: int) -> Optional[np.ndarray]:
+    """
+    Best ``n`` live rows by embedding similarity, found with the ANN index.
+    
+    Returns None when the ANN index is not trained yet (small corpora are
+    searched exactly instead).
+    """
+    ann = get_ann_index()
+    if ann is None or not ann.is_trained:
+        return None
+    store = get_embedding_store()
+    query_vec = embed_texts([query])[0]
+    # Embeds the view's segments if needed, outside the lock
+    _store_row_map(view)
+    
+    # Over-fetch: the index also holds vectors of deleted or duplicated chunks.
+    # The lock keeps catch-up inserts (get_ann_index in the scheduler or other
+    # searches) from reshaping the inverted lists while they are scanned, and
+    # a compaction from renumbering the ids between the row map and the search
+    with _lock:
+        ann = get_ann_index()
+        if ann is None or not ann.is_trained:
+            return None
+        sorted_store_rows, view_rows = _store_row_map(view)
+        ids, scores = ann.search(
+            query_vec,
+            n * 2,
+            nprobe=SEARCH_CONFIG["ann_nprobe"],
+            refine=SEARCH_CONFIG["ann_refine"],
+            vectors=store.vectors
+        )
+    lo = np.searchsorted(sorted_store_rows, ids, side='left')
+    hi = np.searchsorted(sorted_store_rows, ids, side='right')
+    counts = hi - lo
+    rows = view_rows[np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])] if counts.sum() else np.zeros(0, dtype=np.int64)
+    row_scores = np.repeat(scores, counts).astype(np.float64)
+    order = np.lexsort((rows, -row_scores))
+    return rows[order][:n]
+
+
+def _top_rows(scores: np.ndarray, n: int) -> np.ndarray:
+    """Best ``n`` rows by score, best first (ties by row index)."""
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if candidates.size > n:
+        candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def hybrid_rank(view: IndexView, query: str, page: int, page_size: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Fuse TF-IDF and dense rankings with reciprocal rank fusion.
+    
+    Each ranking contributes ``1 / (rrf_k + rank)`` for its best
+    ``hybrid_candidates`` rows (at least enough to fill the requested page).
+    Fused scores are divided by their maximum possible value so they stay
+    between 0 and 1.
+    
+    Returns:
+        Tuple of (row indices of the page, fused score of every row, number
+        of fused candidates)
+    """
+    rrf_k = SEARCH_CONFIG["rrf_k"]
+    n = max(SEARCH_CONFIG["hybrid_candidates"], page * page_size)
+    
+    sparse = view.score(query)
+    sparse = np.where(sparse > 0, sparse, -np.inf)
+    dense = ann_dense_ranking(view, query, n) if SEARCH_CONFIG["ann_enabled"] else None
+    if dense is None:
+        dense = _top_rows(dense_scores(view, query), n)
+    rankings = [_top_rows(sparse, n), dense]
+    
+    fused = np.zeros(view.n_rows)
+    for ranking in rankings:
+        fused[ranking] += 1.0 / (rrf_k + np.arange(1, ranking.size + 1))
+    fused /= len(rankings) / (rrf_k + 1)
+    
+    page_indices, total = rank_results(fused, page, page_size)
+    return page_indices, fused, total
@@ -1,4 +1,4 @@
-from ..models.search_models import SearchResult
+from app.src.models.search_models import SearchResult
 
 def empty_result(page: int, page_size: int) -> SearchResult:
     """Return an empty search result."""
@@ -1,25 +1,140 @@
-from typing import List
+from bisect import bisect_left
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .term_positions import term_hashes, term_positions
+
+Highlight = Tuple[int, int]
+
+
+def _best_window(offsets: List[int], ends: List[int], term_ids: List[int], n_terms: int,
+                 max_length: int) -> Tuple[int, int]:
+    """
+    Matches [first, last) of the window of ``max_length`` characters that
+    starts at a match and holds the most distinct query terms (then the
+    most matches, then the earliest), in one two-pointer pass.
+    """
+    counts = [0] * n_terms
+    distinct = 0
+    best, best_score = (0, 0), (-1, -1)
+    last = 0
+    for first, offset in enumerate(offsets):
+        # Matches are in offset order and do not overlap, so ends are sorted too
+        limit = offset + max_length
+        while last < len(offsets) and ends[last] <= limit:
+            distinct += not counts[term_ids[last]]
+            counts[term_ids[last]] += 1
+            last += 1
+        score = (distinct, last - first)
+        if score > best_score:
+            best, best_score = (first, last), score
+        counts[term_ids[first]] -= 1
+        distinct -= not counts[term_ids[first]]
+    return best
+
+
+def format_snippets(
+    texts: Sequence[str],
+    query_terms: List[str],
+    max_length: int = 300,
+    token_hashes: Optional[Sequence[np.ndarray]] = None,
+    token_offsets: Optional[Sequence[np.ndarray]] = None
+) -> List[Tuple[str, List[Highlight]]]:
+    """
+    Snippets of chunks around the query terms, with the highlight offsets of the terms in them.
+
+    The window of ``max_length`` characters that starts at a query term and
+    holds the most distinct query terms is centered on its matches and
+    aligned to word boundaries. Matches are whole words: the word hashes
+    recorded at index time (``term_positions``; computed from the texts when
+    not given) of all the chunks of a results page are compared with the
+    query term hashes in one vectorized pass, so the texts are never
+    scanned; only the few matches are walked to place the windows.
+
+    Args:
+        texts: Chunk texts (cleaned and lowercased)
+        query_terms: Query words, see ``query_tokens``
+        max_length: Maximum snippet length, without the ellipses
+        token_hashes: Word hashes of every chunk
+        token_offsets: Word character offsets of every chunk
+
+    Returns:
+        For every chunk, the snippet and the [start, end) offsets of the query terms in it
+    """
+    if not texts:
+        return []
+    if token_hashes is None or token_offsets is None:
+        positions = [term_positions(text) for text in texts]
+        token_hashes = [hashes for hashes, _ in positions]
+        token_offsets = [offsets for _, offsets in positions]
+
+    terms = list(dict.fromkeys(query_terms))
+    term_lengths = [len(term) for term in terms]
+    bounds = np.cumsum([0] + [len(hashes) for hashes in token_hashes])
+    matched, term_ids = np.nonzero(
+        np.concatenate(token_hashes)[:, None]
+        == term_hashes(terms)
+    )
+    words = np.concatenate(token_offsets)
+    # First match of every chunk
+    splits = np.searchsorted(matched, bounds).tolist()
+    match_offsets, term_ids = words[matched].tolist(), term_ids.tolist()
+
+    snippets = []
+    for i, text in enumerate(texts):
+        offsets = match_offsets[splits[i]:splits[i + 1]]
+        ids = term_ids[splits[i]:splits[i + 1]]
+        ends = [offset + term_lengths[term] for offset, term in zip(offsets, ids)]
+
+        start, end = 0, len(text)
+        if len(text) > max_length:
+            last = 0
+            if offsets:
+                first, stop = _best_window(offsets, ends, ids, len(terms), max_length)
+                first, last = offsets[first], ends[stop - 1]
+                # Center the matches, then move forward to the start of a word
+                start = min(max(first - (max_length - (last - first)) // 2, 0), len(text) - max_length)
+                chunk_words = token_offsets[i]
+                word = bisect_left(chunk_words, start)
+                if word < len(chunk_words) and chunk_words[word] <= first:
+                    start = int(chunk_words[word])
+            end = start + max_length
+            # Do not cut the last word in half when a space is close
+            if end < len(text) and not text[end].isspace():
+                space = text.rfind(' ', max(last, start + max_length * 3 // 4), end)
+                if space > start:
+                    end = space
+
+        result = text[start:end]
+        shift = -start
+        if start > 0:
+            result = '...' + result
+            shift += 3
+        if end < len(text):
+            result = result + '...'
+        highlights = [
+            (offset + shift, match_end + shift)
+            for offset, match_end in zip(offsets, ends)
+            if offset >= start and match_end <= end
+        ]
+        snippets.append((result, highlights))
+    return snippets
+
+
+def format_snippet(
+    text: str,
+    query_terms: List[str],
+    max_length: int = 300,
+    token_hashes: Optional[np.ndarray] = None,
+    token_offsets: Optional[np.ndarray] = None
+) -> Tuple[str, List[Highlight]]:
+    """Snippet of one chunk and its highlights, see ``format_snippets``."""
+    if token_hashes is None or token_offsets is None:
+        return format_snippets([text], query_terms, max_length)[0]
+    return format_snippets([text], query_terms, max_length, [token_hashes], [token_offsets])[0]
+
 
 def format_result(text: str, query_terms: List[str], max_length: int = 300) -> str:
     """Format search result to show context around query terms."""
-    if len(text) <= max_length:
-        return text
-        
-    lower_text = text.lower()
-    best_score = -1
-    best_start = 0
-    
-    for start in range(0, len(text) - max_length, max_length // 2):
-        window = lower_text[start:start + max_length]
-        score = sum(1 for term in query_terms if term.lower() in window)
-        if score > best_score:
-            best_score = score
-            best_start = start
-    
-    result = text[best_start:best_start + max_length]
-    if best_start > 0:
-        result = '...' + result
-    if best_start + max_length < len(text):
-        result = result + '...'
-        
-    return result
+    return format_snippet(text, query_terms, max_length)[0]
@@ -1,16 +1,38 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence
+
+from .format_result import format_snippets
+
+
+def format_search_results(indices: Sequence[int], similarities: np.ndarray,
+                          query_terms: List[str], metadata: List[Dict]) -> List[Dict[str, Any]]:
+    """Format a page of search results, finding all their snippets in one pass."""
+    chunks = [metadata[int(idx)] for idx in indices]
+    if all('token_hashes' in meta for meta in chunks):
+        snippets = format_snippets(
+            [meta['text'] for meta in chunks], query_terms,
+            token_hashes=[meta['token_hashes'] for meta in chunks],
+            token_offsets=[meta['token_offsets'] for meta in chunks]
+        )
+    else:
+        snippets = format_snippets([meta['text'] for meta in chunks], query_terms)
+    
+    return [
+        {
+            'document_id': meta['document_id'],
+            'document_name': meta['document_name'],
+            'score': float(similarities[idx]),
+            'text': text,
+            'highlights': highlights,
+            'full_text': meta['text'],
+            'chunk_index': meta['chunk_index'],
+            'page': meta.get('page')
+        }
+        for idx, meta, (text, highlights) in zip(indices, chunks, snippets)
+    ]
 
 
 def format_search_result(idx: int, similarities: np.ndarray, 
                        query_terms: List[str], metadata: List[Dict]) -> Dict[str, Any]:
     """Format a single search result."""
-    meta = metadata[idx]
-    formatted_text = format_result(meta['text'], query_terms)
-    
-    return {
-        'document_id': meta['document_id'],
-        'document_name': meta['document_name'],
-        'score': float(similarities[idx]),
-        'text': formatted_text,
-        'full_text': meta['text'],
-        'chunk_index': meta['chunk_index']
-    }
+    return format_search_results([idx], similarities, query_terms, metadata)[0]
@@ -0,0 +1,81 @@
+"""
+Out-of-core rebuild of a hashed search index.
+
+With ``SEARCH_CONFIG["hashing_features"]`` set, a full rebuild never holds the
+corpus in memory. Catalog documents are read ``hashing_batch_documents`` at a
+time, chunked and tokenized; terms are mapped to columns by feature hashing
+(no vocabulary dict), document and corpus frequencies are accumulated in two
+fixed-size arrays, and each batch's counts and chunk texts are appended
+straight to the files of a new snapshot, which ``load_search_index`` then
+memory-maps as the index. Memory stays flat as the corpus grows: one batch
+plus the per-column arrays.
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from app.src.config.settings import INDEX_DIR, SEARCH_CONFIG, UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import get_document_catalog
+from app.src.services.index_services import HashedTerms, count_terms, smoothed_idf
+from app.src.services.index_services.snapshot import SnapshotWriter
+from .load_document import load_document
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_batches(data_folder: Path, batch_documents: int) -> Iterator[List[Dict[str, Any]]]:
+    catalog = get_document_catalog(data_folder)
+    batch: List[Dict[str, Any]] = []
+    documents = 0
+    for document in catalog.iter_documents(batch_size=batch_documents, stream=True):
+        batch.extend(load_document(document))
+        documents += 1
+        if documents == batch_documents:
+            yield batch
+            batch, documents = [], 0
+    if batch:
+        yield batch
+
+
+def build_hashed_snapshot(data_folder: Path = UPLOAD_DIR, index_dir: Path = INDEX_DIR) -> Path:
+    """
+    Index every catalog document into a new hashed snapshot and publish it.
+
+    Args:
+        data_folder: Upload directory holding the document catalog
+        index_dir: Directory where the snapshot is written
+
+    Returns:
+        Path of the new snapshot directory
+    """
+    index = _state['index']
+    n_features = SEARCH_CONFIG["hashing_features"]
+    terms = HashedTerms(n_features)
+    df = np.zeros(n_features, dtype=np.int64)
+    tf = np.zeros(n_features, dtype=np.int64)
+    source_mtime = get_document_catalog(data_folder).updated_at()
+
+    writer = SnapshotWriter(index_dir, index.generation)
+    try:
+        for chunks in _chunk_batches(data_folder, SEARCH_CONFIG["hashing_batch_documents"]):
+            counted = count_terms(chunks, index.analyzer, terms)
+            if counted is None:
+                continue
+            counts, metadata = counted
+            df += np.bincount(counts.indices, minlength=n_features)
+            tf += np.bincount(counts.indices, weights=counts.data, minlength=n_features).astype(np.int64)
+            writer.add_rows(counts, metadata)
+
+        idf = np.zeros(n_features, dtype=np.float64)
+        live = df > 0
+        idf[live] = smoothed_idf(df[live], writer.n_rows)
+        snapshot_dir = writer.finish(n_features, df, tf, idf, (), source_mtime, hashing_features=n_features)
+    except BaseException:
+        writer.abort()
+        raise
+
+    logger.info(f"Índice con hashing reconstruido: {writer.n_rows} fragmentos, {n_features} columnas")
+    return snapshot_dir
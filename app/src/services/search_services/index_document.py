@@ -0,0 +1,46 @@
+from app.src.config.settings import UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import get_document_catalog
+from .load_document import load_document
+from .dense_search import embed_view
+
+
+def index_document(document_id: str, data_folder=UPLOAD_DIR) -> int:
+    """
+    Add a single saved document to the search index as a new segment.
+    
+    Args:
+        document_id: Id of the document in the catalog
+        data_folder: Upload directory holding the catalog
+        
+    Returns:
+        Number of chunks indexed
+    """
+    document = get_document_catalog(data_folder).get_document(document_id, stream=True)
+    chunks = load_document(document) if document else []
+    if not chunks:
+        return 0
+    
+    view = _state['index'].add_chunks(chunks)
+    # Only the new segment has chunks without embeddings
+    embed_view(view)
+    return len(chunks)
+
+
+def unindex_document(document_id: str) -> int:
+    """
+    Remove a document from the search index by tombstoning its chunks.
+    
+    Args:
+        document_id: Document identifier as stored in the chunk metadata (catalog id)
+        
+    Returns:
+        Number of chunks removed
+    """
+    removed = _state['index'].delete_document(document_id)
+    return removed
+
+
+def clear_index() -> None:
+    """Remove every document from the search index."""
+    _state['index'].clear()
@@ -0,0 +1,193 @@
+"""
+Debounced index maintenance.
+
+Uploads and deletes schedule index mutations instead of applying them one by
+one. A background thread waits until no new mutation has arrived for
+``index_debounce_seconds`` (or ``index_max_delay_seconds`` have passed since
+the first pending one, so a steady stream cannot starve it) and applies the
+whole batch at once: a clear, one multi-document delete and a single new
+segment for every added document, followed by one embedding pass. Every
+call returns a future that completes when its mutation is visible in search,
+so callers can wait for it or not.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.src.config.settings import SEARCH_CONFIG, UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import get_document_catalog
+from .load_document import load_document
+from .dense_search import compact_embeddings, embed_view
+
+logger = logging.getLogger(__name__)
+
+ADD = "add"
+DELETE = "delete"
+CLEAR = "clear"
+
+
+class IndexScheduler:
+    """Collects index mutations and applies them in debounced batches off the event loop."""
+
+    def __init__(self, data_folder: Path, debounce_seconds: float, max_delay_seconds: float):
+        self.data_folder = Path(data_folder)
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, Optional[str], Future]] = []
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._flush = False
+        self._thread: Optional[threading.Thread] = None
+        # Set in multi-worker reader processes: mutations are applied by the
+        # builder process, and callers only wait until a snapshot reflecting
+        # them has been mapped
+        self.remote: Optional[Callable[[], Future]] = None
+        self.batches = 0
+        self.mutations = 0
+
+    def _schedule(self, op: str, document_id: Optional[str] = None) -> Future:
+        remote = self.remote
+        if remote is not None:
+            return remote()
+        future: Future = Future()
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_at = now
+            self._last_at = now
+            self._pending.append((op, document_id, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="index-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def index(self, document_id: str) -> Future:
+        """Add a catalog document to the index. The future yields the number of chunks indexed."""
+        return self._schedule(ADD, document_id)
+
+    def unindex(self, document_id: str) -> Future:
+        """Remove a document from the index. The future yields the number of chunks removed."""
+        return self._schedule(DELETE, document_id)
+
+    def clear(self) -> Future:
+        """Remove every document from the index."""
+        return self._schedule(CLEAR)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Apply pending mutations now and wait for them (e.g. before saving a snapshot)."""
+        with self._cond:
+            futures = [future for _, _, future in self._pending]
+            if futures:
+                # Cleared by the run loop when it takes this batch; a flag set with
+                # nothing pending would skip the debounce of the next mutation
+                self._flush = True
+                self._cond.notify()
+        for future in futures:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Debounce: wait for a quiet period, bounded by the maximum delay
+                while not self._flush:
+                    now = time.monotonic()
+                    deadline = min(self._last_at + self.debounce_seconds, self._first_at + self.max_delay_seconds)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                batch, self._pending = self._pending, []
+                self._flush = False
+            self._apply(batch)
+
+    def _apply(self, batch: List[Tuple[str, Optional[str], Future]]) -> None:
+        results: Dict[int, int] = {}
+        removed: Dict[str, int] = {}
+        try:
+            # A clear discards every mutation scheduled before it
+            last_clear = max((i for i, (op, _, _) in enumerate(batch) if op == CLEAR), default=-1)
+            ops = batch[last_clear + 1:]
+            deleted = {document_id for op, document_id, _ in ops if op == DELETE}
+            index = _state['index']
+            if last_clear >= 0:
+                index.clear()
+            # Documents deleted in the same batch or already indexed are not indexed (again)
+            indexed = index.view.document_ids()
+            added = list(dict.fromkeys(
+                document_id for op, document_id, _ in ops
+                if op == ADD and document_id not in deleted and document_id not in indexed
+            ))
+            if deleted:
+                removed = dict.fromkeys(deleted, 0)
+                for segment in index.view.segments:
+                    for document_id in deleted:
+                        rows = segment.doc_rows.get(document_id)
+                        if rows is not None:
+                            removed[document_id] += int((~segment.deleted[rows]).sum())
+                index.delete_documents(deleted)
+            chunks_by_document: Dict[str, int] = {}
+            if added:
+                catalog = get_document_catalog(self.data_folder)
+                chunks = []
+                for document_id in added:
+                    document = catalog.get_document(document_id, stream=True)
+                    document_chunks = load_document(document) if document else []
+                    chunks_by_document[document_id] = len(document_chunks)
+                    chunks.extend(document_chunks)
+                # One segment for the whole batch; only it has chunks without embeddings
+                view = index.add_chunks(chunks)
+                embed_view(view)
+            if deleted or last_clear >= 0:
+                # Reclaim the embeddings of the removed chunks once enough of them pile up
+                compact_embeddings()
+
+            for i, (op, document_id, _) in enumerate(batch):
+                if op == ADD:
+                    results[i] = chunks_by_document.get(document_id, 0)
+                elif op == DELETE:
+                    results[i] = removed.get(document_id, 0) if i > last_clear else 0
+            self.batches += 1
+            self.mutations += len(batch)
+            logger.info(f"Índice actualizado: {len(batch)} cambios aplicados en un lote "
+                        f"({len(added)} añadidos, {len(deleted)} eliminados)")
+        except Exception as e:
+            logger.error(f"Error al actualizar el índice de búsqueda: {str(e)}", exc_info=True)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for i, (_, _, future) in enumerate(batch):
+            future.set_result(results.get(i))
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            pending = len(self._pending)
+        return {'pending': pending, 'batches': self.batches, 'mutations': self.mutations}
+
+
+_scheduler: Optional[IndexScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_index_scheduler() -> IndexScheduler:
+    """Process-wide index maintenance scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = IndexScheduler(
+                    UPLOAD_DIR,
+                    debounce_seconds=SEARCH_CONFIG["index_debounce_seconds"],
+                    max_delay_seconds=SEARCH_CONFIG["index_max_delay_seconds"]
+                )
+    return _scheduler
@@ -1,32 +1,47 @@
+from pathlib import Path
+from typing import Optional
 
+from app.src.config.settings import SEARCH_CONFIG, UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import get_document_catalog
+from .load_document import load_document
+from .dense_search import compact_embeddings, embed_view
+from .parallel_build import build_index_parallel, build_workers
 
-def load_all_documents(data_folder: Path = UPLOAD_DIR) -> None:
-    """Load and index all documents from the data folder."""
-    data_folder = Path(data_folder)
-    data_folder.mkdir(parents=True, exist_ok=True)
+
+def load_all_documents(data_folder: Path = UPLOAD_DIR, workers: Optional[int] = None) -> None:
+    """
+    Load and index all documents from the data folder's catalog (full rebuild).
+    
+    Args:
+        data_folder: Upload directory holding the document catalog
+        workers: Processes used to chunk and count terms (``SEARCH_CONFIG["build_workers"]`` if None)
+    """
+    catalog = get_document_catalog(data_folder)
+    print(f"\n=== Loading documents from: {catalog.path} ===")
     
-    print(f"\n=== Loading documents from: {data_folder.absolute()} ===")
-    print(f"Directory exists: {data_folder.exists()}")
-    print(f"Directory contents: {list(data_folder.glob('*'))}")
+    workers = build_workers(workers)
+    # Shards are merged through a term dictionary, so hashed indexes are built in one process
+    if workers > 1 and not SEARCH_CONFIG["hashing_features"] and catalog.count() > SEARCH_CONFIG["build_shard_documents"]:
+        view = build_index_parallel(data_folder, workers)
+        print(f"Index rebuilt by {workers} processes with {view.n_live} rows and {view.vocab_size} terms")
+        embed_view(view)
+        compact_embeddings()
+        return
     
-    all_chunks = []
     all_metadata = []
     
-    for filename in os.listdir(data_folder):
-        if filename.endswith('.json'):
-            file_path = data_folder / filename
-            chunks = load_document(file_path)
-            all_chunks.extend(chunk['text'] for chunk in chunks)
-            all_metadata.extend(chunks)
+    # Documents are decompressed in small batches while chunking
+    for document in catalog.iter_documents(stream=True):
+        all_metadata.extend(load_document(document))
     
-    if all_chunks:
-        print(f"\nFound {len(all_chunks)} document chunks to index")
-        tfidf_matrix = _state['vectorizer'].fit_transform(all_chunks)
-        _state.update({
-            'documents': all_chunks,
-            'doc_metadata': all_metadata,
-            'tfidf_matrix': tfidf_matrix
-        })
-        print(f"TF-IDF matrix created with shape: {tfidf_matrix.shape}")
+    if all_metadata:
+        print(f"\nFound {len(all_metadata)} document chunks to index")
+        view = _state['index'].replace_all(all_metadata)
+        print(f"Index rebuilt with {view.n_live} rows and {view.vocab_size} terms")
+        embed_view(view)
     else:
+        _state['index'].clear()
         print("\nNo valid document chunks found to index")
+    # Embeddings of documents deleted since the previous build are no longer needed
+    compact_embeddings()
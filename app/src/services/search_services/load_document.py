@@ -1,27 +1,59 @@
-from ..utils.text_utils import process_content
-from pathlib import Path
-import json
-from typing import List
+from .process_content import process_pages
+from .term_positions import term_positions
+from app.src.utils.text_utils import iter_text_blocks
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-def load_document(file_path: Path) -> List[DocumentChunk]:
-    """Load and process a single document file."""
+def iter_document_pages(data: Dict[str, Any]) -> Iterator[Tuple[Optional[int], str]]:
+    """
+    Yield (page number, text) pieces of a saved document, in order.
+    
+    The content is read a block at a time, from ``content_blocks`` (streamed
+    from the catalog) or from ``content``; a page may come in several pieces.
+    """
+    blocks = data.get('content_blocks')
+    if blocks is None:
+        blocks = iter_text_blocks(data.get('content', data.get('contenido', '')))
+    page_offsets = data.get('page_offsets')
+    if not page_offsets:
+        for block in blocks:
+            yield None, block
+        return
+    
+    # Page i spans the characters [page_offsets[i][1], page_offsets[i + 1][1])
+    page = 0
+    position = 0
+    for block in blocks:
+        cursor = 0
+        while cursor < len(block):
+            while page + 1 < len(page_offsets) and page_offsets[page + 1][1] <= position + cursor:
+                page += 1
+            end = len(block) if page + 1 == len(page_offsets) else min(len(block), page_offsets[page + 1][1] - position)
+            yield page_offsets[page][0], block[cursor:end]
+            cursor = end
+        position += len(block)
+
+def load_document(document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a catalog document (as returned by ``DocumentCatalog.get_document``) into index chunks."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        content = data.get('contenido', '')
-        chunks = process_content(content)
+        metadata = document.get('metadata', {})
+        document_name = document.get('original_filename') or metadata.get('nombre_original', document['id'])
         
-        return [
-            {
-                'document_id': file_path.name,
-                'document_name': data.get('metadata', {}).get('nombre_original', file_path.name),
+        chunks = []
+        for i, chunk in enumerate(process_pages(iter_document_pages(document))):
+            # Word positions, so search snippets never re-scan the text
+            token_hashes, token_offsets = term_positions(chunk.text)
+            chunks.append({
+                'document_id': document['id'],
+                'document_name': document_name,
                 'chunk_index': i,
-                'text': chunk
-            }
-            for i, chunk in enumerate(chunks)
-            if len(chunk) >= 20  # Skip very short chunks
-        ]
+                'page': chunk.page,
+                'text': chunk.text,
+                'start': chunk.start,
+                'end': chunk.end,
+                'token_hashes': token_hashes,
+                'token_offsets': token_offsets
+            })
+        return chunks
     except Exception as e:
-        print(f"Error loading {file_path}: {str(e)}")
+        print(f"Error loading {document.get('id')}: {str(e)}")
         return []
@@ -0,0 +1,82 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.src.config.settings import INDEX_DIR, SEARCH_CONFIG, UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.index_services import load_snapshot, read_manifest, save_snapshot
+from app.src.services.file_services.document_catalog import get_document_catalog
+from .load_all_documents import load_all_documents
+from .hashed_build import build_hashed_snapshot
+from .dense_search import embed_view, save_ann_index
+
+logger = logging.getLogger(__name__)
+
+
+def save_search_index(data_folder: Path = UPLOAD_DIR, index_dir: Path = INDEX_DIR) -> None:
+    """Persist the current index as a memory-mappable snapshot."""
+    source_mtime = get_document_catalog(data_folder).updated_at()
+    save_snapshot(_state['index'].view, index_dir, source_mtime)
+    save_ann_index()
+
+
+def attach_snapshot(index_dir: Path = INDEX_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Memory-map the current snapshot and publish it as the index view.
+    
+    Returns:
+        The snapshot manifest, or None if there is no usable snapshot
+    """
+    snapshot = load_snapshot(index_dir)
+    if snapshot is None:
+        return None
+    view = _state['index'].restore(
+        snapshot['segment'],
+        snapshot['terms'],
+        weights=snapshot['weights'],
+        norms=snapshot['norms']
+    )
+    embed_view(view)
+    logger.info(f"Índice cargado desde snapshot: {view.n_live} fragmentos, {view.vocab_size} términos")
+    return snapshot['manifest']
+
+
+def load_search_index(data_folder: Path = UPLOAD_DIR, index_dir: Path = INDEX_DIR) -> None:
+    """
+    Load the search index at startup.
+    
+    Memory-maps the persisted snapshot when it is at least as new as the last
+    change to the document catalog, and only falls back to a full ``load_all_documents`` rebuild
+    (followed by writing a fresh snapshot) when it is missing or stale. With
+    ``hashing_features`` set the rebuild is out of core: it writes the
+    snapshot batch by batch and then maps it.
+    
+    Args:
+        data_folder: Upload directory holding the document catalog
+        index_dir: Directory with the index snapshots
+    """
+    source_mtime = get_document_catalog(data_folder).updated_at()
+    current = read_manifest(index_dir)
+    
+    hashing_features = SEARCH_CONFIG["hashing_features"]
+    
+    if (current is not None and current[1].get('source_mtime', 0) >= source_mtime
+            and current[1].get('hashing_features', 0) == hashing_features):
+        try:
+            if attach_snapshot(index_dir) is not None:
+                return
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el snapshot del índice, reconstruyendo: {str(e)}")
+    else:
+        logger.info("Snapshot del índice inexistente o desactualizado, reconstruyendo")
+    
+    if hashing_features:
+        build_hashed_snapshot(data_folder, index_dir)
+        attach_snapshot(index_dir)
+        return
+    
+    load_all_documents(data_folder)
+    try:
+        save_snapshot(_state['index'].view, index_dir, source_mtime)
+    except Exception as e:
+        logger.error(f"No se pudo guardar el snapshot del índice: {str(e)}")
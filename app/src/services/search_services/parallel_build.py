@@ -0,0 +1,90 @@
+"""
+Parallel full rebuild of the search index.
+
+The catalog's documents are split, in indexing order, into shards of
+``build_shard_documents`` documents. A process pool decompresses, cleans,
+chunks and counts the terms of every shard with a term dictionary of its own,
+so the cores work without sharing anything. The parent merges the shards as
+they arrive, in order: every shard's local terms are added to the global
+dictionary in their order of first appearance and its columns remapped, which
+gives exactly the vocabulary, term ids and count matrix (and therefore the
+IDF and rankings) of the serial ``replace_all``.
+"""
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import scipy.sparse as sp
+
+from app.src.config.settings import SEARCH_CONFIG
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import DocumentCatalog, get_document_catalog
+from app.src.services.index_services import IndexView, TermDictionary, count_terms
+from .load_document import load_document
+
+logger = logging.getLogger(__name__)
+
+Shard = Tuple[List[str], sp.csr_matrix, List[Dict[str, Any]]]
+
+# Set in each worker process by ``_init_worker``
+_worker: Dict[str, Any] = {}
+
+
+def build_workers(workers: Optional[int] = None) -> int:
+    """Number of processes used for a full rebuild (0 in the configuration: one per CPU)."""
+    workers = SEARCH_CONFIG["build_workers"] if workers is None else workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker(catalog_path: str, analyzer: Callable[[str], List[str]]) -> None:
+    # Each worker opens its own connection; the parent's cannot cross processes
+    _worker['catalog'] = DocumentCatalog(Path(catalog_path))
+    _worker['analyzer'] = analyzer
+
+
+def _count_shard(document_ids: List[str]) -> Optional[Shard]:
+    catalog = _worker['catalog']
+    terms = TermDictionary()
+    chunks = (
+        chunk
+        for document in catalog.iter_documents(ids=document_ids, stream=True)
+        for chunk in load_document(document)
+    )
+    counted = count_terms(chunks, _worker['analyzer'], terms)
+    if counted is None:
+        return None
+    counts, metadata = counted
+    return terms.terms(), counts, metadata
+
+
+def build_index_parallel(data_folder: Path, workers: int, shard_documents: Optional[int] = None) -> IndexView:
+    """
+    Rebuild the index from every catalog document using a pool of ``workers`` processes.
+
+    Args:
+        data_folder: Upload directory holding the document catalog
+        workers: Number of worker processes
+        shard_documents: Documents per task (``SEARCH_CONFIG["build_shard_documents"]`` if None)
+
+    Returns:
+        The published view
+    """
+    catalog = get_document_catalog(data_folder)
+    shard_documents = shard_documents or SEARCH_CONFIG["build_shard_documents"]
+    ids = catalog.ordered_ids()
+    shards = [ids[start:start + shard_documents] for start in range(0, len(ids), shard_documents)]
+    index = _state['index']
+
+    # spawn: the parent has threads (scheduler, merger) and an open SQLite
+    # connection, neither of which survives a fork safely
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        processes=min(workers, max(1, len(shards))),
+        initializer=_init_worker,
+        initargs=(str(catalog.path), index.analyzer)
+    ) as pool:
+        # imap keeps shard order, so merging can start as soon as the first shard is done
+        counted = (shard for shard in pool.imap(_count_shard, shards) if shard is not None)
+        return index.replace_all_counts(counted)
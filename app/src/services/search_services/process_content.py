@@ -1,7 +1,17 @@
-from ..utils.text_utils import clean_text, split_into_chunks
-from typing import List
+from app.src.config.settings import CHUNK_CONFIG
+from app.src.utils.text_utils import TextChunk, iter_chunks
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 def process_content(content: str) -> List[str]:
     """Process content into clean, meaningful chunks."""
-    cleaned = clean_text(content).lower()
-    return split_into_chunks(cleaned)
\ No newline at end of file
+    return [chunk.text for chunk in process_pages([(None, content)])]
+
+def process_pages(pages: Iterable[Tuple[Optional[int], str]]) -> Iterator[TextChunk]:
+    """Stream (page number, text) pieces into cleaned, lowercased, overlapping chunks with their offsets."""
+    return iter_chunks(
+        pages,
+        size=CHUNK_CONFIG["size"],
+        overlap=CHUNK_CONFIG["overlap"],
+        unit=CHUNK_CONFIG["unit"],
+        min_chars=CHUNK_CONFIG["min_chars"]
+    )
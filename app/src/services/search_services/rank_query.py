@@ -0,0 +1,50 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from .rank_results import rank_results
+from .dense_search import hybrid_rank
+from app.src.config.settings import SEARCH_CONFIG
+from app.src.services.index_services import IndexView, bm25_search
+
+SEARCH_ENGINES = ("tfidf", "bm25", "hybrid")
+
+def resolve_engine(engine: Optional[str]) -> str:
+    """Validate the requested engine, applying the configured default and the hybrid fallback."""
+    engine = engine or SEARCH_CONFIG["engine"]
+    if engine not in SEARCH_ENGINES:
+        raise ValueError(f"Unknown search engine: {engine}. Available: {', '.join(SEARCH_ENGINES)}")
+    if engine == "hybrid" and not SEARCH_CONFIG["dense_enabled"]:
+        # Dense retrieval is optional; without it hybrid is plain TF-IDF
+        engine = "tfidf"
+    return engine
+
+def rank_query(view: IndexView, query: str, page: int, page_size: int, engine: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Rank the rows of a pinned view for a query.
+    
+    Returns:
+        Tuple of (row ids of the requested page best first, score of every row, total matches)
+    """
+    if engine == "bm25":
+        # Inverted index with block-max pruning: only rows that can reach the page are scored
+        top_rows, top_scores, total_results = bm25_search(
+            view,
+            query,
+            page * page_size,
+            k1=SEARCH_CONFIG["bm25_k1"],
+            b=SEARCH_CONFIG["bm25_b"],
+            block_size=SEARCH_CONFIG["bm25_block_size"]
+        )
+        page_indices = top_rows[(page - 1) * page_size:]
+        similarities = np.zeros(view.n_rows)
+        similarities[top_rows] = top_scores
+    elif engine == "hybrid":
+        # Reciprocal rank fusion of TF-IDF and sentence embedding rankings
+        page_indices, similarities, total_results = hybrid_rank(view, query, page, page_size)
+    else:
+        # Cosine similarity against every live segment (tombstones score 0)
+        similarities = view.score(query)
+        
+        # Partial selection of the requested page; total counts every match
+        page_indices, total_results = rank_results(similarities, page, page_size)
+    return page_indices, similarities, total_results
@@ -0,0 +1,40 @@
+import numpy as np
+from typing import Tuple
+
+
+def rank_results(similarities: np.ndarray, page: int, page_size: int) -> Tuple[np.ndarray, int]:
+    """
+    Select the rows of one result page without sorting every match.
+    
+    Only the top ``page * page_size`` scores are partially selected with
+    ``argpartition`` and sorted. Ties are broken by row index, so the page is
+    identical to a stable full sort by descending score.
+    
+    Args:
+        similarities: Score of every indexed row
+        page: Page number (starts at 1)
+        page_size: Number of results per page
+        
+    Returns:
+        Tuple with the row indices of the requested page, best first, and the
+        total number of rows with a positive score
+    """
+    valid = np.flatnonzero(similarities > 0)
+    total = int(valid.size)
+    start = (page - 1) * page_size
+    k = min(start + page_size, total)
+    if start >= k:
+        return np.empty(0, dtype=np.int64), total
+    
+    scores = similarities[valid]
+    if k < total:
+        # k-th best score; keep everything above it and the first tied rows
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - above.size]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(total)
+    
+    order = np.lexsort((candidates, -scores[candidates]))
+    return valid[candidates[order]][start:k], total
@@ -0,0 +1,22 @@
+import re
+from typing import Any, Dict
+
+from app.src.config.settings import SEARCH_CONFIG
+from app.src.utils.cache_utils import LRUCache
+
+# Ranked and formatted result pages, keyed by index generation and normalized query
+search_cache = LRUCache(
+    max_bytes=SEARCH_CONFIG["cache_max_bytes"],
+    ttl_seconds=SEARCH_CONFIG["cache_ttl_seconds"],
+    max_entries=SEARCH_CONFIG["cache_max_entries"]
+)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and size of the search result cache."""
+    return search_cache.stats()
@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Optional
+
+from app.src.services.index_services import IndexView
+
+from .rank_query import resolve_engine, rank_query
+from app.src.constants import _state
+
+def retrieve_chunks(query: str, k: int, engine: Optional[str] = None,
+                    view: Optional[IndexView] = None) -> List[Dict[str, Any]]:
+    """
+    Top-k chunks for a query with their full text and score.
+    
+    Uses the same ranking as search() but returns the chunk metadata
+    untruncated, which is what the QA context packer needs.
+    
+    Args:
+        query: Free-text query
+        k: Number of chunks to return
+        engine: Ranking engine (defaults to SEARCH_CONFIG["engine"])
+        view: Index view pinned by the caller (the current one by default)
+        
+    Returns:
+        Chunk metadata dicts (best first) with an added 'score' key
+    """
+    engine = resolve_engine(engine)
+    if view is None:
+        view = _state['index'].view
+    query = query.strip().lower()
+    if not query or not view.n_live or k <= 0:
+        return []
+    
+    page_indices, similarities, total_results = rank_query(view, query, 1, k, engine)
+    if not total_results:
+        return []
+    
+    metadata = view.metadata
+    return [
+        {**metadata[int(idx)], 'score': float(similarities[idx])}
+        for idx in page_indices
+        if similarities[idx] > 0
+    ]
@@ -1,43 +1,81 @@
-from empy_result import empty_result
-from format_search_result import format_search_result
-from ..models.search_models import SearchResult
-from sklearn.metrics.pairwise import cosine_similarity
-import re
-from ..constants import _state
+import asyncio
+from typing import Optional
 
-async def search(query: str, page: int = 1, page_size: int = 10) -> SearchResult:
-    """Search for relevant passages in the documents with pagination."""
-    if not query.strip() or not _state['documents'] or _state['tfidf_matrix'] is None:
+from .empy_result import empty_result
+from .format_search_result import format_search_results
+from .rank_query import resolve_engine, rank_query
+from .result_cache import search_cache, normalize_query
+from .term_positions import query_tokens
+from app.src.models.search_models import SearchResult
+from app.src.constants import _state
+from app.src.services.index_services import IndexView
+from app.src.utils.single_flight_utils import SingleFlight
+
+# In-flight rankings, keyed like the result cache
+search_flight = SingleFlight()
+
+async def search(query: str, page: int = 1, page_size: int = 10, engine: Optional[str] = None) -> SearchResult:
+    """
+    Search for relevant passages in the documents with pagination.
+    
+    Args:
+        query: Search query
+        page: Page number (starts at 1)
+        page_size: Number of results per page
+        engine: Ranking engine, "tfidf", "bm25" or "hybrid" (defaults to SEARCH_CONFIG["engine"])
+    """
+    engine = resolve_engine(engine)
+    
+    # Pin the published index view for the whole request
+    view = _state['index'].view
+    if not query.strip() or not view.n_live:
         return empty_result(page, page_size)
     
+    # Cached pages are only valid for the generation they were computed on
+    search_cache.set_generation(view.generation)
+    cache_key = (view.generation, normalize_query(query), page, page_size, engine)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return _copy_response(cached)
+    
+    # Concurrent identical requests share one ranking, run off the event loop
+    response = await search_flight.do(
+        cache_key,
+        lambda: asyncio.to_thread(_rank_page, view, query, page, page_size, engine, cache_key)
+    )
+    return _copy_response(response)
+
+
+def _copy_response(response: dict) -> dict:
+    """Copy of a cached or shared page, down to its hits, so callers can modify it freely."""
+    return {
+        **response,
+        'results': [
+            {**hit, 'highlights': list(hit['highlights'])} if 'highlights' in hit else dict(hit)
+            for hit in response['results']
+        ]
+    }
+
+
+def _rank_page(view: IndexView, query: str, page: int, page_size: int, engine: str, cache_key: tuple) -> dict:
+    """Rank and format one page of results for a pinned view, caching the response."""
     try:
         query = query.strip().lower()
-        query_terms = re.findall(r'\b[\w-]+\b', query, re.UNICODE)
+        # Words as they appear in the cleaned chunk texts, for snippets and highlights
+        query_terms = query_tokens(query)
         
         if not query_terms:
             return empty_result(page, page_size)
         
-        query_vec = _state['vectorizer'].transform([query])
-        similarities = cosine_similarity(query_vec, _state['tfidf_matrix']).flatten()
-        
-        valid_indices = [i for i, score in enumerate(similarities) if score > 0]
-        if not valid_indices:
-            return empty_result(page, page_size)
-            
-        # Sort by score in descending order
-        sorted_indices = sorted(valid_indices, key=lambda i: -similarities[i])
-        total_results = len(sorted_indices)
+        page_indices, similarities, total_results = rank_query(view, query, page, page_size, engine)
+        if not total_results:
+            # Popular queries without matches are worth caching as well
+            response = empty_result(page, page_size)
+            search_cache.put(cache_key, response)
+            return response
         total_pages = (total_results + page_size - 1) // page_size
         
-        # Get paginated results
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        page_indices = sorted_indices[start_idx:end_idx]
-        
-        results = [
-            format_search_result(idx, similarities, query_terms, _state['doc_metadata'])
-            for idx in page_indices
-        ]
+        results = format_search_results(page_indices, similarities, query_terms, view.metadata)
         
         # Format results to match the expected API response
         formatted_results = [{
@@ -45,16 +83,20 @@ async def search(query: str, page: int = 1, page_size: int = 10) -> SearchResult
             'documentName': r['document_name'],
             'relevanceScore': r['score'],
             'document_id': r['document_id'],
-            'chunk_index': r['chunk_index']
+            'chunk_index': r['chunk_index'],
+            'page': r['page'],
+            'highlights': r['highlights']
         } for r in results]
         
-        return {
+        response = {
             'results': formatted_results,
             'total': total_results,
             'page': page,
             'pageSize': page_size,  # Match the frontend's expected casing
             'totalPages': total_pages  # Match the frontend's expected casing
         }
+        search_cache.put(cache_key, response)
+        return response
         
     except Exception as e:
         print(f"Error during search: {str(e)}")
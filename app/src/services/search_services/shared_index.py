@@ -0,0 +1,210 @@
+"""
+One read-only index shared by several worker processes.
+
+With ``SEARCH_CONFIG["shared_index"]`` enabled (e.g. ``uvicorn --workers N``
+with ``INDEX_SHARED=1``), the worker that takes an exclusive ``flock`` on
+``INDEX_DIR/builder.lock`` becomes the builder. It is the only process that
+changes the index. Every ``shared_poll_seconds`` it reconciles the index with
+the document catalog, which every worker writes to, and publishes a snapshot
+when the index changed. The other workers are readers. They memory-map the
+current snapshot read-only, so its pages live once in the OS page cache
+whatever the number of workers, and re-map it when ``CURRENT`` points to a
+newer one. A reader takes over as builder if the builder process exits and
+releases the lock.
+
+Without ``shared_index`` the process owns its index as before.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process acts as its own builder
+    fcntl = None
+
+from app.src.config.settings import INDEX_DIR, SEARCH_CONFIG, UPLOAD_DIR
+from app.src.constants import _state
+from app.src.services.index_services import read_manifest, save_snapshot
+from app.src.services.file_services.document_catalog import get_document_catalog
+from .dense_search import refresh_embeddings, save_ann_index
+from .index_scheduler import get_index_scheduler
+from .load_search_index import attach_snapshot, load_search_index, save_search_index
+
+logger = logging.getLogger(__name__)
+
+BUILDER_LOCK = "builder.lock"
+BUILDER = "builder"
+READER = "reader"
+
+
+class SharedIndex:
+    """Builder election, snapshot publication and re-mapping for multi-worker deployments."""
+
+    def __init__(self, data_folder: Path, index_dir: Path, poll_seconds: float):
+        self.data_folder = Path(data_folder)
+        self.index_dir = Path(index_dir)
+        self.poll_seconds = poll_seconds
+        self.role: Optional[str] = None
+        self._lock_fd: Optional[int] = None
+        # Catalog time reflected by the snapshot this process serves
+        self._visible_mtime = 0.0
+        self._attached: Optional[float] = None
+        self._published_generation: Optional[int] = None
+        self._reconciled_mtime = 0.0
+        self._waiters: List[Tuple[float, Future]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.index_dir / BUILDER_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Held (and released by the OS if the process dies) for the life of the process
+        self._lock_fd = fd
+        return True
+
+    def start(self) -> None:
+        """Take the builder or reader role, load the index and start polling."""
+        if self._try_lock():
+            self._become_builder()
+        else:
+            self.role = READER
+            get_index_scheduler().remote = self.wait_visible
+            self._attach()
+            logger.info(f"Proceso {os.getpid()}: lector del índice compartido")
+        self._thread = threading.Thread(target=self._run, name="shared-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 5)
+
+    def _become_builder(self) -> None:
+        self.role = BUILDER
+        get_index_scheduler().remote = None
+        # Mapped snapshot or full rebuild (which also publishes a snapshot)
+        mtime = get_document_catalog(self.data_folder).updated_at()
+        load_search_index(self.data_folder, self.index_dir)
+        current = read_manifest(self.index_dir)
+        self._reconciled_mtime = current[1].get('source_mtime', 0.0) if current else 0.0
+        self._published_generation = _state['index'].generation
+        if self._reconciled_mtime < mtime:
+            # The snapshot predates the catalog: let the first poll reconcile it
+            self._published_generation = None
+        self._set_visible(self._reconciled_mtime)
+        logger.info(f"Proceso {os.getpid()}: constructor del índice compartido")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                if self.role == READER:
+                    if self._try_lock():
+                        logger.info("El constructor del índice terminó, este proceso toma su lugar")
+                        self._become_builder()
+                    else:
+                        self._attach()
+                else:
+                    self._reconcile()
+            except Exception as e:
+                logger.error(f"Error en el índice compartido ({self.role}): {str(e)}", exc_info=True)
+
+    def _attach(self) -> None:
+        """Reader: map the current snapshot if it is not the one already served."""
+        current = read_manifest(self.index_dir)
+        if current is None or current[1]['created_at'] == self._attached:
+            return
+        refresh_embeddings()
+        manifest = attach_snapshot(self.index_dir)
+        if manifest is not None:
+            self._attached = manifest['created_at']
+            self._set_visible(manifest.get('source_mtime', 0.0))
+
+    def _reconcile(self) -> None:
+        """Builder: apply catalog changes made by any worker, then publish a snapshot."""
+        catalog = get_document_catalog(self.data_folder)
+        mtime = catalog.updated_at()
+        if mtime > self._reconciled_mtime:
+            # Ids are read after the time, so the snapshot never claims more than it holds
+            catalog_ids = catalog.ids()
+            indexed = _state['index'].view.document_ids()
+            scheduler = get_index_scheduler()
+            futures = [scheduler.index(d) for d in catalog_ids - indexed]
+            futures += [scheduler.unindex(d) for d in indexed - catalog_ids]
+            for future in futures:
+                future.result()
+            self._reconciled_mtime = mtime
+
+        view = _state['index'].view
+        if view.generation != self._published_generation or self._reconciled_mtime > self._visible_mtime:
+            # ANN first: readers load it for the embedding epoch they map with the snapshot
+            save_ann_index()
+            save_snapshot(view, self.index_dir, self._reconciled_mtime, keep=2)
+            self._published_generation = view.generation
+            self._set_visible(self._reconciled_mtime)
+
+    def _set_visible(self, mtime: float) -> None:
+        with self._lock:
+            self._visible_mtime = max(self._visible_mtime, mtime)
+            ready = [future for target, future in self._waiters if target <= self._visible_mtime]
+            self._waiters = [(target, future) for target, future in self._waiters if target > self._visible_mtime]
+        for future in ready:
+            future.set_result(None)
+
+    def wait_visible(self) -> Future:
+        """Future completed once the catalog as of now is reflected by the mapped snapshot."""
+        target = get_document_catalog(self.data_folder).updated_at()
+        future: Future = Future()
+        with self._lock:
+            if target > self._visible_mtime:
+                self._waiters.append((target, future))
+                return future
+        future.set_result(None)
+        return future
+
+    def save(self) -> None:
+        """Persist the index on shutdown; readers never write snapshots."""
+        if self.role == BUILDER:
+            # Pick up changes other workers made since the last poll before publishing
+            self._reconcile()
+
+
+_shared: Optional[SharedIndex] = None
+
+
+def get_shared_index() -> Optional[SharedIndex]:
+    """Process-wide coordinator, None when the index is not shared between workers."""
+    global _shared
+    if _shared is None and SEARCH_CONFIG["shared_index"]:
+        _shared = SharedIndex(UPLOAD_DIR, INDEX_DIR, SEARCH_CONFIG["shared_poll_seconds"])
+    return _shared
+
+
+def start_search_index() -> None:
+    """Load the index at startup, as builder/reader when it is shared between workers."""
+    shared = get_shared_index()
+    if shared is None:
+        load_search_index()
+    else:
+        shared.start()
+
+
+def stop_search_index() -> None:
+    """Persist the index at shutdown (only the builder does when it is shared)."""
+    shared = get_shared_index()
+    if shared is None:
+        save_search_index()
+    else:
+        shared.stop()
+        shared.save()
@@ -0,0 +1,33 @@
+import re
+import zlib
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from app.src.utils.text_utils import clean_text
+
+# Words of a chunk (or a query) as far as snippets and highlights are concerned
+TOKEN_PATTERN = re.compile(r'[\w-]+', re.UNICODE)
+
+
+def term_hashes(terms: Iterable[str]) -> np.ndarray:
+    """32-bit hash of every term (CRC-32 of its UTF-8 bytes)."""
+    return np.fromiter((zlib.crc32(term.encode('utf-8', 'surrogatepass')) for term in terms), dtype=np.uint32)
+
+
+def term_positions(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash and character offset of every word of a chunk text, in order.
+
+    Computed once at index time, so a snippet only needs a vectorized scan
+    of these arrays instead of searching the text for every query term.
+    """
+    matches = list(TOKEN_PATTERN.finditer(text))
+    hashes = term_hashes(match.group() for match in matches)
+    offsets = np.fromiter((match.start() for match in matches), dtype=np.uint32, count=len(matches))
+    return hashes, offsets
+
+
+def query_tokens(query: str) -> List[str]:
+    """Words of a query, cleaned and lowercased like the indexed chunk texts."""
+    return TOKEN_PATTERN.findall(clean_text(query).lower())
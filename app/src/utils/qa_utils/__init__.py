@@ -1,19 +1,32 @@
 
-from app.src.utils.qa_utils.client_utils import get_client
+from app.src.utils.qa_utils.client_utils import get_client, get_async_client, close_async_client
 from app.src.utils.qa_utils.document_utils import check_documents_exist
 from app.src.utils.qa_utils.format_utils import format_json_for_prompt, format_sources
-from app.src.utils.qa_utils.llm_utils import generate_answer_with_llm
+from app.src.utils.qa_utils.llm_utils import generate_answer_with_llm, chat_completion, stream_chat_completion, build_messages
+from app.src.utils.qa_utils.context_utils import count_tokens, pack_context
+from app.src.utils.qa_utils.answer_cache_utils import get_answer_cache, get_answer_cache_stats, answer_cache_key
 from app.src.utils.qa_utils.citation_utils import create_citations
 from app.src.utils.qa_utils.keyword_utils import extract_keywords
-from app.src.utils.qa_utils.response_utils import clean_response
+from app.src.utils.qa_utils.response_utils import clean_response, KeywordMarkerFilter
 
 __all__ = [
     'get_client',
+    'get_async_client',
+    'close_async_client',
     'check_documents_exist',
     'format_json_for_prompt',
     'format_sources',
     'generate_answer_with_llm',
+    'chat_completion',
+    'stream_chat_completion',
+    'build_messages',
+    'count_tokens',
+    'pack_context',
+    'get_answer_cache',
+    'get_answer_cache_stats',
+    'answer_cache_key',
     'create_citations',
     'extract_keywords',
-    'clean_response'
+    'clean_response',
+    'KeywordMarkerFilter'
 ]
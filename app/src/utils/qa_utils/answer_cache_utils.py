@@ -0,0 +1,161 @@
+"""Persistent SQLite cache of raw LLM answers for QA service."""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.src.config.settings import CACHE_DIR, LLM_CONFIG, QA_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different spellings share a cache entry."""
+    return re.sub(r'\s+', ' ', question.strip().lower())
+
+def answer_cache_key(question: str, generation: int, context: List[Dict[str, Any]]) -> str:
+    """
+    Cache key of an answer.
+    
+    Combines the normalized question, the index generation, the model and a
+    hash of the packed context, so a changed corpus or context never replays
+    a stale answer (generations restart with the process; the context hash
+    does not).
+    """
+    context_hash = hashlib.sha256(
+        json.dumps([doc.get('content', '') for doc in context], ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+    raw = json.dumps([normalize_question(question), generation, LLM_CONFIG["model"], context_hash])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class AnswerCache:
+    """
+    Disk-backed map from cache key to the raw LLM response.
+    
+    Entries older than ``ttl_seconds`` are dropped, and the least recently
+    used ones are evicted once the stored responses exceed ``max_bytes``.
+    Hit/miss counters cover the current process.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One autocommit connection per process, serialized by the lock;
+        # WAL lets several worker processes share the file
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            conn = self._conn
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_accessed_at ON answers (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            row = conn.execute("SELECT response, created_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, question: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode('utf-8')) + len(question.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._conn
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, question, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, question, response, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self.evictions += conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM answers").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, until the cache fits again
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM answers ORDER BY accessed_at"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM answers WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._conn
+            conn.execute("DELETE FROM answers")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._conn
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM answers").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Shared answer cache, or None when it is disabled or cannot be opened."""
+    global _answer_cache
+    if not QA_CONFIG["answer_cache_enabled"]:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                try:
+                    _answer_cache = AnswerCache(
+                        CACHE_DIR / "answers.sqlite3",
+                        max_bytes=QA_CONFIG["answer_cache_max_bytes"],
+                        ttl_seconds=QA_CONFIG["answer_cache_ttl_seconds"]
+                    )
+                except sqlite3.Error as e:
+                    logger.error(f"No se pudo abrir la caché de respuestas: {str(e)}")
+                    return None
+    return _answer_cache
+
+def get_answer_cache_stats() -> Optional[Dict[str, Any]]:
+    """Hit/miss counters and size of the answer cache, None when disabled."""
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else None
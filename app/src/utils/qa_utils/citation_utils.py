@@ -135,7 +135,7 @@ def create_citations(search_results: Dict[str, Any], keywords: Optional[List[str
             source=source_info,
             content=improved_content,
             score=result.get('relevanceScore'),
-            page=chunk_index + 1  # Usar el índice del chunk como número de página
+            page=result.get('page') or chunk_index + 1  # Página real del PDF; si no existe, el índice del chunk
         )
         
         # Asegurar que el contenido no esté vacío
@@ -1,19 +1,71 @@
+import asyncio
 import os
-from openai import OpenAI
+from typing import Optional
 
-# Module-level client instance
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from app.src.config.settings import LLM_CONFIG
+
+# Module-level client instances
 _client = None
+_async_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def _get_api_key() -> str:
+    hf_token = os.getenv("HF_TOKEN")
+    if not hf_token:
+        raise ValueError("HF_TOKEN no está configurado en las variables de entorno")
+    return hf_token
 
 def get_client() -> OpenAI:
     """Get or initialize the OpenAI client with Hugging Face's inference API."""
     global _client
     if _client is None:
-        hf_token = os.getenv("HF_TOKEN")
-        if not hf_token:
-            raise ValueError("HF_TOKEN no está configurado en las variables de entorno")
-            
         _client = OpenAI(
-            base_url="https://router.huggingface.co/v1",
-            api_key=hf_token,
+            base_url=LLM_CONFIG["base_url"],
+            api_key=_get_api_key(),
         )
     return _client
+
+def get_async_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> AsyncOpenAI:
+    """
+    Get or initialize the shared asynchronous OpenAI-compatible client.
+    
+    The client keeps a pool of keep-alive connections to the LLM endpoint.
+    Retries are disabled here because llm_utils retries with jitter itself.
+    ``transport`` replaces the network when the client is created (e.g. an
+    ``httpx.MockTransport`` stub in benchmarks).
+    """
+    global _async_client
+    if _async_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_CONFIG["max_connections"],
+                max_keepalive_connections=LLM_CONFIG["max_keepalive_connections"],
+                keepalive_expiry=LLM_CONFIG["keepalive_expiry"],
+            ),
+            timeout=httpx.Timeout(LLM_CONFIG["read_timeout"], connect=LLM_CONFIG["connect_timeout"]),
+            transport=transport,
+        )
+        _async_client = AsyncOpenAI(
+            base_url=LLM_CONFIG["base_url"],
+            api_key=_get_api_key(),
+            http_client=http_client,
+            max_retries=0,
+        )
+    return _async_client
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Global limiter of LLM calls in flight."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_CONFIG["max_concurrency"])
+    return _semaphore
+
+async def close_async_client() -> None:
+    """Close the pooled connections of the asynchronous client."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
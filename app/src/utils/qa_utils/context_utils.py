@@ -0,0 +1,125 @@
+"""Token counting and retrieval context packing for QA service."""
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from app.src.config.settings import QA_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+# Rough stand-in used only when no tokenizer can be loaded (words and punctuation marks)
+_APPROX_TOKEN = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+def get_tokenizer():
+    """Load the configured `tokenizers` tokenizer once; None if it is not available."""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        with _tokenizer_lock:
+            if not _tokenizer_loaded:
+                try:
+                    from tokenizers import Tokenizer
+                    _tokenizer = Tokenizer.from_pretrained(QA_CONFIG["tokenizer"])
+                except Exception as e:
+                    logger.warning(f"No se pudo cargar el tokenizer {QA_CONFIG['tokenizer']}, se usará una aproximación: {str(e)}")
+                    _tokenizer = None
+                _tokenizer_loaded = True
+    return _tokenizer
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of a text for the configured LLM tokenizer."""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(_APPROX_TOKEN.findall(text))
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+def _join_run(run: List[Dict[str, Any]]) -> str:
+    """Text of consecutive chunks, without repeating the part each one overlaps with the previous."""
+    parts = [run[0]['text']]
+    for previous, chunk in zip(run, run[1:]):
+        start, end = chunk.get('start'), previous.get('end')
+        if start is not None and end is not None and start < end:
+            tail = chunk['text'][end - start:].strip()
+            if tail:
+                parts.append(tail)
+        else:
+            parts.append(chunk['text'])
+    return ' '.join(parts)
+
+def _merge_adjacent(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge chunks of the same document with consecutive chunk_index into passages."""
+    by_document: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        by_document.setdefault(chunk['document_id'], []).append(chunk)
+    
+    passages = []
+    for document_chunks in by_document.values():
+        document_chunks.sort(key=lambda c: c['chunk_index'])
+        run = [document_chunks[0]]
+        for chunk in document_chunks[1:]:
+            if chunk['chunk_index'] == run[-1]['chunk_index'] + 1:
+                run.append(chunk)
+            else:
+                passages.append(run)
+                run = [chunk]
+        passages.append(run)
+    
+    merged = [
+        {
+            'document_id': run[0]['document_id'],
+            'document_name': run[0]['document_name'],
+            'chunk_index': run[0]['chunk_index'],
+            'chunk_end': run[-1]['chunk_index'],
+            'page': run[0].get('page'),
+            'score': max(c['score'] for c in run),
+            'text': _join_run(run),
+        }
+        for run in passages
+    ]
+    merged.sort(key=lambda p: -p['score'])
+    return merged
+
+def pack_context(
+    chunks: List[Dict[str, Any]],
+    token_budget: int,
+    counter: Optional[Callable[[str], int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Select the best chunks that fit a token budget and merge neighbours.
+    
+    Chunks are taken in score order; a chunk that does not fit is skipped
+    and smaller, lower-scoring ones may still fill the remaining budget.
+    The selected chunks of a document with consecutive indices are joined
+    into a single passage, best passage first.
+    
+    Args:
+        chunks: Retrieved chunks with 'text', 'score', 'document_id' and 'chunk_index'
+        token_budget: Maximum number of tokens of passage text
+        counter: Token counting function (count_tokens by default)
+        
+    Returns:
+        Passages with the merged 'text', best 'score', 'chunk_index'/'chunk_end' and 'tokens'
+    """
+    counter = counter or count_tokens
+    selected = []
+    used = 0
+    for chunk in sorted(chunks, key=lambda c: -c['score']):
+        tokens = counter(chunk['text'])
+        if used + tokens > token_budget:
+            continue
+        selected.append(chunk)
+        used += tokens
+    
+    if not selected:
+        return []
+    
+    passages = _merge_adjacent(selected)
+    for passage in passages:
+        passage['tokens'] = counter(passage['text'])
+    return passages
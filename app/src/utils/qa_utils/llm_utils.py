@@ -1,43 +1,151 @@
 """LLM-related utilities for QA service."""
+import asyncio
 import logging
-from typing import List, Dict, Any
-from openai import OpenAI
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional
 
-from app.src.utils.qa_utils.client_utils import get_client
+import openai
+
+from app.src.config.settings import LLM_CONFIG
+from app.src.utils.qa_utils.client_utils import get_async_client, get_llm_semaphore
 from app.src.utils.qa_utils.format_utils import format_json_for_prompt
+from app.src.utils.qa_utils.answer_cache_utils import get_answer_cache
 
 logger = logging.getLogger(__name__)
 
-async def generate_answer_with_llm(question: str, context: List[Dict[str, Any]]) -> tuple[str, list[str]]:
-    if not context:
-        return "No encuentro información en los documentos cargados.", []
+# Errors worth retrying: the request may succeed on another attempt
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
 
-    try:
-        # Procesar todos los documentos del contexto
-        all_formatted_data = []
-        for doc in context:
-            json_data = doc.get('content', {})
-            if json_data:  # Solo agregar si hay contenido
-                formatted_data = format_json_for_prompt(json_data)
-                all_formatted_data.append(formatted_data)
-        
-        if not all_formatted_data:
-            return "No se encontró contenido válido en los documentos.", []
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Exponential backoff with full jitter, honouring Retry-After when the server sends it."""
+    cap = min(LLM_CONFIG["retry_max_delay"], LLM_CONFIG["retry_base_delay"] * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), LLM_CONFIG["retry_max_delay"]))
+        except ValueError:
+            pass
+    return delay
+
+def _completion_params(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "model": LLM_CONFIG["model"],
+        "max_tokens": LLM_CONFIG["max_tokens"],
+        "temperature": LLM_CONFIG["temperature"],
+        "top_p": LLM_CONFIG["top_p"],
+        **overrides,
+    }
+
+@asynccontextmanager
+async def _completion(messages: List[Dict[str, str]], params: Dict[str, Any], timeout: float) -> AsyncIterator[Any]:
+    """
+    Create a chat completion, retrying transient errors with backoff.
+    
+    Every attempt holds a slot of the LLM semaphore, and the successful one
+    keeps it until the context exits (a stream is read inside it). Backoff
+    sleeps hold no slot, so a call waiting to retry does not block other
+    callers. ``timeout`` bounds the attempts and sleeps together, counted
+    from the first slot acquired.
+    """
+    client = get_async_client()
+    semaphore = get_llm_semaphore()
+    loop = asyncio.get_running_loop()
+    deadline = None
+    attempt = 0
+    while True:
+        async with semaphore:
+            if deadline is None:
+                deadline = loop.time() + timeout
+            try:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(messages=messages, **params),
+                    timeout=max(0.0, deadline - loop.time())
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= LLM_CONFIG["max_retries"]:
+                    raise
+                error = e
+            else:
+                yield response
+                return
+        delay = min(_retry_delay(attempt, error), max(0.0, deadline - loop.time()))
+        attempt += 1
+        logger.warning(f"LLM call failed ({error.__class__.__name__}), retry {attempt}/{LLM_CONFIG['max_retries']} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+async def chat_completion(messages: List[Dict[str, str]], timeout: Optional[float] = None, **overrides) -> str:
+    """
+    Run a chat completion without blocking the event loop.
+    
+    At most LLM_CONFIG["max_concurrency"] attempts are in flight at once;
+    extra callers wait on the semaphore, and a call waiting to retry gives
+    its slot back. Each attempt is bounded by the client's connect/read
+    timeouts and the whole call, retries included, by ``timeout``
+    (LLM_CONFIG["total_timeout"] by default).
+    
+    Returns:
+        The stripped content of the first choice
+    """
+    params = _completion_params(overrides)
+    timeout = timeout if timeout is not None else LLM_CONFIG["total_timeout"]
+    async with _completion(messages, params, timeout) as completion:
+        return (completion.choices[0].message.content or "").strip()
 
-        # Unir todos los datos formateados
-        combined_data = "\n\n".join(all_formatted_data)
+async def stream_chat_completion(messages: List[Dict[str, str]], timeout: Optional[float] = None,
+                                 **overrides) -> AsyncIterator[str]:
+    """
+    Stream a chat completion, yielding content deltas as the model produces them.
+    
+    The call holds a slot of the LLM semaphore until the stream ends or the
+    consumer stops iterating. Retries only happen before the stream opens
+    (a partially streamed answer cannot be retried); ``timeout`` bounds
+    the time to the first byte and the read timeout the gap between chunks.
+    """
+    params = _completion_params({**overrides, "stream": True})
+    timeout = timeout if timeout is not None else LLM_CONFIG["total_timeout"]
+    async with _completion(messages, params, timeout) as stream:
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
 
-        # Crear el mensaje para el modelo
-        messages = [
-            {
-                "role": "system",
-                "content": """Eres un asistente útil que responde preguntas basándose en los datos proporcionados. 
+def build_messages(question: str, context: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Construye los mensajes del chat a partir de la pregunta y el contexto; lista vacía si no hay contenido."""
+    # Procesar todos los documentos del contexto
+    all_formatted_data = []
+    for doc in context:
+        json_data = doc.get('content', {})
+        if json_data:  # Solo agregar si hay contenido
+            formatted_data = format_json_for_prompt(json_data)
+            all_formatted_data.append(formatted_data)
+    
+    if not all_formatted_data:
+        return []
+
+    # Unir todos los datos formateados
+    combined_data = "\n\n".join(all_formatted_data)
+
+    # Crear el mensaje para el modelo
+    return [
+        {
+            "role": "system",
+            "content": """Eres un asistente útil que responde preguntas basándose en los datos proporcionados. 
                 Al final de tu respuesta, incluye una lista de 3-5 palabras clave entre corchetes dobles [[palabra1, palabra2, ...]] 
                 que sean relevantes para la respuesta y que podrían usarse para citar la fuente."""
-            },
-            {
-                "role": "user",
-                "content": f"""Analiza los siguientes datos y responde la pregunta de manera concisa.
+        },
+        {
+            "role": "user",
+            "content": f"""Analiza los siguientes datos y responde la pregunta de manera concisa.
                 
 Datos:
 {combined_data}
@@ -47,26 +155,30 @@ Pregunta: {question}
 Proporciona una respuesta clara y al final incluye las palabras clave relevantes en el formato [[palabra1, palabra2, ...]]
 
 Respuesta:"""
-            }
-        ]
+        }
+    ]
+
+async def generate_answer_with_llm(question: str, context: List[Dict[str, Any]],
+                                   cache_key: Optional[str] = None) -> str:
+    if not context:
+        return "No encuentro información en los documentos cargados."
+
+    try:
+        messages = build_messages(question, context)
+        if not messages:
+            return "No se encontró contenido válido en los documentos."
         
-        # Obtener el cliente de OpenAI configurado para Hugging Face
-        client = get_client()
+        # Realizar la petición a la API sin bloquear el event loop
+        response = await chat_completion(messages)
         
-        # Realizar la petición a la API
-        completion = client.chat.completions.create(
-            model="openai/gpt-oss-120b:fireworks-ai",
-            messages=messages,
-            max_tokens=1000,
-            temperature=0.1,
-            top_p=0.9
-        )
+        # Guardar la respuesta cruda para reutilizarla con la misma pregunta y contexto
+        answer_cache = get_answer_cache() if cache_key and response else None
+        if answer_cache is not None:
+            answer_cache.put(cache_key, question, response)
         
-        # Obtener y devolver la respuesta del modelo
-        response = completion.choices[0].message.content.strip()
         logger.info(f"Respuesta generada para: {question}")
         return response if response else "No encontré información específica sobre eso en los datos."
         
     except Exception as e:
         logger.error(f"Error al generar respuesta: {str(e)}", exc_info=True)
-        return "No pude procesar la solicitud en este momento. Por favor, intenta con otra pregunta.", []
+        return "No pude procesar la solicitud en este momento. Por favor, intenta con otra pregunta."
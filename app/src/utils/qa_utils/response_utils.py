@@ -21,3 +21,66 @@ def clean_response(response: str) -> str:
     # Remove keyword markers and surrounding whitespace
     clean_response = re.sub(r'\s*\[\[.*?\]\]\s*', '', response).strip()
     return clean_response if clean_response else response
+
+
+class KeywordMarkerFilter:
+    """
+    Incremental version of clean_response for streamed text.
+    
+    ``feed`` returns the part of the stream that is safe to show: keyword
+    markers ``[[...]]`` and the whitespace around them are dropped, and text
+    that could still turn into a marker (an open ``[[`` or a trailing ``[``)
+    or trailing whitespace is held back until more text arrives.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._emitted = False
+        self._after_marker = False   # Whitespace right after a removed marker is dropped too
+
+    def _next_marker(self, position: int):
+        """Start of the next possible marker and its end (-1 while still open), or (-1, -1)."""
+        while True:
+            start = self._pending.find('[[', position)
+            if start < 0:
+                return -1, -1
+            end = self._pending.find(']]', start + 2)
+            newline = self._pending.find('\n', start + 2)
+            # Like the regex in clean_response, markers never span lines
+            if newline >= 0 and (end < 0 or newline < end):
+                position = start + 1
+                continue
+            return start, end
+
+    def feed(self, delta: str) -> str:
+        if self._after_marker:
+            delta = delta.lstrip()
+            self._after_marker = not delta
+        self._pending += delta
+        
+        # Remove every complete marker together with its surrounding whitespace
+        start, end = self._next_marker(0)
+        while end >= 0:
+            before = self._pending[:start].rstrip()
+            rest = self._pending[end + 2:].lstrip()
+            self._pending = before + rest
+            self._after_marker = not rest
+            start, end = self._next_marker(len(before))
+        
+        cut = start
+        if cut < 0:
+            cut = len(self._pending) - 1 if self._pending.endswith('[') else len(self._pending)
+        cut = len(self._pending[:cut].rstrip())
+        return self._emit(cut)
+
+    def finish(self) -> str:
+        """Flush whatever is left once the stream is over."""
+        return self._emit(len(self._pending.rstrip()))
+
+    def _emit(self, cut: int) -> str:
+        text, self._pending = self._pending[:cut], self._pending[cut:]
+        if not self._emitted:
+            # Leading whitespace is stripped, like clean_response does
+            text = text.lstrip()
+            self._emitted = bool(text)
+        return text
@@ -1,6 +1,120 @@
 import re
 import unicodedata
-from typing import List
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Characters that end a sentence when they end a word of cleaned text
+SENTENCE_END = '.!?'
+
+# Patterns of the text normalizer, compiled once
+URL_PATTERN = re.compile(r'\S+@\S+|http\S+|www\.\S+')
+CHARACTER_CLASS = re.compile(r'[^\w\sáéíóúüñÁÉÍÓÚÜÑ.,;:!?¿¡-]')
+WHITESPACE_RUN = re.compile(r'\s+')
+_URL_TRIGGER = re.compile(r'@|http|www\.')
+_WHITESPACE = re.compile(r'\s')
+
+# Besides letters and digits (the accented ones included), clean text keeps these
+KEPT_PUNCTUATION = '_.,;:!?¿¡-'
+
+# ASCII bytes that are not kept become spaces; bytes of multi-byte UTF-8
+# sequences (>= 0x80) are left alone
+_ASCII_TABLE = bytes(
+    c if c >= 128 or chr(c).isalnum() or chr(c) in KEPT_PUNCTUATION else 32
+    for c in range(256)
+)
+_ASCII_BYTES = bytes(range(128))
+
+# Non-ASCII character -> its NFKD decomposition with every character that is
+# not kept replaced by a space (filled lazily, one entry per distinct character)
+_char_table: Dict[str, Optional[str]] = {}
+
+# Reasonable block size when cleaning a long text incrementally
+TEXT_BLOCK_SIZE = 1 << 20
+
+
+def _clean_text_exact(text: str) -> str:
+    """Reference pipeline: four full passes over the text."""
+    text = URL_PATTERN.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = CHARACTER_CLASS.sub(' ', text)
+    text = WHITESPACE_RUN.sub(' ', text)
+    return text.strip()
+
+
+def _map_char(char: str) -> Optional[str]:
+    mapped = ''.join(
+        c if c.isalnum() or c in KEPT_PUNCTUATION else ' '
+        for c in unicodedata.normalize('NFKD', char)
+    )
+    # A kept combining mark could be reordered by NFKD across neighbouring
+    # characters, which a per-character table cannot reproduce (no such
+    # character exists as of Unicode 14, but do not rely on it)
+    if any(unicodedata.combining(c) for c in mapped if c != ' '):
+        mapped = None
+    _char_table[char] = mapped
+    return mapped
+
+
+def _last_whitespace(text: str, start: int, end: int) -> int:
+    """Index of the last whitespace character in ``text[start:end]``, -1 if there is none."""
+    last = max(text.rfind(c, start, end) for c in ' \n\t\r')
+    for match in _WHITESPACE.finditer(text, max(last + 1, start), end):
+        last = match.start()
+    return last
+
+
+def _strip_urls(text: str) -> str:
+    """
+    Same result as ``URL_PATTERN.sub('', text)``.
+    
+    A match never spans whitespace, so the pattern is only run over the
+    whitespace-delimited runs that contain an ``@``, ``http`` or ``www.``
+    instead of being attempted at every position of the text.
+    """
+    triggers = text.count('@') + text.count('http') + text.count('www.')
+    if not triggers:
+        return text
+    if triggers * 64 > len(text):
+        # So many candidates that one scan of the whole text is cheaper
+        return URL_PATTERN.sub('', text)
+    
+    pieces = []
+    done = 0
+    for trigger in _URL_TRIGGER.finditer(text):
+        position = trigger.start()
+        if position < done:
+            continue
+        start = _last_whitespace(text, done, position) + 1
+        match = _WHITESPACE.search(text, position)
+        end = match.start() if match else len(text)
+        pieces.append(text[done:start])
+        pieces.append(URL_PATTERN.sub('', text[start:end]))
+        done = end
+    pieces.append(text[done:])
+    return ''.join(pieces)
+
+
+def _clean_text_fused(source: str) -> str:
+    text = _strip_urls(source)
+    data = text.encode('utf-8', 'surrogatepass')
+    
+    if not text.isascii():
+        # NFKD and the character class at once: the UTF-8 sequence of every
+        # distinct non-ASCII character (found in what is left after deleting
+        # the ASCII bytes) is replaced by its precomputed mapping
+        residue = data.translate(None, _ASCII_BYTES).decode('utf-8', 'surrogatepass')
+        for char in set(residue):
+            mapped = _char_table[char] if char in _char_table else _map_char(char)
+            if mapped is None:
+                return _clean_text_exact(source)
+            if mapped != char:
+                data = data.replace(char.encode('utf-8', 'surrogatepass'), mapped.encode('utf-8'))
+    
+    # ASCII character class through a byte table, then collapse the spaces
+    data = data.translate(_ASCII_TABLE)
+    while b'  ' in data:
+        data = data.replace(b'  ', b' ')
+    return data.strip(b' ').decode('utf-8', 'surrogatepass')
+
 
 def clean_text(text: str) -> str:
     """Clean and normalize text for better search and display"""
@@ -10,50 +124,207 @@ def clean_text(text: str) -> str:
     # Convert to string if not already
     text = str(text)
     
-    # Remove email and URLs
-    text = re.sub(r'\S+@\S+|http\S+|www\.\S+', '', text)
+    # Remove email and URLs, normalize unicode characters (accented characters
+    # to their base form), keep only letters, numbers and basic punctuation,
+    # and collapse whitespace; same result as ``_clean_text_exact``
+    return _clean_text_fused(text)
+
+
+class TextNormalizer:
+    """
+    Incremental ``clean_text``.
     
-    # Normalize unicode characters (convert accented characters to their base form)
-    text = unicodedata.normalize('NFKD', text)
+    Blocks of any size are fed in order; the concatenation of the returned
+    pieces plus ``finish()`` equals ``clean_text`` of the whole text. Each
+    block is cleaned up to its last whitespace, and the unfinished word is
+    carried over to the next block, so URLs and e-mail addresses split
+    between blocks are still removed.
+    """
     
-    # Keep only letters, numbers, and basic punctuation
-    text = re.sub(r'[^\w\sáéíóúüñÁÉÍÓÚÜÑ.,;:!?¿¡-]', ' ', text)
+    def __init__(self):
+        self._carry = ''
+        self._emitted = False
     
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
+    def feed(self, block: str) -> str:
+        text = self._carry + block if self._carry else block
+        cut = _last_whitespace(text, 0, len(text)) + 1
+        self._carry = text[cut:]
+        return self._emit(_clean_text_fused(text[:cut])) if cut else ''
     
-    return text.strip()
+    def finish(self) -> str:
+        text, self._carry = self._carry, ''
+        return self._emit(_clean_text_fused(text))
+    
+    def _emit(self, cleaned: str) -> str:
+        if not cleaned:
+            return ''
+        # Pieces are separated by whitespace in the source, i.e. one space once cleaned
+        if self._emitted:
+            cleaned = ' ' + cleaned
+        self._emitted = True
+        return cleaned
 
-def split_into_chunks(text: str, sentences_per_chunk: int = 2) -> List[str]:
-    """Split text into chunks of sentences"""
-    if not text:
-        return []
+
+def clean_text_blocks(blocks: Iterable[str]) -> Iterator[str]:
+    """Clean a text given as a stream of blocks, yielding the cleaned pieces."""
+    normalizer = TextNormalizer()
+    for block in blocks:
+        piece = normalizer.feed(block)
+        if piece:
+            yield piece
+    piece = normalizer.finish()
+    if piece:
+        yield piece
+
+
+def iter_text_blocks(text: str, block_size: int = TEXT_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Slices of about ``block_size`` characters, each ending right after a whitespace.
+    
+    Cleaning the slices one by one gives the same words as cleaning the whole
+    text, since no word or URL is cut.
+    """
+    start = 0
+    while len(text) - start > block_size:
+        cut = _last_whitespace(text, start, start + block_size) + 1
+        if cut <= start:
+            # No whitespace in the window: extend the slice to the end of the word
+            match = _WHITESPACE.search(text, start + block_size)
+            if match is None:
+                break
+            cut = match.end()
+        yield text[start:cut]
+        start = cut
+    if start < len(text):
+        yield text[start:]
+
+class TextChunk(NamedTuple):
+    """Window of the cleaned text of a document."""
+    text: str
+    start: int  # Offset of the first character in the cleaned text of the whole document
+    end: int    # Offset just past the last character
+    page: Optional[int]  # Page of the first word
+
+
+def iter_words(pages: Iterable[Tuple[Optional[int], str]], lower: bool = True) -> Iterator[Tuple[str, int, Optional[int]]]:
+    """
+    Clean a stream of (page number, text) pieces and yield (word, offset, page) for each word.
+    
+    Consecutive pieces with the same page number are parts of one text and
+    may be cut anywhere, even inside a word; a change of page is a word
+    break. Offsets refer to the cleaned (and lowercased) text of the whole
+    stream, whose words are separated by single spaces.
+    """
+    normalizer = TextNormalizer()
+    offset = 0
+    current_page = None
+    
+    def words(piece: str, page: Optional[int]) -> Iterator[Tuple[str, int, Optional[int]]]:
+        nonlocal offset
+        if lower:
+            piece = piece.lower()
+        position = offset
+        for word in piece.split(' '):
+            if word:
+                yield word, position, page
+            position += len(word) + 1
+        offset += len(piece)
+    
+    for page_number, text in pages:
+        if page_number != current_page:
+            # Finish the last word of the previous page before the new one starts
+            yield from words(normalizer.feed(' '), current_page)
+            current_page = page_number
+        yield from words(normalizer.feed(text), page_number)
+    yield from words(normalizer.finish(), current_page)
+
+
+def _snap_end(window: List[Tuple[str, int, Optional[int]]], sizes: List[int], size: int) -> int:
+    """Number of words of the next chunk: up to the last sentence end in its second half, else all."""
+    total = sum(sizes)
+    for i in range(len(window) - 1, 0, -1):
+        if total * 2 < size:
+            break
+        if window[i][0][-1] in SENTENCE_END:
+            return i + 1
+        total -= sizes[i]
+    return len(window)
+
+
+def _overlap_start(window: List[Tuple[str, int, Optional[int]]], sizes: List[int], cut: int, overlap: int) -> int:
+    """First word of the window that follows a chunk of ``cut`` words."""
+    start, repeated = cut, 0
+    # Always advance by at least one word
+    while start > 1 and repeated + sizes[start - 1] <= overlap:
+        start -= 1
+        repeated += sizes[start]
+    # Rather start the overlap at a sentence start when there is one in it
+    for i in range(start, cut):
+        if window[i - 1][0][-1] in SENTENCE_END:
+            return i
+    return start
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[Optional[int], str]],
+    size: int,
+    overlap: int = 0,
+    unit: str = 'tokens',
+    min_chars: int = 20,
+    lower: bool = True
+) -> Iterator[TextChunk]:
+    """
+    Split a stream of (page number, text) pieces into overlapping chunks.
+    
+    Each chunk holds about ``size`` tokens (words) or characters (``unit``).
+    It ends at the last sentence end in its second half when there is one,
+    so chunks rarely cut a sentence; the next chunk repeats up to
+    ``overlap`` units of it, starting at a sentence start when the overlap
+    contains one. Only the current window of words is kept in memory, so
+    the text can be streamed in blocks of any size.
+    
+    Args:
+        pages: (page number, text) pieces, see ``iter_words``
+        size: Target chunk size
+        overlap: Size repeated at the start of the next chunk (at most half of ``size``)
+        unit: "tokens" or "chars"
+        min_chars: Shorter chunks are skipped
+        lower: Lowercase the cleaned text
+        
+    Yields:
+        TextChunk with the text and its character offsets in the cleaned text
+    """
+    if unit not in ('tokens', 'chars'):
+        raise ValueError(f"Unknown chunk unit: {unit}")
+    size = max(size, 1)
+    overlap = min(max(overlap, 0), size // 2)
+    window: List[Tuple[str, int, Optional[int]]] = []
+    sizes: List[int] = []
+    total = 0
+    emitted_end = 0
+    
+    def make_chunk(words: List[Tuple[str, int, Optional[int]]]) -> TextChunk:
+        last_word, last_offset, _ = words[-1]
+        return TextChunk(' '.join(w for w, _, _ in words), words[0][1], last_offset + len(last_word), words[0][2])
+    
+    for word in iter_words(pages, lower):
+        window.append(word)
+        sizes.append(1 if unit == 'tokens' else len(word[0]) + 1)
+        total += sizes[-1]
+        if total < size:
+            continue
         
-    # Split into sentences - handle multiple sentence terminators
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    # Group into chunks
-    chunks = []
-    current_chunk = []
-    
-    for sentence in sentences:
-        current_chunk.append(sentence)
-        if len(current_chunk) >= sentences_per_chunk:
-            chunk = ' '.join(current_chunk)
-            chunks.append(chunk)
-            current_chunk = []
-    
-    # Add any remaining sentences as a chunk
-    if current_chunk:
-        chunk = ' '.join(current_chunk)
-        chunks.append(chunk)
-    
-    # Ensure we have at least one chunk
-    if not chunks and text.strip():
-        chunks = [text.strip()]
-    
-    # Filter out very short chunks (less than 20 chars)
-    chunks = [chunk for chunk in chunks if len(chunk) >= 20]
-    
-    return chunks
+        cut = _snap_end(window, sizes, size)
+        chunk = make_chunk(window[:cut])
+        if len(chunk.text) >= min_chars:
+            yield chunk
+        emitted_end = chunk.end
+        start = _overlap_start(window, sizes, cut, overlap)
+        window, sizes = window[start:], sizes[start:]
+        total = sum(sizes)
+    
+    # Remaining words, unless they were all part of the last chunk
+    if window and window[-1][1] >= emitted_end:
+        chunk = make_chunk(window)
+        if len(chunk.text) >= min_chars:
+            yield chunk
@@ -0,0 +1,66 @@
+"""
+Recall vs latency of the IVF-PQ index against exact (brute-force) search.
+
+Vectors are drawn from a Gaussian mixture and L2-normalized, like sentence
+embeddings. For every ``nprobe`` the benchmark reports recall@k against the
+exact inner-product top-k and the mean query latency.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_ann_recall.py --n 100000 --dim 384
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.src.services.search_services.ann_index import IVFPQIndex
+
+
+def make_data(n, dim, clusters, rng):
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50_000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--nlist', type=int, default=256)
+    parser.add_argument('--m', type=int, default=48)
+    parser.add_argument('--refine', type=int, default=100, help='Candidates re-ranked with exact vectors (0 = PQ only)')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = make_data(args.n, args.dim, 200, rng)
+    queries = make_data(args.queries, args.dim, 200, rng)
+
+    start = time.perf_counter()
+    index = IVFPQIndex(args.dim, nlist=args.nlist, m=args.m)
+    index.train(data)
+    for offset in range(0, args.n, 10_000):
+        index.add(np.arange(offset, min(offset + 10_000, args.n)), data[offset:offset + 10_000])
+    print(f"build: {time.perf_counter() - start:.1f}s for {args.n} vectors (dim={args.dim}, nlist={args.nlist}, m={args.m})")
+
+    start = time.perf_counter()
+    exact = [np.argsort(-(data @ q))[:args.k] for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"exact: {exact_ms:.2f} ms/query\n")
+
+    lookup = (lambda ids: data[ids]) if args.refine else None
+    print(f"{'nprobe':>7} {'recall@' + str(args.k):>10} {'ms/query':>9} {'speedup':>8}")
+    for nprobe in args.nprobe:
+        hits = 0
+        start = time.perf_counter()
+        for q, truth in zip(queries, exact):
+            ids, _ = index.search(q, args.k, nprobe=nprobe, refine=args.refine, vectors=lookup)
+            hits += len(set(ids.tolist()) & set(truth.tolist()))
+        ms = (time.perf_counter() - start) * 1000 / args.queries
+        print(f"{nprobe:>7} {hits / (args.k * args.queries):>10.3f} {ms:>9.2f} {exact_ms / ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
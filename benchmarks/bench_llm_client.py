@@ -0,0 +1,186 @@
+"""
+LLM client against an in-process stub: retries, timeouts and the concurrency cap.
+
+``LLM_CONFIG["base_url"]`` points at a stub OpenAI-compatible endpoint
+served by an ``httpx.MockTransport`` inside this process, so no network or
+token is needed. Every request tells the stub how to behave through its
+last message (``fail=2 latency=0.1 retry_after=1``). The script checks that:
+
+- failed attempts (503, 429 with Retry-After) are retried until one succeeds,
+  and the error is raised once ``max_retries`` is exhausted;
+- the overall ``timeout`` stops a call that keeps failing;
+- no more than ``max_concurrency`` attempts are ever in flight, and the cap is
+  reached under load;
+- a call sleeping before a retry does not hold a semaphore slot: a request
+  sent while every slot's owner is backing off completes right away;
+- streamed answers and ``generate_answer_with_llm`` go through the same client.
+
+It prints the throughput under load and exits with status 1 if a check fails.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_llm_client.py --requests 200 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import httpx
+import openai
+
+from app.src.config.settings import LLM_CONFIG
+from app.src.utils.qa_utils import chat_completion, generate_answer_with_llm, stream_chat_completion
+from app.src.utils.qa_utils.client_utils import close_async_client, get_async_client
+
+BASE_URL = "http://llm-stub.local/v1"
+
+
+class StubLLM:
+    """OpenAI-compatible chat completions endpoint, with failures and latency on demand."""
+
+    def __init__(self):
+        self.attempts = Counter()  # request id -> attempts received
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        directives = dict(re.findall(r'(\w+)=(\S+)', body['messages'][-1]['content']))
+        request_id = directives.get('id', '')
+        self.attempts[request_id] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(float(directives.get('latency', 0)))
+        finally:
+            self.in_flight -= 1
+
+        if self.attempts[request_id] <= int(directives.get('fail', 0)):
+            if 'retry_after' in directives:
+                return httpx.Response(429, headers={'retry-after': directives['retry_after']},
+                                      json={'error': {'message': 'rate limited'}})
+            return httpx.Response(503, json={'error': {'message': 'unavailable'}})
+
+        answer = f"respuesta {request_id}"
+        if body.get('stream'):
+            events = [
+                {'id': request_id, 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                 'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]}
+                for word in answer.split()
+            ]
+            stream = ''.join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=stream.encode())
+        return httpx.Response(200, json={
+            'id': request_id, 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 2, 'total_tokens': 3},
+        })
+
+
+def ask(directives: str):
+    return [{"role": "user", "content": directives}]
+
+
+async def run(args) -> list:
+    stub = StubLLM()
+    await close_async_client()
+    get_async_client(transport=httpx.MockTransport(stub))
+    failures = []
+
+    def check(condition: bool, message: str) -> None:
+        print(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    # Retries until an attempt succeeds
+    answer = await chat_completion(ask("id=retry fail=2"))
+    check(answer == "respuesta retry" and stub.attempts['retry'] == 3,
+          f"two 503s then success: {stub.attempts['retry']} attempts, answer {answer!r}")
+
+    # Retries exhausted
+    try:
+        await chat_completion(ask("id=exhausted fail=99"))
+        check(False, "retries exhausted raises")
+    except openai.InternalServerError:
+        attempts = stub.attempts['exhausted']
+        check(attempts == LLM_CONFIG["max_retries"] + 1, f"retries exhausted after {attempts} attempts")
+
+    # The overall timeout covers the backoff sleeps
+    started = time.perf_counter()
+    try:
+        await chat_completion(ask("id=timeout fail=99 retry_after=5"), timeout=0.3)
+        check(False, "timeout raises")
+    except asyncio.TimeoutError:
+        elapsed = time.perf_counter() - started
+        check(elapsed < 1.0, f"timeout stops a retrying call after {elapsed:.2f}s")
+
+    # Every slot's owner is backing off: a new call must not wait for them
+    concurrency = LLM_CONFIG["max_concurrency"]
+    backing_off = [
+        asyncio.create_task(chat_completion(ask(f"id=backoff{i} fail=1 retry_after=1")))
+        for i in range(concurrency)
+    ]
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    answer = await chat_completion(ask("id=during-backoff latency=0.05"))
+    elapsed = time.perf_counter() - started
+    check(elapsed < 0.5, f"call during {concurrency} backoffs served in {elapsed:.2f}s")
+    results = await asyncio.gather(*backing_off)
+    check(all(r.startswith("respuesta backoff") for r in results), "backed-off calls succeed on retry")
+
+    # Concurrency cap under load
+    stub.max_in_flight = 0
+    started = time.perf_counter()
+    answers = await asyncio.gather(*(
+        chat_completion(ask(f"id=load{i} latency={args.latency}")) for i in range(args.requests)
+    ))
+    elapsed = time.perf_counter() - started
+    check(len(set(answers)) == args.requests, f"{args.requests} concurrent calls answered")
+    check(stub.max_in_flight == concurrency,
+          f"at most {concurrency} attempts in flight (saw {stub.max_in_flight})")
+    print(f"     {args.requests / elapsed:.0f} calls/s with {args.latency * 1000:.0f} ms per call "
+          f"(ideal {concurrency / args.latency:.0f})")
+
+    # Streaming, retried before the stream opens
+    deltas = [delta async for delta in stream_chat_completion(ask("id=stream fail=1"))]
+    check("".join(deltas).strip() == "respuesta stream" and stub.attempts['stream'] == 2,
+          f"streamed answer after one retry: {''.join(deltas).strip()!r}")
+
+    # The QA entry point returns a plain string on success
+    answer = await generate_answer_with_llm("id=qa", [{'content': {'texto': 'id=qa'}}])
+    check(isinstance(answer, str) and answer == "respuesta qa", f"generate_answer_with_llm returns {answer!r}")
+
+    await close_async_client()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help="Stub response time in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("HF_TOKEN", "stub")
+    # Retry warnings are expected here
+    logging.getLogger("app.src.utils.qa_utils.llm_utils").setLevel(logging.ERROR)
+    LLM_CONFIG.update(
+        base_url=BASE_URL,
+        model="stub",
+        max_concurrency=args.concurrency,
+        max_retries=3,
+        retry_base_delay=0.01,
+        retry_max_delay=2.0,
+    )
+    failures = asyncio.run(run(args))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Full index rebuild: single process versus a process pool, by worker count.
+
+A synthetic corpus is written to a temporary document catalog. The serial
+rebuild is timed first, then the parallel one for every worker count, and
+each parallel result is checked to be identical (terms, counts and chunks)
+to the serial one.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_parallel_build.py --documents 2000 --workers 1 2 4 8
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import compress_text, get_document_catalog
+from app.src.services.search_services.load_document import load_document
+from app.src.services.search_services.parallel_build import build_index_parallel
+
+WORDS = (
+    "contrato factura cliente proveedor pago plazo entrega servicio garantía cláusula "
+    "informe análisis resultado proyecto equipo reunión presupuesto riesgo calidad norma "
+    "documento archivo sistema usuario acceso datos red servidor copia seguridad"
+).split()
+
+
+def make_corpus(folder: Path, documents: int, sentences: int, rng: random.Random) -> None:
+    catalog = get_document_catalog(folder)
+    for i in range(documents):
+        text = " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+            for _ in range(sentences)
+        )
+        metadata = {'original_filename': f"doc_{i}.txt", 'file_extension': 'txt', 'file_size': len(text)}
+        catalog.add(f"doc_{i:06d}", metadata, compress_text(text), len(text))
+
+
+def same_chunk(a, b) -> bool:
+    # Word positions are arrays: compare them element-wise
+    return a.keys() == b.keys() and all(
+        np.array_equal(a[key], b[key]) if isinstance(a[key], np.ndarray) else a[key] == b[key]
+        for key in a
+    )
+
+
+def same_view(a, b) -> bool:
+    if a.terms.terms() != b.terms.terms() or len(a.segments) != len(b.segments):
+        return False
+    if not a.segments:
+        return True
+    x, y = a.segments[0], b.segments[0]
+    return (
+        x.counts.shape == y.counts.shape and (x.counts != y.counts).nnz == 0
+        and len(x.metadata) == len(y.metadata) and all(map(same_chunk, x.metadata, y.metadata))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=1000)
+    parser.add_argument('--sentences', type=int, default=200, help='Sentences per document')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--shard', type=int, default=64, help='Documents per task')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        make_corpus(folder, args.documents, args.sentences, random.Random(0))
+        catalog = get_document_catalog(folder)
+        index = _state['index']
+
+        start = time.perf_counter()
+        serial = index.replace_all(chunk for document in catalog.iter_documents(stream=True) for chunk in load_document(document))
+        serial_time = time.perf_counter() - start
+        print(f"{args.documents} documents, {serial.n_live} chunks, {serial.vocab_size} terms")
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+        print(f"{'serial':>8} {serial_time:>9.2f} {1.0:>7.1f}x {'-':>10}")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            view = build_index_parallel(folder, workers, args.shard)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8} {elapsed:>9.2f} {serial_time / elapsed:>7.1f}x {str(same_view(serial, view)):>10}")
+
+
+if __name__ == '__main__':
+    main()
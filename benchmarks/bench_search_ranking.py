@@ -0,0 +1,59 @@
+"""
+Benchmark of the search ranking step: vectorized top-k selection versus the
+previous Python loop + full sort.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_search_ranking.py --rows 500000 --density 0.2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.src.services.search_services.rank_results import rank_results
+
+
+def legacy_rank(similarities, page, page_size):
+    """Ranking as previously done inside search()."""
+    valid_indices = [i for i, score in enumerate(similarities) if score > 0]
+    sorted_indices = sorted(valid_indices, key=lambda i: -similarities[i])
+    start_idx = (page - 1) * page_size
+    return sorted_indices[start_idx:start_idx + page_size], len(sorted_indices)
+
+
+def timeit(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--density', type=float, default=0.2, help='Fraction of rows with a positive score')
+    parser.add_argument('--page', type=int, default=1)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'matches':>10} {'legacy ms':>12} {'top-k ms':>10} {'speedup':>8}")
+    for rows in args.rows:
+        similarities = np.where(rng.random(rows) < args.density, rng.random(rows), 0.0)
+        # Quantize a little so ties are exercised as well
+        similarities = np.round(similarities, 4)
+
+        expected, expected_total = legacy_rank(similarities, args.page, args.page_size)
+        got, total = rank_results(similarities, args.page, args.page_size)
+        assert list(got) == expected and total == expected_total, "rankings differ"
+
+        legacy = timeit(lambda: legacy_rank(similarities, args.page, args.page_size), args.repeat)
+        topk = timeit(lambda: rank_results(similarities, args.page, args.page_size), args.repeat)
+        print(f"{rows:>10} {total:>10} {legacy * 1000:>12.2f} {topk * 1000:>10.2f} {legacy / topk:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
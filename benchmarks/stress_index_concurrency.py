@@ -0,0 +1,197 @@
+"""
+Concurrency stress test: uploads, deletions and searches on one live index.
+
+Writer threads store documents in a temporary catalog and index them, and
+delete some of them again; a merger thread compacts segments meanwhile.
+Reader threads pin the current view for every request and rank with TF-IDF
+and BM25, format the page like ``search()`` and retrieve chunks like the QA
+service. Every document repeats a marker word of its own, so each result
+can be traced back to the document its metadata claims. A result fails if:
+
+- the pinned view changed generation during the request;
+- its row is deleted in the view, or its document is not in the view;
+- its text is not the row's text in the view, or lacks its document's marker;
+- ranking the same view again gives different scores.
+
+The script exits with status 1 if any result failed.
+
+Usage:
+    PYTHONPATH=. python benchmarks/stress_index_concurrency.py --seconds 10 --writers 3 --readers 4
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.src.constants import _state
+from app.src.services.file_services.document_catalog import get_document_catalog
+from app.src.services.file_services.save_document import save_document
+from app.src.services.search_services.format_search_result import format_search_result
+from app.src.services.search_services.index_document import index_document, unindex_document
+from app.src.services.search_services.rank_query import rank_query
+from app.src.services.search_services.retrieve_chunks import retrieve_chunks
+
+WORDS = (
+    "contrato factura cliente proveedor pago plazo entrega servicio garantia clausula "
+    "informe analisis resultado proyecto equipo reunion presupuesto riesgo calidad norma"
+).split()
+ENGINES = ("tfidf", "bm25")
+TOKEN_PATTERN = re.compile(r'[\w-]+', re.UNICODE)
+
+
+def live_documents(view) -> set:
+    """Ids of the documents with at least one live row in the view."""
+    return {meta['document_id'] for meta in view.live_metadata()}
+
+
+class Stress:
+    def __init__(self, folder: Path, seconds: float):
+        self.folder = folder
+        self.deadline = time.monotonic() + seconds
+        self.markers = {}  # document id -> marker word
+        self.lock = threading.Lock()
+        self.failures = []
+        self.counts = {'uploads': 0, 'deletes': 0, 'merges': 0, 'requests': 0, 'results': 0}
+
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline and len(self.failures) < 20
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.counts[key] += n
+
+    def fail(self, message: str) -> None:
+        with self.lock:
+            self.failures.append(message)
+
+    def guarded(self, target, *args) -> None:
+        # An exception in any thread is a failure, not a silently shorter run
+        try:
+            target(*args)
+        except Exception as e:
+            self.fail(f"{target.__name__} {args}: {type(e).__name__}: {e}")
+
+    def writer(self, number: int) -> None:
+        rng = random.Random(number)
+        mine = []
+        serial = 0
+        while self.running():
+            if mine and rng.random() < 0.3:
+                document_id = mine.pop(rng.randrange(len(mine)))
+                unindex_document(document_id)
+                get_document_catalog(self.folder).delete(document_id)
+                self.count('deletes')
+                continue
+            serial += 1
+            marker = f"marca{number}x{serial}"
+            text = " ".join(
+                " ".join(rng.choice(WORDS) for _ in range(8)).capitalize() + f" {marker}."
+                for _ in range(rng.randint(5, 40))
+            )
+            # One file name per upload: a deleted document's id is never reused, so
+            # readers pinned to older views still map it to the right marker
+            document_id = save_document(self.folder, {'original_filename': f"{marker}.txt"}, text)
+            with self.lock:
+                self.markers[document_id] = marker
+            index_document(document_id, self.folder)
+            mine.append(document_id)
+            self.count('uploads')
+
+    def merger(self) -> None:
+        while self.running():
+            if _state['index'].merge_once():
+                self.count('merges')
+            else:
+                time.sleep(0.01)
+
+    def check(self, view, generation, rows, results, where: str) -> None:
+        metadata = view.metadata
+        deleted = view.deleted
+        documents = live_documents(view)
+        for row, result in zip(rows, results):
+            row = int(row)
+            document_id = result['document_id']
+            with self.lock:
+                marker = self.markers.get(document_id)
+            if view.generation != generation:
+                self.fail(f"{where}: view changed generation {generation} -> {view.generation}")
+            if row >= len(deleted) or deleted[row]:
+                self.fail(f"{where}: row {row} is deleted in generation {generation}")
+            elif metadata[row]['document_id'] != document_id or metadata[row]['text'] != result['full_text']:
+                self.fail(f"{where}: row {row} metadata differs from generation {generation}")
+            if document_id not in documents:
+                self.fail(f"{where}: {document_id} is not in generation {generation}")
+            if marker is None or marker not in TOKEN_PATTERN.findall(result['full_text']):
+                self.fail(f"{where}: text of row {row} does not belong to {document_id}")
+        self.count('results', len(results))
+
+    def reader(self, number: int) -> None:
+        rng = random.Random(100 + number)
+        while self.running():
+            view = _state['index'].view
+            generation = view.generation
+            if not view.n_live:
+                time.sleep(0.001)
+                continue
+            query = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+            engine = rng.choice(ENGINES)
+            where = f"reader {number} {engine} '{query}'"
+
+            rows, similarities, total = rank_query(view, query, 1, 10, engine)
+            if len(similarities) != view.n_rows:
+                self.fail(f"{where}: {len(similarities)} scores for {view.n_rows} rows")
+                continue
+            if total:
+                query_terms = TOKEN_PATTERN.findall(query)
+                results = [format_search_result(row, similarities, query_terms, view.metadata) for row in rows]
+                self.check(view, generation, rows, results, where)
+                again_rows, again, _ = rank_query(view, query, 1, 10, engine)
+                if not np.array_equal(again_rows, rows) or not np.allclose(again[rows], similarities[rows]):
+                    self.fail(f"{where}: ranking the same view twice differs")
+
+            chunks = retrieve_chunks(query, 5, engine, view=view)
+            documents = live_documents(view) if chunks else set()
+            for chunk in chunks:
+                with self.lock:
+                    marker = self.markers.get(chunk['document_id'])
+                if chunk['document_id'] not in documents or marker not in TOKEN_PATTERN.findall(chunk['text']):
+                    self.fail(f"{where}: retrieved chunk of {chunk['document_id']} not in generation {generation}")
+            self.count('requests')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--writers', type=int, default=3)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stress = Stress(Path(tmp), args.seconds)
+        threads = [threading.Thread(target=stress.guarded, args=(stress.writer, i)) for i in range(args.writers)]
+        threads += [threading.Thread(target=stress.guarded, args=(stress.reader, i)) for i in range(args.readers)]
+        threads.append(threading.Thread(target=stress.guarded, args=(stress.merger,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    counts = stress.counts
+    print(f"{counts['uploads']} uploads, {counts['deletes']} deletes, {counts['merges']} merges, "
+          f"{counts['requests']} requests, {counts['results']} results checked, "
+          f"final generation {_state['index'].generation}")
+    if stress.failures:
+        for failure in stress.failures:
+            print(f"FAIL {failure}")
+        sys.exit(1)
+    print("OK: every result came from its pinned view")
+
+
+if __name__ == '__main__':
+    main()
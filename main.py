@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+import asyncio
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,9 +22,13 @@ logger = logging.getLogger(__name__)
 from app.middleware.cors_middleware import setup_cors_middleware
 from app.middleware.compression_middleware import setup_gzip_middleware
 from app.middleware.logging_middleware import log_requests_middleware
+from app.middleware.request_size_middleware import setup_request_size_middleware
 
 # Importar routers
 from app.src.routes.routes import api_router
+from app.src.utils.qa_utils.client_utils import close_async_client
+from app.src.services.search_services import start_search_index, stop_search_index, get_index_scheduler
+from app.src.services.ingest_services import get_ingest_queue
 
 # Configuración para manejar archivos grandes (1GB)
 app = FastAPI(
@@ -33,16 +38,50 @@ app = FastAPI(
 )
 
 # Configuración para manejo de archivos grandes
-app.router.default_max_request_size = 1024 * 1024 * 1024  # 1GB
+MAX_REQUEST_SIZE = 1024 * 1024 * 1024  # 1GB
 
 # Configuración de middlewares
 setup_cors_middleware(app)  # Debe ir primero
 setup_gzip_middleware(app)
+setup_request_size_middleware(app, MAX_REQUEST_SIZE)  # Rechaza cuerpos demasiado grandes antes de leerlos
 app.middleware("http")(log_requests_middleware)
 
 # Incluir rutas de la API
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def startup_load_index():
+    """Cargar el índice de búsqueda (snapshot mapeado en memoria o reconstrucción)."""
+    await asyncio.to_thread(start_search_index)
+
+@app.on_event("startup")
+async def startup_ingest_queue():
+    """Arrancar los trabajadores de ingesta y reanudar los archivos pendientes."""
+    await get_ingest_queue().start()
+
+@app.on_event("shutdown")
+async def shutdown_ingest_queue():
+    """Detener los trabajadores de ingesta (los archivos pendientes se reanudan al arrancar)."""
+    await get_ingest_queue().stop()
+
+@app.on_event("shutdown")
+async def shutdown_index_scheduler():
+    """Aplicar los cambios pendientes del índice antes de guardar el snapshot."""
+    await asyncio.to_thread(get_index_scheduler().flush)
+
+@app.on_event("shutdown")
+async def shutdown_save_index():
+    """Persistir el índice para que el próximo arranque no tenga que reconstruirlo."""
+    try:
+        await asyncio.to_thread(stop_search_index)
+    except Exception as e:
+        logger.error(f"No se pudo guardar el snapshot del índice: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    """Cerrar las conexiones del pool del cliente LLM."""
+    await close_async_client()
+
 @app.get("/")
 async def root():
     return {"message": "¡Hola, mundo!"}
\ No newline at end of file